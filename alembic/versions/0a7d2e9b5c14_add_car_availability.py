@@ -0,0 +1,68 @@
+"""add_car_availability
+
+Revision ID: 0a7d2e9b5c14
+Revises: f8a31d6c0b52
+Create Date: 2026-10-18 15:58:42.130954
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7d2e9b5c14'
+down_revision: Union[str, Sequence[str], None] = 'f8a31d6c0b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cars', sa.Column('availability', sa.String(length=20), server_default='В продаже', nullable=False))
+
+    # Доступность по существующим заказам. Раньше заказанный автомобиль скрывался
+    # через is_visible = false — возвращаем видимость, скрывает теперь availability
+    op.execute("""
+        UPDATE cars c SET
+            availability = CASE
+                WHEN EXISTS (
+                    SELECT 1 FROM car_orders co JOIN orders o ON o.order_id = co.order_id
+                    WHERE co.car_id = c.car_id AND o.status = 'Доставлен'
+                ) THEN 'Продан'
+                ELSE 'Забронирован'
+            END,
+            is_visible = true
+        WHERE EXISTS (
+            SELECT 1 FROM car_orders co JOIN orders o ON o.order_id = co.order_id
+            WHERE co.car_id = c.car_id AND o.status != 'Отменен'
+        )
+    """)
+    op.create_index('ix_cars_availability', 'cars', ['availability'], unique=False)
+
+    # Витрина: availability вместо is_ordered
+    op.add_column('car_listings', sa.Column('availability', sa.String(length=20), server_default='В продаже', nullable=False))
+    op.execute("""
+        UPDATE car_listings l SET availability = c.availability, is_visible = c.is_visible
+        FROM cars c
+        WHERE c.car_id = l.car_id
+    """)
+    op.alter_column('car_listings', 'availability', server_default=None)
+    op.drop_column('car_listings', 'is_ordered')
+    op.create_index('ix_car_listings_availability_is_visible_car_id', 'car_listings',
+                    ['availability', 'is_visible', 'car_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_car_listings_availability_is_visible_car_id', table_name='car_listings')
+    op.add_column('car_listings', sa.Column('is_ordered', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.execute("UPDATE car_listings SET is_ordered = (availability != 'В продаже')")
+    op.alter_column('car_listings', 'is_ordered', server_default=None)
+    op.drop_column('car_listings', 'availability')
+
+    # Заказанные автомобили снова скрываются через is_visible
+    op.execute("UPDATE cars SET is_visible = false WHERE availability != 'В продаже'")
+    op.drop_index('ix_cars_availability', table_name='cars')
+    op.drop_column('cars', 'availability')
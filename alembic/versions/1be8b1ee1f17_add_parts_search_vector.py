@@ -0,0 +1,46 @@
+"""add_parts_search_vector
+
+Revision ID: 1be8b1ee1f17
+Revises: 349a655aefa4
+Create Date: 2026-10-18 10:12:41.204511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1be8b1ee1f17'
+down_revision: Union[str, Sequence[str], None] = '349a655aefa4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('parts', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # Заполняем поисковый документ для уже существующих запчастей
+    # (то же выражение, что и part_repo._search_document_expr)
+    op.execute("""
+        UPDATE parts p SET search_vector =
+            setweight(to_tsvector('simple', coalesce(p.part_name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(p.part_article, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(p.manufacturer, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(s.spec_name || ' ' || s.spec_value, ' ')
+                FROM part_specifications s
+                WHERE s.part_id = p.part_id
+            ), '')), 'C')
+    """)
+
+    op.create_index('ix_parts_search_vector', 'parts', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_parts_search_vector', table_name='parts', postgresql_using='gin')
+    op.drop_column('parts', 'search_vector')
@@ -0,0 +1,53 @@
+"""create_stock_movements_table
+
+Revision ID: 4b8e1f6c2d93
+Revises: 0a7d2e9b5c14
+Create Date: 2026-10-18 17:24:06.418275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e1f6c2d93'
+down_revision: Union[str, Sequence[str], None] = '0a7d2e9b5c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_movements',
+    sa.Column('movement_id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('part_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=30), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['part_id'], ['parts.part_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.order_id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['actor_id'], ['users.user_id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('movement_id')
+    )
+    op.create_index('ix_stock_movements_part_id_movement_id', 'stock_movements', ['part_id', 'movement_id'], unique=False)
+    op.create_index('ix_stock_movements_order_id', 'stock_movements', ['order_id'], unique=False)
+
+    # Истории до журнала нет: текущий остаток заводим одной записью
+    op.execute("""
+        INSERT INTO stock_movements (part_id, delta, reason)
+        SELECT part_id, stock_count, 'Начальный остаток'
+        FROM parts
+        WHERE COALESCE(stock_count, 0) != 0
+        ORDER BY part_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stock_movements_order_id', table_name='stock_movements')
+    op.drop_index('ix_stock_movements_part_id_movement_id', table_name='stock_movements')
+    op.drop_table('stock_movements')
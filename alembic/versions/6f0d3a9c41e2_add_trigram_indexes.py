@@ -0,0 +1,39 @@
+"""add_trigram_indexes
+
+Revision ID: 6f0d3a9c41e2
+Revises: 1be8b1ee1f17
+Create Date: 2026-10-18 11:03:17.582043
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f0d3a9c41e2'
+down_revision: Union[str, Sequence[str], None] = '1be8b1ee1f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Триграммные индексы: ILIKE '%x%' и оператор схожести % по артикулу, VIN и модели
+    op.create_index('ix_parts_part_article_trgm', 'parts', ['part_article'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'part_article': 'gin_trgm_ops'})
+    op.create_index('ix_cars_vin_trgm', 'cars', ['vin'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'vin': 'gin_trgm_ops'})
+    op.create_index('ix_car_trims_model_name_trgm', 'car_trims', ['model_name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'model_name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_car_trims_model_name_trgm', table_name='car_trims')
+    op.drop_index('ix_cars_vin_trgm', table_name='cars')
+    op.drop_index('ix_parts_part_article_trgm', table_name='parts')
+    # Расширение pg_trgm не удаляем: им могут пользоваться другие объекты БД
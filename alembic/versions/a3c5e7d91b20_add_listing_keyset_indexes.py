@@ -0,0 +1,31 @@
+"""add_listing_keyset_indexes
+
+Revision ID: a3c5e7d91b20
+Revises: 6f0d3a9c41e2
+Create Date: 2026-10-18 12:21:09.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7d91b20'
+down_revision: Union[str, Sequence[str], None] = '6f0d3a9c41e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset-пагинация: порядок списков совпадает с порядком индексов (обход назад)
+    op.create_index('ix_parts_listing_order', 'parts', [sa.text('(stock_count > 0)'), 'part_id'], unique=False)
+    op.create_index('ix_cars_is_visible_car_id', 'cars', ['is_visible', 'car_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cars_is_visible_car_id', table_name='cars')
+    op.drop_index('ix_parts_listing_order', table_name='parts')
@@ -49,7 +49,8 @@ def upgrade() -> None:
     sa.ForeignKeyConstraint(['order_id'], ['orders.order_id'], ondelete='CASCADE'),
     sa.PrimaryKeyConstraint('car_order_id')
     )
-    op.drop_constraint(op.f('cart_items_user_id_part_id_key'), 'cart_items', type_='unique')
+    # Ограничения может не быть (в 2eab6562ed32 оно не создаётся) — чистая БД тоже мигрирует
+    op.execute("ALTER TABLE cart_items DROP CONSTRAINT IF EXISTS cart_items_user_id_part_id_key")
     op.add_column('orders', sa.Column('pickup_point_id', sa.Integer(), nullable=True))
     op.add_column('orders', sa.Column('service_fee', sa.DECIMAL(precision=10, scale=2), nullable=False))
     op.alter_column('orders', 'shipping_address_id',
@@ -0,0 +1,28 @@
+"""add_part_categories_parent_index
+
+Revision ID: b7e2f4a86c13
+Revises: a3c5e7d91b20
+Create Date: 2026-10-18 12:47:52.016337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f4a86c13'
+down_revision: Union[str, Sequence[str], None] = 'a3c5e7d91b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_part_categories_parent_id', 'part_categories', ['parent_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_part_categories_parent_id', table_name='part_categories')
@@ -0,0 +1,32 @@
+"""create_cache_generations_table
+
+Revision ID: c41d8e0f5a76
+Revises: b7e2f4a86c13
+Create Date: 2026-10-18 13:32:40.772913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d8e0f5a76'
+down_revision: Union[str, Sequence[str], None] = 'b7e2f4a86c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cache_generations',
+    sa.Column('scope', sa.String(length=100), nullable=False),
+    sa.Column('generation', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('scope')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cache_generations')
@@ -0,0 +1,44 @@
+"""add_spec_value_num
+
+Revision ID: d5a09b3c7e48
+Revises: c41d8e0f5a76
+Create Date: 2026-10-18 14:05:26.930175
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a09b3c7e48'
+down_revision: Union[str, Sequence[str], None] = 'c41d8e0f5a76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('part_specifications', sa.Column('spec_value_num', sa.DECIMAL(precision=18, scale=6), nullable=True))
+
+    # Заполняем число для существующих спецификаций
+    # (то же правило, что и part_repo.parse_spec_number)
+    op.execute(r"""
+        UPDATE part_specifications s SET spec_value_num = c.cleaned::numeric(18, 6)
+        FROM (
+            SELECT spec_id,
+                   replace(regexp_replace(spec_value, '[^0-9,.\-]', '', 'g'), ',', '.') AS cleaned
+            FROM part_specifications
+        ) c
+        WHERE c.spec_id = s.spec_id
+          AND c.cleaned ~ '^-?[0-9]{1,12}(\.[0-9]+)?$'
+    """)
+
+    op.create_index('ix_part_specifications_name_num', 'part_specifications', ['spec_name', 'spec_value_num', 'part_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_part_specifications_name_num', table_name='part_specifications')
+    op.drop_column('part_specifications', 'spec_value_num')
@@ -0,0 +1,49 @@
+"""add_lookup_indexes
+
+Revision ID: e2b6c9d04f31
+Revises: d5a09b3c7e48
+Create Date: 2026-10-18 14:38:11.604827
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6c9d04f31'
+down_revision: Union[str, Sequence[str], None] = 'd5a09b3c7e48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя индекса, таблица, колонки) — должны совпадать с Index(...) в models.py
+INDEXES = [
+    ('ix_cart_items_user_id_part_id', 'cart_items', ['user_id', 'part_id']),
+    ('ix_orders_user_id_order_date', 'orders', ['user_id', 'order_date']),
+    ('ix_orders_status', 'orders', ['status']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_car_orders_car_id', 'car_orders', ['car_id']),
+    ('ix_car_orders_order_id', 'car_orders', ['order_id']),
+    ('ix_part_specifications_part_id', 'part_specifications', ['part_id']),
+    ('ix_part_specifications_name_value', 'part_specifications', ['spec_name', 'spec_value']),
+    ('ix_images_car_id_sort_order', 'images', ['car_id', 'sort_order']),
+    ('ix_images_part_id_sort_order', 'images', ['part_id', 'sort_order']),
+    ('ix_parts_category_id', 'parts', ['category_id']),
+    ('ix_user_addresses_user_id_is_active', 'user_addresses', ['user_id', 'is_active']),
+    ('ix_pickup_points_location', 'pickup_points', ['country', 'region', 'city']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # settings.key уже покрыт уникальным индексом (UniqueConstraint)
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -21,12 +21,12 @@ depends_on: Union[str, Sequence[str], None] = None
 def upgrade() -> None:
     """Upgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_index(op.f('idx_car_orders_car_id'), table_name='car_orders')
-    op.drop_index(op.f('idx_car_orders_order_id'), table_name='car_orders')
-    op.drop_index(op.f('idx_pickup_points_active'), table_name='pickup_points')
-    op.drop_index(op.f('idx_pickup_points_city'), table_name='pickup_points')
-    op.drop_index(op.f('idx_pickup_points_country'), table_name='pickup_points')
-    op.drop_index(op.f('idx_pickup_points_region'), table_name='pickup_points')
+    op.drop_index(op.f('idx_car_orders_car_id'), table_name='car_orders', if_exists=True)
+    op.drop_index(op.f('idx_car_orders_order_id'), table_name='car_orders', if_exists=True)
+    op.drop_index(op.f('idx_pickup_points_active'), table_name='pickup_points', if_exists=True)
+    op.drop_index(op.f('idx_pickup_points_city'), table_name='pickup_points', if_exists=True)
+    op.drop_index(op.f('idx_pickup_points_country'), table_name='pickup_points', if_exists=True)
+    op.drop_index(op.f('idx_pickup_points_region'), table_name='pickup_points', if_exists=True)
     op.add_column('user_addresses', sa.Column('region', sa.String(length=100), nullable=True))
     op.add_column('user_addresses', sa.Column('entrance', sa.String(length=10), nullable=True))
     op.add_column('user_addresses', sa.Column('floor', sa.String(length=10), nullable=True))
@@ -0,0 +1,101 @@
+"""create_car_listings_table
+
+Revision ID: f8a31d6c0b52
+Revises: e2b6c9d04f31
+Create Date: 2026-10-18 15:21:09.418377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8a31d6c0b52'
+down_revision: Union[str, Sequence[str], None] = 'e2b6c9d04f31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('car_listings',
+    sa.Column('car_id', sa.Integer(), nullable=False),
+    sa.Column('trim_id', sa.Integer(), nullable=False),
+    sa.Column('vin', sa.String(length=17), nullable=False),
+    sa.Column('production_year', sa.Integer(), nullable=False),
+    sa.Column('condition', sa.String(length=20), nullable=False),
+    sa.Column('mileage', sa.Integer(), nullable=False),
+    sa.Column('color', sa.String(length=30), nullable=False),
+    sa.Column('price', sa.DECIMAL(precision=12, scale=2), nullable=True),
+    sa.Column('brand_name', sa.String(length=50), nullable=False),
+    sa.Column('model_name', sa.String(length=100), nullable=True),
+    sa.Column('trim_name', sa.String(length=100), nullable=True),
+    sa.Column('engine_volume', sa.DECIMAL(precision=3, scale=1), nullable=True),
+    sa.Column('engine_power', sa.Integer(), nullable=True),
+    sa.Column('engine_torque', sa.Integer(), nullable=True),
+    sa.Column('fuel_type', sa.String(length=20), nullable=True),
+    sa.Column('transmission', sa.String(length=20), nullable=True),
+    sa.Column('drive_type', sa.String(length=20), nullable=True),
+    sa.Column('body_type', sa.String(length=20), nullable=True),
+    sa.Column('primary_image_url', sa.String(length=500), nullable=True),
+    sa.Column('images', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'[]'::jsonb"), nullable=False),
+    sa.Column('is_visible', sa.Boolean(), nullable=False),
+    sa.Column('is_ordered', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['car_id'], ['cars.car_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('car_id')
+    )
+    op.create_index('ix_car_listings_is_visible_car_id', 'car_listings', ['is_visible', 'car_id'], unique=False)
+    op.create_index('ix_car_listings_vin_trgm', 'car_listings', ['vin'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'vin': 'gin_trgm_ops'})
+    op.create_index('ix_car_listings_model_name_trgm', 'car_listings', ['model_name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'model_name': 'gin_trgm_ops'})
+
+    # Заполняем витрину для уже существующих автомобилей
+    # (то же выражение, что и car_listing_repo._listing_source_select)
+    op.execute("""
+        INSERT INTO car_listings (
+            car_id, trim_id, vin, production_year, condition, mileage, color, price,
+            brand_name, model_name, trim_name, engine_volume, engine_power, engine_torque,
+            fuel_type, transmission, drive_type, body_type,
+            primary_image_url, images, is_visible, is_ordered, updated_at
+        )
+        SELECT
+            c.car_id, c.trim_id, c.vin, c.production_year, c.condition, c.mileage, c.color, c.price,
+            t.brand_name, t.model_name, t.trim_name, t.engine_volume, t.engine_power, t.engine_torque,
+            t.fuel_type, t.transmission, t.drive_type, t.body_type,
+            (
+                SELECT i.url FROM images i
+                WHERE i.car_id = c.car_id
+                ORDER BY i.sort_order, i.image_id
+                LIMIT 1
+            ),
+            coalesce((
+                SELECT jsonb_agg(
+                    jsonb_build_object('url', i.url, 'alt_text', i.alt_text, 'sort_order', i.sort_order)
+                    ORDER BY i.sort_order, i.image_id
+                )
+                FROM images i
+                WHERE i.car_id = c.car_id
+            ), '[]'::jsonb),
+            c.is_visible,
+            EXISTS (
+                SELECT 1 FROM car_orders co
+                JOIN orders o ON o.order_id = co.order_id
+                WHERE co.car_id = c.car_id AND o.status != 'Отменен'
+            ),
+            now()
+        FROM cars c
+        JOIN car_trims t ON t.trim_id = c.trim_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_car_listings_model_name_trgm', table_name='car_listings')
+    op.drop_index('ix_car_listings_vin_trgm', table_name='car_listings')
+    op.drop_index('ix_car_listings_is_visible_car_id', table_name='car_listings')
+    op.drop_table('car_listings')
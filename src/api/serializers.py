@@ -0,0 +1,272 @@
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from src.schemas.car import CarResponse, CarTrimOut
+from src.schemas.order import DeliveryInfoOut, OrderResponse
+from src.schemas.part import PartResponse
+
+# --- СЕРИАЛИЗАЦИЯ ОТВЕТОВ API ---
+# Эндпоинты без response_model FastAPI прогоняет через jsonable_encoder (обход
+# всего дерева на Python) и json.dumps. Горячие ответы собираются здесь в
+# словари схем src/schemas и кодируются заранее построенным TypeAdapter
+# прямо в байты (pydantic-core) — без валидации и промежуточных копий.
+
+PART_PLACEHOLDER_IMAGE = "/static/images/parts/base.png"
+CAR_PLACEHOLDER_IMAGE = "/static/images/cars/base.jpeg"
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse по умолчанию для приложения: кодирует через pydantic-core
+    вместо json.dumps. Формат тот же — компактный UTF-8 без экранирования.
+    """
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def typed_json_response(adapter: TypeAdapter, data: Any, status_code: int = 200) -> Response:
+    """
+    Готовый ответ по схеме: FastAPI отдаёт Response как есть, без jsonable_encoder.
+    """
+    return Response(content=adapter.dump_json(data), status_code=status_code, media_type="application/json")
+
+
+def enum_value(value: Any, default: Optional[str] = None) -> Optional[str]:
+    """
+    Значение ENUM-поля: в моделях часть полей — ENUM, часть — строки с его значением.
+    """
+    if value is None:
+        return default
+    return value.value if hasattr(value, "value") else str(value)
+
+
+def _image_to_dict(image) -> Dict:
+    return {"url": image.url, "alt_text": image.alt_text, "sort_order": image.sort_order}
+
+
+# --- АВТОМОБИЛИ ---
+def trim_to_dict(trim) -> CarTrimOut:
+    """
+    Комплектация со всеми характеристиками (карточка автомобиля, управление комплектациями).
+    """
+    return {
+        "trim_id": trim.trim_id,
+        "trim_name": trim.trim_name or None,
+        "brand_name": enum_value(trim.brand_name or None),
+        "model_name": trim.model_name or None,
+        "engine_volume": float(trim.engine_volume) if trim.engine_volume else None,
+        "engine_power": trim.engine_power or None,
+        "engine_torque": trim.engine_torque or None,
+        "fuel_type": enum_value(trim.fuel_type or None),
+        "transmission": enum_value(trim.transmission or None),
+        "drive_type": enum_value(trim.drive_type or None),
+        "body_type": enum_value(trim.body_type or None),
+        "doors": trim.doors or None,
+        "seats": trim.seats or None,
+    }
+
+
+def trim_option_to_dict(trim) -> Dict:
+    """
+    Комплектация для списка выбора: пустые строки вместо None и подпись display_name.
+    """
+    brand_name = enum_value(trim.brand_name, "")
+    return {
+        "trim_id": trim.trim_id,
+        "trim_name": trim.trim_name or "",
+        "brand_name": brand_name,
+        "model_name": trim.model_name or "",
+        "display_name": f"{brand_name} {trim.model_name or ''} {trim.trim_name or ''}".strip(),
+    }
+
+
+def car_detail_to_dict(car) -> CarResponse:
+    """
+    Карточка автомобиля (/api/cars/{car_id}): комплектация и вся галерея.
+    """
+    return {
+        "car_id": car.car_id,
+        "vin": car.vin,
+        "production_year": car.production_year,
+        "condition": enum_value(car.condition),
+        "mileage": car.mileage,
+        "color": car.color,
+        "price": float(car.price) if car.price else None,
+        "trim": trim_to_dict(car.trim),
+        "images": [_image_to_dict(img) for img in sorted(car.images or [], key=lambda x: x.sort_order)],
+    }
+
+
+# --- ЗАПЧАСТИ ---
+def part_detail_to_dict(part) -> PartResponse:
+    """
+    Карточка запчасти (/api/parts/{part_id}): категория, галерея и спецификации.
+    """
+    category = part.category
+    return {
+        "part_id": part.part_id,
+        "part_name": part.part_name,
+        "part_article": part.part_article,
+        "description": part.description,
+        "price": float(part.price) if part.price is not None else None,
+        "stock_count": part.stock_count,
+        "manufacturer": str(part.manufacturer) if part.manufacturer is not None else None,
+        "category": {
+            "category_id": category.category_id if category else None,
+            "category_name": category.category_name if category else None,
+            "parent_id": category.parent_id if category else None,
+        },
+        "images": [_image_to_dict(img) for img in sorted(part.images or [], key=lambda x: x.sort_order)],
+        "specifications": [
+            {"spec_name": s.spec_name, "spec_value": s.spec_value, "spec_unit": s.spec_unit}
+            for s in (part.specifications or [])
+            if (s.spec_name and s.spec_value)
+        ],
+    }
+
+
+# --- ПОЛЬЗОВАТЕЛИ ---
+def user_to_dict(user) -> Dict:
+    """
+    Профиль пользователя (личный кабинет, поиск и редактирование администратором).
+    """
+    return {
+        "user_id": user.user_id,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "middle_name": user.middle_name,
+        "phone_number": user.phone_number,
+        "role": enum_value(user.role),
+        "status": enum_value(user.status),
+        "registration_date": user.registration_date.isoformat() if user.registration_date else None,
+        "email_verified": user.email_verified,
+        "phone_verified": user.phone_verified,
+    }
+
+
+# --- ЗАКАЗЫ ---
+def delivery_info(order) -> Optional[DeliveryInfoOut]:
+    """
+    Куда доставить заказ: адрес доставки или пункт выдачи (нужны shipping_address и pickup_point).
+    """
+    if order.shipping_address:
+        addr = order.shipping_address
+        return {
+            "type": "address",
+            "full_address": f"{addr.country}" +
+                           (f", {addr.region}" if addr.region else "") +
+                           f", {addr.city}, {addr.street}, {addr.house}" +
+                           (f", кв. {addr.apartment}" if addr.apartment else "")
+        }
+    if order.pickup_point:
+        pp = order.pickup_point
+        return {
+            "type": "pickup",
+            "full_address": f"{pp.country}, {pp.region}, {pp.city}, {pp.street}, {pp.house}"
+        }
+    return None
+
+
+def order_payment_to_dict(order) -> Dict:
+    """
+    Сумма и статус оплаты заказа (страница оплаты). Нужны загруженные
+    order_items.part и car_orders.
+    """
+    items_total = sum(float(item.part.price) * item.quantity for item in order.order_items if item.part.price)
+    cars_total = sum(float(co.car_price) for co in order.car_orders if co.car_price)
+    total_amount = (
+        items_total + cars_total + float(order.service_fee or 0) + float(order.shipping_cost or 0)
+        - float(order.discount or 0)
+    )
+    return {
+        "order_id": order.order_id,
+        "total_amount": total_amount,
+        "is_paid": order.is_paid,
+        "payment_method": enum_value(order.payment_method),
+        "status": enum_value(order.status),
+    }
+
+
+def order_to_dict(
+    order,
+    part_images: Dict[int, Dict],
+    car_images: Dict[int, Dict],
+    management: bool = False,
+) -> OrderResponse:
+    """
+    Заказ для личного кабинета. Нужны загруженные order_items.part,
+    car_orders.car.trim, shipping_address и pickup_point; part_images / car_images —
+    главные фото (image_repo.get_primary_images).
+    management — добавить admin_notes и покупателя (нужен order.user).
+    """
+    # Сумма за товары (запчасти)
+    parts_total = 0.0
+    order_items_data = []
+    for item in order.order_items:
+        part_price = float(item.part.price)
+        item_total = part_price * item.quantity
+        parts_total += item_total
+        order_items_data.append({
+            "part_id": item.part_id,
+            "part_name": item.part.part_name,
+            "manufacturer": item.part.manufacturer,
+            "quantity": item.quantity,
+            "price": part_price,
+            "total": item_total,
+            "image": part_images[item.part_id]["url"] if item.part_id in part_images else PART_PLACEHOLDER_IMAGE
+        })
+
+    # Сумма за автомобили
+    cars_total = 0.0
+    car_orders_data = []
+    for car_order in order.car_orders:
+        car_price = float(car_order.car_price)
+        cars_total += car_price
+        car = car_order.car
+        car_orders_data.append({
+            "car_id": car_order.car_id,
+            "brand": enum_value(car.trim.brand_name or None, "—"),
+            "model": car.trim.model_name or "—",
+            "year": car.production_year or None,
+            "price": car_price,
+            "image": car_images[car.car_id]["url"] if car.car_id in car_images else CAR_PLACEHOLDER_IMAGE
+        })
+
+    total_amount = (
+        float(order.service_fee or 0) + float(order.shipping_cost or 0) - float(order.discount or 0)
+        + parts_total + cars_total
+    )
+
+    data: OrderResponse = {
+        "order_id": order.order_id,
+        "order_date": order.order_date.isoformat() if order.order_date else None,
+        "status": enum_value(order.status),
+        "status_updated": order.status_updated.isoformat() if order.status_updated else None,
+        "payment_method": enum_value(order.payment_method),
+        "is_paid": order.is_paid,
+        "service_fee": float(order.service_fee or 0),
+        "shipping_cost": float(order.shipping_cost or 0),
+        "discount": float(order.discount or 0),
+        "total_amount": total_amount,
+        "tracking_number": order.tracking_number,
+        "estimated_delivery": order.estimated_delivery.isoformat() if order.estimated_delivery else None,
+        "customer_notes": order.customer_notes,
+        "order_items": order_items_data,
+        "car_orders": car_orders_data,
+        "delivery_info": delivery_info(order),
+    }
+    if management:
+        data["admin_notes"] = order.admin_notes
+        data["user"] = {
+            "user_id": order.user.user_id,
+            "email": order.user.email,
+            "first_name": order.user.first_name,
+            "last_name": order.user.last_name,
+            "phone_number": order.user.phone_number
+        }
+    return data
@@ -22,7 +22,22 @@ from src.auth.jwt import get_current_user_from_cookie
 from src.database.models import User, Order, OrderItem, CarOrder, Part, Car, CarTrim, PickupPoint, UserAddress, UserRoleEnum, UserStatusEnum, OrderStatusEnum, Image, ConditionEnum, ColorEnum, CarBrandEnum, FuelTypeEnum, TransmissionEnum, DriveTypeEnum, BodyTypeEnum, PartCategory, PartSpecification, ManufacturerEnum
 from src.repositories.user_repo import update_user as update_user_in_repo, change_user_password, get_user_by_id
 from src.repositories.part_repo import get_categories_tree, get_specs_for_category, create_part, update_part
-from src.repositories.user_repo import get_user_by_id, get_user_by_email
+from src.repositories.category_tree import invalidate_category_tree
+from src.cache.generations import PARTS_SCOPE, part_detail_scope
+from src.cache.http import invalidate_responses
+from src.repositories.car_listing_repo import sync_car_listings
+from src.repositories.car_repo import release_cars, mark_cars_sold
+from src.repositories.inventory_repo import (
+    get_stock_movements, release_stock, replay_stock, set_stock, verify_stock
+)
+from src.repositories.image_repo import get_primary_images
+from src.repositories.order_repo import claim_order_cancellation, get_management_orders as get_management_orders_from_repo
+from src.services.passwords import verify_password
+from src.api.serializers import (
+    enum_value, order_to_dict, trim_option_to_dict, trim_to_dict, typed_json_response, user_to_dict,
+)
+from src.schemas.order import order_list_response_adapter
+from src.repositories.user_repo import get_user_by_id, get_user_by_email, invalidate_user_snapshots
 
 router = APIRouter(prefix="/account", tags=["account"])
 templates = Jinja2Templates(directory="src/templates")
@@ -34,10 +49,7 @@ def get_user_role_safe(user) -> str:
         return user.get("role", "")
     # Получаем role из объекта User
     role = user.role
-    # Если role - это enum, получаем его значение
-    if hasattr(role, 'value'):
-        return role.value
-    return str(role) if role else ""
+    return enum_value(role or None, "")
 
 
 @router.get("/")
@@ -55,19 +67,7 @@ async def get_profile(
     session: AsyncSession = Depends(get_async_session)
 ):
     """Получить информацию о профиле пользователя"""
-    return {
-        "user_id": current_user.user_id,
-        "email": current_user.email,
-        "first_name": current_user.first_name,
-        "last_name": current_user.last_name,
-        "middle_name": current_user.middle_name,
-        "phone_number": current_user.phone_number,
-        "role": current_user.role.value if hasattr(current_user.role, 'value') else str(current_user.role),
-        "status": current_user.status.value if hasattr(current_user.status, 'value') else str(current_user.status),
-        "registration_date": current_user.registration_date.isoformat() if current_user.registration_date else None,
-        "email_verified": current_user.email_verified,
-        "phone_verified": current_user.phone_verified
-    }
+    return user_to_dict(current_user)
 
 
 @router.get("/api/orders")
@@ -91,8 +91,7 @@ async def get_user_orders(
     result = await session.execute(
         select(Order)
         .options(
-            selectinload(Order.order_items).selectinload(OrderItem.part).selectinload(Part.images),
-            selectinload(Order.car_orders).selectinload(CarOrder.car).selectinload(Car.images),
+            selectinload(Order.order_items).selectinload(OrderItem.part),
             selectinload(Order.car_orders).selectinload(CarOrder.car).selectinload(Car.trim),
             selectinload(Order.pickup_point),
             selectinload(Order.shipping_address)
@@ -102,87 +101,16 @@ async def get_user_orders(
     )
     orders = result.scalars().all()
     
-    orders_data = []
-    for order in orders:
-        # Подсчитываем общую сумму заказа
-        total_amount = float(order.service_fee or 0) + float(order.shipping_cost or 0) - float(order.discount or 0)
-        
-        # Сумма за товары (запчасти)
-        parts_total = 0.0
-        order_items_data = []
-        for item in order.order_items:
-            part_price = float(item.part.price)
-            item_total = part_price * item.quantity
-            parts_total += item_total
-            order_items_data.append({
-                "part_id": item.part_id,
-                "part_name": item.part.part_name,
-                "manufacturer": item.part.manufacturer,
-                "quantity": item.quantity,
-                "price": part_price,
-                "total": item_total,
-                "image": item.part.images[0].url if item.part.images else "/static/images/parts/base.png"
-            })
-        
-        # Сумма за автомобили
-        cars_total = 0.0
-        car_orders_data = []
-        for car_order in order.car_orders:
-            car_price = float(car_order.car_price)
-            cars_total += car_price
-            car = car_order.car
-            brand = car.trim.brand_name.value if hasattr(car.trim.brand_name, 'value') else str(car.trim.brand_name) if car.trim.brand_name else "—"
-            model = car.trim.model_name if car.trim.model_name else "—"
-            year = car.production_year if car.production_year else None
-            car_orders_data.append({
-                "car_id": car_order.car_id,
-                "brand": brand,
-                "model": model,
-                "year": year,
-                "price": car_price,
-                "image": car.images[0].url if car.images else "/static/images/cars/base.jpeg"
-            })
-        
-        total_amount += parts_total + cars_total
-        
-        # Адрес доставки или пункт выдачи
-        delivery_info = None
-        if order.shipping_address:
-            addr = order.shipping_address
-            delivery_info = {
-                "type": "address",
-                "full_address": f"{addr.country}" + 
-                               (f", {addr.region}" if addr.region else "") + 
-                               f", {addr.city}, {addr.street}, {addr.house}" + 
-                               (f", кв. {addr.apartment}" if addr.apartment else "")
-            }
-        elif order.pickup_point:
-            pp = order.pickup_point
-            delivery_info = {
-                "type": "pickup",
-                "full_address": f"{pp.country}, {pp.region}, {pp.city}, {pp.street}, {pp.house}"
-            }
-        
-        orders_data.append({
-            "order_id": order.order_id,
-            "order_date": order.order_date.isoformat() if order.order_date else None,
-            "status": order.status.value if hasattr(order.status, 'value') else str(order.status),
-            "status_updated": order.status_updated.isoformat() if order.status_updated else None,
-            "payment_method": order.payment_method.value if hasattr(order.payment_method, 'value') else str(order.payment_method),
-            "is_paid": order.is_paid,
-            "service_fee": float(order.service_fee or 0),
-            "shipping_cost": float(order.shipping_cost or 0),
-            "discount": float(order.discount or 0),
-            "total_amount": total_amount,
-            "tracking_number": order.tracking_number,
-            "estimated_delivery": order.estimated_delivery.isoformat() if order.estimated_delivery else None,
-            "customer_notes": order.customer_notes,
-            "order_items": order_items_data,
-            "car_orders": car_orders_data,
-            "delivery_info": delivery_info
-        })
+    # Миниатюры — только главное фото каждой запчасти / автомобиля, одним запросом на тип
+    part_images = await get_primary_images(
+        session, Image.part_id, [item.part_id for order in orders for item in order.order_items]
+    )
+    car_images = await get_primary_images(
+        session, Image.car_id, [car_order.car_id for order in orders for car_order in order.car_orders]
+    )
     
-    return {"orders": orders_data}
+    orders_data = [order_to_dict(order, part_images, car_images) for order in orders]
+    return typed_json_response(order_list_response_adapter, {"orders": orders_data})
 
 
 class UpdateProfileRequest(BaseModel):
@@ -269,9 +197,8 @@ async def update_profile(
             raise HTTPException(status_code=400, detail="Для смены пароля необходимо указать текущий пароль")
         
         # Проверяем текущий пароль
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        if not pwd_context.verify(update_data.current_password, user.password_hash):
+        valid, _new_hash = await verify_password(update_data.current_password, user.password_hash)
+        if not valid:
             raise HTTPException(status_code=400, detail="Неверный текущий пароль")
         
         # Хешируем новый пароль
@@ -393,6 +320,7 @@ async def verify_code(
             .where(User.user_id == current_user.user_id)
             .values(phone_verified=True)
         )
+        await invalidate_user_snapshots(session)
         await session.commit()
         return {
             "success": True,
@@ -412,142 +340,20 @@ async def get_management_orders(
     if current_user.role not in [UserRoleEnum.MANAGER.value, UserRoleEnum.ADMIN.value]:
         raise HTTPException(status_code=403, detail="Доступ запрещен. Требуется роль менеджера или администратора.")
     
-    from sqlalchemy import case
-    
     # Для администраторов показываем все заказы, для менеджеров - только активные
     is_admin = current_user.role == UserRoleEnum.ADMIN.value
+    orders = await get_management_orders_from_repo(session, active_only=not is_admin)
     
-    # Создаем приоритеты для статусов: Отправлен (1) → В обработке (2) → Доставлен (3) → Отменен (4)
-    status_priority = case(
-        (Order.status == OrderStatusEnum.SHIPPED.value, 1),
-        (Order.status == OrderStatusEnum.PROCESSING.value, 2),
-        (Order.status == OrderStatusEnum.DELIVERED.value, 3),
-        (Order.status == OrderStatusEnum.CANCELLED.value, 4),
-        else_=5
+    # Миниатюры — только главное фото каждой запчасти / автомобиля, одним запросом на тип
+    part_images = await get_primary_images(
+        session, Image.part_id, [item.part_id for order in orders for item in order.order_items]
     )
-    
-    # Условия фильтрации
-    where_conditions = []
-    if not is_admin:
-        # Менеджеры видят только активные заказы
-        where_conditions.extend([
-            Order.status != OrderStatusEnum.DELIVERED.value,
-            Order.status != OrderStatusEnum.CANCELLED.value
-        ])
-    # Администраторы видят все заказы
-    
-    stmt = (
-        select(Order)
-        .options(
-            selectinload(Order.order_items).selectinload(OrderItem.part).selectinload(Part.images),
-            selectinload(Order.car_orders).selectinload(CarOrder.car).selectinload(Car.images),
-            selectinload(Order.car_orders).selectinload(CarOrder.car).selectinload(Car.trim),
-            selectinload(Order.pickup_point),
-            selectinload(Order.shipping_address),
-            selectinload(Order.user)
-        )
-    )
-    
-    if where_conditions:
-        stmt = stmt.where(*where_conditions)
-    
-    result = await session.execute(
-        stmt.order_by(status_priority.asc(), Order.order_date.desc())
+    car_images = await get_primary_images(
+        session, Image.car_id, [car_order.car_id for order in orders for car_order in order.car_orders]
     )
-    orders = result.scalars().all()
-    
-    orders_data = []
-    for order in orders:
-        # Подсчитываем общую сумму заказа
-        total_amount = float(order.service_fee or 0) + float(order.shipping_cost or 0) - float(order.discount or 0)
-        
-        # Сумма за товары (запчасти)
-        parts_total = 0.0
-        order_items_data = []
-        for item in order.order_items:
-            part_price = float(item.part.price)
-            item_total = part_price * item.quantity
-            parts_total += item_total
-            order_items_data.append({
-                "part_id": item.part_id,
-                "part_name": item.part.part_name,
-                "manufacturer": item.part.manufacturer,
-                "quantity": item.quantity,
-                "price": part_price,
-                "total": item_total,
-                "image": item.part.images[0].url if item.part.images else "/static/images/parts/base.png"
-            })
-        
-        # Сумма за автомобили
-        cars_total = 0.0
-        car_orders_data = []
-        for car_order in order.car_orders:
-            car_price = float(car_order.car_price)
-            cars_total += car_price
-            car = car_order.car
-            brand = car.trim.brand_name.value if hasattr(car.trim.brand_name, 'value') else str(car.trim.brand_name) if car.trim.brand_name else "—"
-            model = car.trim.model_name if car.trim.model_name else "—"
-            year = car.production_year if car.production_year else None
-            car_orders_data.append({
-                "car_id": car_order.car_id,
-                "brand": brand,
-                "model": model,
-                "year": year,
-                "price": car_price,
-                "image": car.images[0].url if car.images else "/static/images/cars/base.jpeg"
-            })
-        
-        total_amount += parts_total + cars_total
-        
-        # Адрес доставки или пункт выдачи
-        delivery_info = None
-        if order.shipping_address:
-            addr = order.shipping_address
-            delivery_info = {
-                "type": "address",
-                "full_address": f"{addr.country}" + 
-                               (f", {addr.region}" if addr.region else "") + 
-                               f", {addr.city}, {addr.street}, {addr.house}" + 
-                               (f", кв. {addr.apartment}" if addr.apartment else "")
-            }
-        elif order.pickup_point:
-            pp = order.pickup_point
-            delivery_info = {
-                "type": "pickup",
-                "full_address": f"{pp.country}, {pp.region}, {pp.city}, {pp.street}, {pp.house}"
-            }
-        
-        # Информация о пользователе
-        user_info = {
-            "user_id": order.user.user_id,
-            "email": order.user.email,
-            "first_name": order.user.first_name,
-            "last_name": order.user.last_name,
-            "phone_number": order.user.phone_number
-        }
-        
-        orders_data.append({
-            "order_id": order.order_id,
-            "order_date": order.order_date.isoformat() if order.order_date else None,
-            "status": order.status.value if hasattr(order.status, 'value') else str(order.status),
-            "status_updated": order.status_updated.isoformat() if order.status_updated else None,
-            "payment_method": order.payment_method.value if hasattr(order.payment_method, 'value') else str(order.payment_method),
-            "is_paid": order.is_paid,
-            "service_fee": float(order.service_fee or 0),
-            "shipping_cost": float(order.shipping_cost or 0),
-            "discount": float(order.discount or 0),
-            "total_amount": total_amount,
-            "tracking_number": order.tracking_number,
-            "estimated_delivery": order.estimated_delivery.isoformat() if order.estimated_delivery else None,
-            "customer_notes": order.customer_notes,
-            "admin_notes": order.admin_notes,
-            "order_items": order_items_data,
-            "car_orders": car_orders_data,
-            "delivery_info": delivery_info,
-            "user": user_info
-        })
     
-    return {"orders": orders_data}
+    orders_data = [order_to_dict(order, part_images, car_images, management=True) for order in orders]
+    return typed_json_response(order_list_response_adapter, {"orders": orders_data})
 
 
 class UpdateOrderStatusRequest(BaseModel):
@@ -613,30 +419,24 @@ async def update_order_status(
             if current_status != OrderStatusEnum.PROCESSING.value:
                 raise HTTPException(status_code=400, detail="Можно установить статус 'Отправлен' только для заказов со статусом 'В обработке'")
         
-        # Если отменяем заказ, возвращаем товары на склад и автомобили в список
+        # Если отменяем заказ, возвращаем товары на склад и автомобили в список.
+        # Переход занимается атомарно: из параллельных отмен склад вернёт только одна
         if status_data.status == OrderStatusEnum.CANCELLED.value:
+            if not await claim_order_cancellation(session, order_id):
+                raise HTTPException(status_code=400, detail="Нельзя изменить статус отмененного или доставленного заказа")
             if order.order_items:
-                from src.database.models import Part
-                for item in order.order_items:
-                    part_stmt = select(Part).where(Part.part_id == item.part_id)
-                    part_result = await session.execute(part_stmt)
-                    part = part_result.scalar_one_or_none()
-                    if part:
-                        new_stock = (part.stock_count or 0) + item.quantity
-                        await session.execute(
-                            update(Part)
-                            .where(Part.part_id == item.part_id)
-                            .values(stock_count=new_stock)
-                        )
+                await release_stock(
+                    session, [(item.part_id, item.quantity) for item in order.order_items],
+                    order_id=order.order_id, actor_id=current_user.user_id
+                )
             
-            # Возвращаем автомобили в список (делаем видимыми)
+            # Снимаем бронь с автомобилей — они снова в продаже
             if order.car_orders:
-                for car_order in order.car_orders:
-                    await session.execute(
-                        update(Car)
-                        .where(Car.car_id == car_order.car_id)
-                        .values(is_visible=True)
-                    )
+                await release_cars(session, [car_order.car_id for car_order in order.car_orders])
+        
+        # Доставленный заказ: автомобили проданы
+        if status_data.status == OrderStatusEnum.DELIVERED.value and order.car_orders:
+            await mark_cars_sold(session, [car_order.car_id for car_order in order.car_orders])
         
         update_values["status"] = status_data.status
     
@@ -652,11 +452,14 @@ async def update_order_status(
     if not update_values:
         raise HTTPException(status_code=400, detail="Не указано, что нужно обновить (status, is_paid или admin_notes)")
     
-    await session.execute(
-        update(Order)
-        .where(Order.order_id == order_id)
-        .values(**update_values)
-    )
+    stmt = update(Order).where(Order.order_id == order_id).values(**update_values)
+    # Переход статуса — только из прочитанного выше: параллельная отмена не перезаписывается
+    if status_data.status is not None and status_data.status != OrderStatusEnum.CANCELLED.value:
+        stmt = stmt.where(Order.status == order.status)
+    result = await session.execute(stmt)
+    if result.rowcount == 0:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail="Статус заказа изменился, обновите страницу")
     await session.commit()
     
     # Формируем сообщение об успехе
@@ -729,18 +532,7 @@ async def get_car_trims(
     result = await session.execute(stmt)
     trims = result.scalars().all()
     
-    trims_data = []
-    for trim in trims:
-        trim_data = {
-            "trim_id": trim.trim_id,
-            "trim_name": trim.trim_name if trim.trim_name else "",
-            "brand_name": trim.brand_name.value if hasattr(trim.brand_name, 'value') else str(trim.brand_name),
-            "model_name": trim.model_name if trim.model_name else "",
-            "display_name": f"{trim.brand_name.value if hasattr(trim.brand_name, 'value') else str(trim.brand_name)} {trim.model_name or ''} {trim.trim_name or ''}".strip()
-        }
-        trims_data.append(trim_data)
-    
-    return {"trims": trims_data}
+    return {"trims": [trim_option_to_dict(trim) for trim in trims]}
 
 
 @router.get("/api/car-trim/{trim_id}")
@@ -762,21 +554,7 @@ async def get_car_trim_detail(
     if not trim:
         raise HTTPException(status_code=404, detail="Комплектация не найдена")
     
-    return {
-        "trim_id": trim.trim_id,
-        "trim_name": trim.trim_name if trim.trim_name else None,
-        "brand_name": trim.brand_name.value if hasattr(trim.brand_name, 'value') else str(trim.brand_name),
-        "model_name": trim.model_name if trim.model_name else None,
-        "engine_volume": float(trim.engine_volume) if trim.engine_volume else None,
-        "engine_power": trim.engine_power if trim.engine_power else None,
-        "engine_torque": trim.engine_torque if trim.engine_torque else None,
-        "fuel_type": trim.fuel_type.value if hasattr(trim.fuel_type, 'value') else str(trim.fuel_type) if trim.fuel_type else None,
-        "transmission": trim.transmission.value if hasattr(trim.transmission, 'value') else str(trim.transmission) if trim.transmission else None,
-        "drive_type": trim.drive_type.value if hasattr(trim.drive_type, 'value') else str(trim.drive_type) if trim.drive_type else None,
-        "body_type": trim.body_type.value if hasattr(trim.body_type, 'value') else str(trim.body_type) if trim.body_type else None,
-        "doors": trim.doors if trim.doors else None,
-        "seats": trim.seats if trim.seats else None
-    }
+    return trim_to_dict(trim)
 
 
 class CreateCarRequest(BaseModel):
@@ -971,6 +749,7 @@ async def create_car(
             )
             session.add(img)
     
+    await sync_car_listings(session, [car.car_id])
     await session.commit()
     await session.refresh(car)
     
@@ -1171,6 +950,7 @@ async def create_part_category(
         parent_id=category_data.parent_id
     )
     session.add(category)
+    await invalidate_category_tree(session)
     await session.commit()
     await session.refresh(category)
     
@@ -1363,6 +1143,8 @@ async def create_part_endpoint(
         
         # Используем ID последней созданной категории
         final_category_id = current_parent_id
+        # Новые категории закоммитятся вместе с запчастью
+        await invalidate_category_tree(session)
     else:
         # Если новых категорий нет, проверяем, что указанная категория существует
         if part_data.category_id is None:
@@ -1409,7 +1191,8 @@ async def create_part_endpoint(
             session=session,
             part_data=part_dict,
             specifications=specifications,
-            image_urls=None  # Изображения добавим после перемещения файлов
+            image_urls=None,  # Изображения добавим после перемещения файлов
+            actor_id=current_user.user_id,
         )
         
         # Создаем папку для изображений запчасти
@@ -1458,6 +1241,9 @@ async def create_part_endpoint(
                             print(f"Ошибка перемещения файла {filename}: {e}")
                             pass
         
+        # Запчасть уже закоммичена в create_part: списки и карточку, собранные
+        # до появления фото, сбрасываем вместе с ними
+        await invalidate_responses(session, PARTS_SCOPE, part_detail_scope(part.part_id))
         await session.commit()
         
         return {
@@ -1492,31 +1278,85 @@ async def update_part_stock(
     if stock_data.stock_count < 0:
         raise HTTPException(status_code=400, detail="Количество на складе не может быть отрицательным")
     
-    # Проверяем, что запчасть существует
-    part_result = await session.execute(
-        select(Part).where(Part.part_id == part_id)
-    )
-    part = part_result.scalar_one_or_none()
-    if not part:
+    # Обновляем количество с записью корректировки в журнал склада
+    stock_count = await set_stock(session, part_id, stock_data.stock_count, actor_id=current_user.user_id)
+    if stock_count is None:
         raise HTTPException(status_code=404, detail="Запчасть не найдена")
-    
-    # Обновляем количество
-    part.stock_count = stock_data.stock_count
     await session.commit()
-    await session.refresh(part)
-    
-    # Сброс кэша
-    from src.repositories.part_repo import clear_parts_filters_cache
-    clear_parts_filters_cache()
     
     return {
         "success": True,
         "message": "Количество товара обновлено",
-        "part_id": part.part_id,
-        "stock_count": part.stock_count
+        "part_id": part_id,
+        "stock_count": stock_count
+    }
+
+
+@router.get("/api/parts/{part_id}/stock-movements")
+async def get_part_stock_movements(
+    part_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    before_id: Optional[int] = Query(None),
+    current_user: User = Depends(get_current_user_from_cookie),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Журнал движений товара по складу (только для менеджеров и администраторов)"""
+    if current_user.role not in [UserRoleEnum.MANAGER.value, UserRoleEnum.ADMIN.value]:
+        raise HTTPException(status_code=403, detail="Доступ запрещен. Требуется роль менеджера или администратора.")
+    
+    part = await session.get(Part, part_id)
+    if not part:
+        raise HTTPException(status_code=404, detail="Запчасть не найдена")
+    
+    movements = await get_stock_movements(session, part_id, limit=limit, before_id=before_id)
+    return {
+        "part_id": part_id,
+        "stock_count": part.stock_count or 0,
+        "movements": [
+            {
+                "movement_id": m.movement_id,
+                "delta": m.delta,
+                "reason": m.reason,
+                "order_id": m.order_id,
+                "actor_id": m.actor_id,
+                "created_at": m.created_at.isoformat() if m.created_at else None
+            }
+            for m in movements
+        ],
+        # Следующая страница: before_id = movement_id последней записи
+        "next_before_id": movements[-1].movement_id if len(movements) == limit else None
     }
 
 
+@router.get("/api/stock/verify")
+async def verify_stock_endpoint(
+    part_id: Optional[int] = Query(None),
+    current_user: User = Depends(get_current_user_from_cookie),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Сверка остатков с журналом склада (только для менеджеров и администраторов)"""
+    if current_user.role not in [UserRoleEnum.MANAGER.value, UserRoleEnum.ADMIN.value]:
+        raise HTTPException(status_code=403, detail="Доступ запрещен. Требуется роль менеджера или администратора.")
+    
+    mismatches = await verify_stock(session, [part_id] if part_id is not None else None)
+    return {"consistent": not mismatches, "mismatches": mismatches}
+
+
+@router.post("/api/stock/replay")
+async def replay_stock_endpoint(
+    part_id: Optional[int] = Query(None),
+    current_user: User = Depends(get_current_user_from_cookie),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Пересчитать остатки из журнала склада (только для администраторов)"""
+    if current_user.role != UserRoleEnum.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Доступ запрещен. Требуется роль администратора.")
+    
+    fixed = await replay_stock(session, [part_id] if part_id is not None else None)
+    await session.commit()
+    return {"success": True, "fixed": fixed}
+
+
 # ========== АДМИН-ПАНЕЛЬ: УПРАВЛЕНИЕ ПОЛЬЗОВАТЕЛЯМИ (только для администраторов) ==========
 
 class SearchUserRequest(BaseModel):
@@ -1547,19 +1387,7 @@ async def search_user(
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     
-    return {
-        "user_id": user.user_id,
-        "email": user.email,
-        "phone_number": user.phone_number,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "middle_name": user.middle_name,
-        "role": user.role.value if hasattr(user.role, 'value') else str(user.role),
-        "status": user.status.value if hasattr(user.status, 'value') else str(user.status),
-        "email_verified": user.email_verified,
-        "phone_verified": user.phone_verified,
-        "registration_date": user.registration_date.isoformat() if user.registration_date else None
-    }
+    return user_to_dict(user)
 
 
 class UpdateUserRequest(BaseModel):
@@ -1639,21 +1467,14 @@ async def update_user(
         # Используем функцию change_user_password для хеширования пароля
         await change_user_password(session, user_id, update_data.new_password)
     
+    await invalidate_user_snapshots(session)
     await session.commit()
     await session.refresh(user)
     
     return {
         "success": True,
         "message": "Данные пользователя обновлены",
-        "user": {
-            "user_id": user.user_id,
-            "email": user.email,
-            "phone_number": user.phone_number,
-            "email_verified": user.email_verified,
-            "phone_verified": user.phone_verified,
-            "role": user.role.value if hasattr(user.role, 'value') else str(user.role),
-            "status": user.status.value if hasattr(user.status, 'value') else str(user.status)
-        }
+        "user": user_to_dict(user)
     }
 
 
@@ -1680,6 +1501,7 @@ async def delete_user(
     
     # Удаляем пользователя (каскадное удаление обработается через relationships)
     await session.delete(user)
+    await invalidate_user_snapshots(session)
     await session.commit()
     
     return {
@@ -7,6 +7,7 @@ from src.database.database import get_async_session
 from src.auth.jwt import get_current_user_from_cookie
 from src.database.models import User, UserAddress, AddressTypeEnum
 from src.repositories.user_repo import get_user_addresses
+from src.api.serializers import enum_value
 
 router = APIRouter(prefix="/api/addresses", tags=["addresses"])
 
@@ -23,7 +24,7 @@ async def get_user_addresses_list(
     for addr in addresses:
         addresses_data.append({
             "address_id": addr.address_id,
-            "address_type": addr.address_type.value if hasattr(addr.address_type, 'value') else str(addr.address_type),
+            "address_type": enum_value(addr.address_type),
             "postal_code": addr.postal_code,
             "country": addr.country,
             "region": addr.region,
@@ -6,8 +6,9 @@ from fastapi.responses import RedirectResponse
 
 from src.database.database import get_async_session
 from src.schemas.user import UserCreate, UserLogin
-from src.repositories.user_repo import get_user_by_email, create_user
-from src.auth.jwt import create_access_token
+from src.repositories.user_repo import UserSnapshot, get_user_by_email, create_user
+from src.auth.jwt import create_access_token, get_current_user_from_cookie, user_token_claims
+from src.services.passwords import verify_password
 
 from typing import Annotated
 
@@ -93,17 +94,20 @@ async def login(
         raise HTTPException(status_code=401, detail="Ошибка сервера")
 
     # 2. Проверяем пароль
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    if not pwd_context.verify(password, user.password_hash):
+    valid, new_hash = await verify_password(password, user.password_hash)
+    if not valid:
         return templates.TemplateResponse(
             "auth/login.html",
             {"request": request, "error": "Неверный email или пароль"},
             status_code=401
         )
+    if new_hash:
+        # Хэш с устаревшими настройками (например, стоимостью bcrypt) — пересохраняем
+        user.password_hash = new_hash
+        await session.commit()
 
     # 3. Успешный вход — Генерируем токен и сохраняем в cookie
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data=user_token_claims(user))
     response = RedirectResponse(url="/", status_code=303)
     # Сохраняем токен в HTTP-only cookie для безопасности
     response.set_cookie(
@@ -127,35 +131,14 @@ async def logout(request: Request):
 
 @router.get("/me")
 async def get_current_user_info(
-    request: Request,
-    session: AsyncSession = Depends(get_async_session)
+    user: UserSnapshot = Depends(get_current_user_from_cookie)
 ):
     """Получает информацию о текущем пользователе"""
-    from src.repositories.user_repo import get_user_by_email
-    import jwt
-    from src.config import JWT_KEY
-    
-    token = request.cookies.get("access_token")
-    if not token:
-        raise HTTPException(status_code=401, detail="Не авторизован")
-    
-    try:
-        payload = jwt.decode(token, JWT_KEY, algorithms=["HS256"])
-        email = payload.get("sub")
-        if not email:
-            raise HTTPException(status_code=401, detail="Неверный токен")
-        
-        user = await get_user_by_email(session, email)
-        if not user:
-            raise HTTPException(status_code=401, detail="Пользователь не найден")
-        
-        return {
-            "user_id": user.user_id,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "middle_name": user.middle_name,
-            "role": user.role
-        }
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Неверный токен")
+    return {
+        "user_id": user.user_id,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "middle_name": user.middle_name,
+        "role": user.role
+    }
@@ -5,7 +5,7 @@ from fastapi.responses import JSONResponse
 
 from src.database.database import get_async_session
 from src.repositories.cart_repo import (
-    get_cart_items,
+    get_cart_rows,
     add_to_cart,
     update_cart_item_quantity,
     remove_from_cart,
@@ -34,28 +34,27 @@ async def get_cart(
     current_user: User = Depends(get_current_user_from_cookie)
 ):
     """Получает все товары в корзине пользователя"""
-    cart_items = await get_cart_items(session, current_user.user_id)
+    cart_rows = await get_cart_rows(session, current_user.user_id)
     
     items_data = []
     total_price = 0
     
-    for item in cart_items:
-        part = item.part
-        item_price = float(part.price) if part.price else 0
-        item_total = item_price * item.quantity
+    for row in cart_rows:
+        item_price = row.price or 0
+        item_total = item_price * row.quantity
         total_price += item_total
         
         items_data.append({
-            "cart_item_id": item.cart_item_id,
-            "part_id": part.part_id,
-            "part_name": part.part_name,
-            "part_article": part.part_article,
-            "manufacturer": str(part.manufacturer) if part.manufacturer else None,
+            "cart_item_id": row.cart_item_id,
+            "part_id": row.part_id,
+            "part_name": row.part_name,
+            "part_article": row.part_article,
+            "manufacturer": row.manufacturer,
             "price": item_price,
-            "quantity": item.quantity,
+            "quantity": row.quantity,
             "total": item_total,
-            "stock_count": part.stock_count,
-            "image": part.images[0].url if part.images else "/static/images/parts/base.png"
+            "stock_count": row.stock_count,
+            "image": row.image_url or "/static/images/parts/base.png"
         })
     
     return {
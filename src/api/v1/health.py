@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from src.auth.jwt import get_current_user_from_cookie
+from src.database.database import engine, pool_stats
+from src.database.models import User, UserRoleEnum
+from src.services import passwords
+
+
+async def require_manager(current_user: User = Depends(get_current_user_from_cookie)) -> User:
+    """Внутренние метрики воркера — только для менеджеров и администраторов"""
+    if current_user.role not in [UserRoleEnum.MANAGER.value, UserRoleEnum.ADMIN.value]:
+        raise HTTPException(status_code=403, detail="Доступ запрещен. Требуется роль менеджера или администратора.")
+    return current_user
+
+
+router = APIRouter(prefix="/api/health", tags=["health"], dependencies=[Depends(require_manager)])
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats():
+    """
+    Состояние пула соединений воркера: занятые, переполнение,
+    число выдач, таймауты и время получения соединения.
+    """
+    return pool_stats(engine)
+
+
+@router.get("/passwords")
+async def get_password_pool_stats():
+    """
+    Пул хэширования паролей: потоки, операции в работе и в очереди, отказы (503).
+    """
+    return passwords.stats()
@@ -1,32 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy import select, update
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from typing import Optional
-from io import BytesIO
-from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import os
-
-from src.database.database import get_async_session
+from datetime import date, datetime, time, timedelta
+
+from src.database.database import get_async_session, get_read_session
 from src.auth.jwt import get_current_user_from_cookie
-from src.database.models import User, Order, CarOrder, OrderItem, PaymentMethodEnum, UserAddress, AddressTypeEnum, UserStatusEnum, Car
-from src.repositories.car_repo import get_car_by_id
+from src.database.models import User, Order, CarOrder, OrderItem, PaymentMethodEnum, UserAddress, AddressTypeEnum, UserStatusEnum, Car, CarAvailabilityEnum
+from src.repositories.car_repo import get_car_by_id, reserve_car, release_cars
 from src.repositories.pickup_repo import get_pickup_point_by_id
 from src.repositories.settings_repo import get_setting_float
 from src.repositories.cart_repo import get_cart_items
 from src.repositories.user_repo import get_user_address_by_id
+from src.repositories.inventory_repo import InsufficientStockError, release_stock, reserve_stock
+from src.repositories.order_repo import claim_order_cancellation, get_paid_order_ids, receipt_load_options
+from src.services import receipts
+from src.api.serializers import order_payment_to_dict
+from src.services.receipt_export import stream_receipts_zip
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 templates = Jinja2Templates(directory="src/templates")
@@ -88,18 +82,7 @@ async def get_order(
     if not order:
         raise HTTPException(status_code=404, detail="Заказ не найден")
     
-    # Рассчитываем общую сумму
-    items_total = sum(float(item.part.price) * item.quantity for item in order.order_items if item.part.price)
-    cars_total = sum(float(co.car_price) for co in order.car_orders if co.car_price)
-    total_amount = items_total + cars_total + float(order.service_fee or 0) + float(order.shipping_cost or 0) - float(order.discount or 0)
-    
-    return {
-        "order_id": order.order_id,
-        "total_amount": total_amount,
-        "is_paid": order.is_paid,
-        "payment_method": order.payment_method.value if hasattr(order.payment_method, 'value') else str(order.payment_method),
-        "status": order.status.value if hasattr(order.status, 'value') else str(order.status)
-    }
+    return order_payment_to_dict(order)
 
 
 class PayOrderRequest(BaseModel):
@@ -169,13 +152,7 @@ async def get_order_receipt(
     stmt = (
         select(Order)
         .where(Order.order_id == order_id)
-        .options(
-            selectinload(Order.order_items).selectinload(OrderItem.part),
-            selectinload(Order.car_orders).selectinload(CarOrder.car).selectinload(Car.trim),
-            selectinload(Order.shipping_address),
-            selectinload(Order.pickup_point),
-            selectinload(Order.user)
-        )
+        .options(*receipt_load_options())
     )
     
     # Для обычных пользователей добавляем проверку на принадлежность заказа
@@ -191,249 +168,51 @@ async def get_order_receipt(
     if not order.is_paid:
         raise HTTPException(status_code=400, detail="Чек доступен только для оплаченных заказов")
     
-    # Регистрируем шрифт с поддержкой кириллицы
-    # Пытаемся использовать системный шрифт DejaVu Sans, если доступен
-    try:
-        # Попробуем найти DejaVu Sans в стандартных местах
-        font_paths = [
-            '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-            '/usr/share/fonts/TTF/DejaVuSans.ttf',
-            '/System/Library/Fonts/Helvetica.ttc',  # macOS
-            'C:/Windows/Fonts/arial.ttf',  # Windows
-        ]
-        bold_paths = [
-            '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
-            '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
-            '/System/Library/Fonts/Helvetica-Bold.ttc',  # macOS
-            'C:/Windows/Fonts/arialbd.ttf',  # Windows
-        ]
-        font_path = None
-        bold_font_path = None
-        for path in font_paths:
-            if os.path.exists(path):
-                font_path = path
-                break
-        
-        for path in bold_paths:
-            if os.path.exists(path):
-                bold_font_path = path
-                break
-        
-        if font_path:
-            pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
-            font_name = 'DejaVuSans'
-            if bold_font_path:
-                pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', bold_font_path))
-                font_bold = 'DejaVuSans-Bold'
-            else:
-                font_bold = 'DejaVuSans'  # Используем обычный шрифт для жирного
-        else:
-            # Если системный шрифт не найден, используем встроенный Helvetica
-            font_name = 'Helvetica'
-            font_bold = 'Helvetica-Bold'
-    except Exception as e:
-        # В случае ошибки используем стандартный шрифт
-        import logging
-        logging.getLogger(__name__).warning(f"Не удалось загрузить шрифт с поддержкой кириллицы: {e}")
-        font_name = 'Helvetica'
-        font_bold = 'Helvetica-Bold'
-    
-    # Создаем PDF в памяти
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=20*mm, leftMargin=20*mm, topMargin=20*mm, bottomMargin=20*mm)
-    story = []
-    
-    # Стили с поддержкой кириллицы
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontName=font_bold,
-        fontSize=18,
-        textColor=colors.HexColor('#0066cc'),
-        spaceAfter=12,
-        alignment=TA_CENTER
-    )
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontName=font_bold,
-        fontSize=14,
-        textColor=colors.HexColor('#333333'),
-        spaceAfter=8
+    # Оплаченный заказ не меняется: PDF рендерится один раз (в пуле процессов),
+    # повторные скачивания отдают файл из кэша
+    path = await receipts.get_receipt_path(receipts.receipt_data(order))
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=f"receipt_{order_id}.pdf",
     )
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontName=font_name,
-        fontSize=10
+
+
+@router.get("/api/receipts/export")
+async def export_receipts(
+    date_from: Optional[date] = Query(None, description="Заказы с этой даты (включительно)"),
+    date_to: Optional[date] = Query(None, description="Заказы по эту дату (включительно)"),
+    status: Optional[str] = Query(None, description="Статус заказа"),
+    current_user: User = Depends(get_current_user_from_cookie),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    ZIP с чеками оплаченных заказов за период и/или в статусе + summary.csv
+    (только для менеджеров и администраторов). Архив отдаётся потоком.
+    """
+    from src.database.models import OrderStatusEnum, UserRoleEnum
+
+    if current_user.role not in [UserRoleEnum.MANAGER.value, UserRoleEnum.ADMIN.value]:
+        raise HTTPException(status_code=403, detail="Доступ запрещен. Требуется роль менеджера или администратора.")
+    if date_from is None and date_to is None and status is None:
+        raise HTTPException(status_code=400, detail="Укажите период или статус заказов")
+    if status is not None and status not in [s.value for s in OrderStatusEnum]:
+        raise HTTPException(status_code=400, detail="Неверный статус заказа")
+
+    order_ids = await get_paid_order_ids(
+        session,
+        date_from=datetime.combine(date_from, time.min) if date_from else None,
+        date_to=datetime.combine(date_to + timedelta(days=1), time.min) if date_to else None,
+        status=status,
     )
-    
-    # Заголовок
-    story.append(Paragraph("ЧЕК О ПРОДАЖЕ", title_style))
-    story.append(Spacer(1, 12))
-    
-    # Информация о заказе
-    order_date = order.order_date.strftime("%d.%m.%Y %H:%M") if order.order_date else "—"
-    story.append(Paragraph(f"<b>Заказ №{order.order_id}</b>", heading_style))
-    story.append(Paragraph(f"Дата: {order_date}", normal_style))
-    story.append(Spacer(1, 6))
-    
-    # Информация о покупателе
-    user_name = f"{order.user.first_name or ''} {order.user.last_name or ''}".strip() or "Покупатель"
-    story.append(Paragraph(f"<b>Покупатель:</b> {user_name}", normal_style))
-    if order.user.email:
-        story.append(Paragraph(f"Email: {order.user.email}", normal_style))
-    if order.user.phone_number:
-        story.append(Paragraph(f"Телефон: {order.user.phone_number}", normal_style))
-    story.append(Spacer(1, 12))
-    
-    # Товары
-    story.append(Paragraph("<b>Товары:</b>", heading_style))
-    
-    # Подготавливаем данные для таблицы
-    table_data = [["Наименование", "Кол-во", "Цена", "Сумма"]]
-    
-    # Запчасти
-    for item in order.order_items:
-        part_name = item.part.part_name
-        manufacturer = item.part.manufacturer.value if hasattr(item.part.manufacturer, 'value') else str(item.part.manufacturer) if item.part.manufacturer else ""
-        full_name = f"{part_name}" + (f" ({manufacturer})" if manufacturer else "")
-        quantity = item.quantity
-        price = float(item.part.price) if item.part.price else 0
-        total = price * quantity
-        table_data.append([
-            full_name,
-            str(quantity),
-            f"{price:,.2f} ₽".replace(',', ' '),
-            f"{total:,.2f} ₽".replace(',', ' ')
-        ])
-    
-    # Автомобили
-    for car_order in order.car_orders:
-        car = car_order.car
-        if not car:
-            # Если автомобиль был удален, используем информацию из заказа
-            car_name = "Автомобиль (удален)"
-            price = float(car_order.car_price) if car_order.car_price else 0
-        elif not car.trim:
-            # Если комплектация была удалена, используем базовую информацию
-            car_name = f"Автомобиль ID: {car.car_id}"
-            if car.production_year:
-                car_name += f" ({car.production_year})"
-            price = float(car_order.car_price) if car_order.car_price else 0
-        else:
-            brand = car.trim.brand_name.value if hasattr(car.trim.brand_name, 'value') else str(car.trim.brand_name) if car.trim.brand_name else "—"
-            model = car.trim.model_name if car.trim.model_name else "—"
-            year = car.production_year if car.production_year else ""
-            car_name = f"{brand} {model}" + (f" {year}" if year else "")
-            price = float(car_order.car_price) if car_order.car_price else 0
-        
-        table_data.append([
-            car_name,
-            "1",
-            f"{price:,.2f} ₽".replace(',', ' '),
-            f"{price:,.2f} ₽".replace(',', ' ')
-        ])
-    
-    # Создаем таблицу с правильными ширинами колонок
-    # Ширина страницы A4: 210mm, отступы: 20mm слева и справа = 170mm доступно
-    # Распределяем: Наименование (90mm), Кол-во (15mm), Цена (32mm), Сумма (33mm)
-    table = Table(table_data, colWidths=[90*mm, 15*mm, 32*mm, 33*mm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-        ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
-        ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), font_bold),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('TOPPADDING', (0, 0), (-1, 0), 8),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), font_name),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9f9f9')]),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 1), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-    ]))
-    story.append(table)
-    story.append(Spacer(1, 12))
-    
-    # Итоги
-    items_total = sum(float(item.part.price) * item.quantity for item in order.order_items if item.part.price)
-    cars_total = sum(float(co.car_price) for co in order.car_orders if co.car_price)
-    service_fee = float(order.service_fee or 0)
-    shipping_cost = float(order.shipping_cost or 0)
-    discount = float(order.discount or 0)
-    total_amount = items_total + cars_total + service_fee + shipping_cost - discount
-    
-    totals_data = []
-    if items_total + cars_total > 0:
-        totals_data.append(["Сумма товаров:", f"{items_total + cars_total:,.2f} ₽".replace(',', ' ')])
-    # Всегда показываем сервисный сбор и доставку, даже если они равны 0
-    totals_data.append(["Сервисный сбор:", f"{service_fee:,.2f} ₽".replace(',', ' ')])
-    totals_data.append(["Доставка:", f"{shipping_cost:,.2f} ₽".replace(',', ' ')])
-    if discount > 0:
-        totals_data.append(["Скидка:", f"-{discount:,.2f} ₽".replace(',', ' ')])
-    # Для итоговой строки используем обычный текст, жирный шрифт применится через стиль
-    totals_data.append(["ИТОГО:", f"{total_amount:,.2f} ₽".replace(',', ' ')])
-    
-    # Ширина страницы A4: 210mm, отступы: 20mm слева и справа = 170mm доступно
-    # Для таблицы итогов используем всю доступную ширину
-    totals_table = Table(totals_data, colWidths=[120*mm, 50*mm])
-    totals_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -2), font_name),
-        ('FONTSIZE', (0, 0), (-1, -2), 10),
-        ('FONTNAME', (0, -1), (-1, -1), font_bold),
-        ('FONTSIZE', (0, -1), (-1, -1), 12),
-        ('TOPPADDING', (0, -1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, -1), (-1, -1), 8),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-    ]))
-    story.append(totals_table)
-    story.append(Spacer(1, 12))
-    
-    # Способ оплаты и доставки
-    payment_method_map = {
-        "CARD": "Банковская карта",
-        "CASH": "Наличные",
-        "ONLINE": "Онлайн оплата"
-    }
-    payment_method = payment_method_map.get(order.payment_method.value if hasattr(order.payment_method, 'value') else str(order.payment_method), str(order.payment_method))
-    story.append(Paragraph(f"<b>Способ оплаты:</b> {payment_method}", normal_style))
-    
-    if order.shipping_address:
-        addr = order.shipping_address
-        address = f"{addr.country}" + (f", {addr.region}" if addr.region else "") + f", {addr.city}, {addr.street}, {addr.house}" + (f", кв. {addr.apartment}" if addr.apartment else "")
-        story.append(Paragraph(f"<b>Адрес доставки:</b> {address}", normal_style))
-    elif order.pickup_point:
-        pp = order.pickup_point
-        address = f"{pp.country}, {pp.region}, {pp.city}, {pp.street}, {pp.house}"
-        story.append(Paragraph(f"<b>Пункт выдачи:</b> {address}", normal_style))
-    
-    story.append(Spacer(1, 12))
-    story.append(Paragraph(f"<i>Чек сгенерирован: {datetime.now().strftime('%d.%m.%Y %H:%M')}</i>", normal_style))
-    
-    # Собираем PDF
-    doc.build(story)
-    buffer.seek(0)
-    
-    # Возвращаем PDF как ответ
-    return Response(
-        content=buffer.getvalue(),
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="receipt_{order_id}.pdf"'
-        }
+    if not order_ids:
+        raise HTTPException(status_code=404, detail="Оплаченных заказов по заданным условиям нет")
+
+    period = f"{date_from or ''}_{date_to or ''}".strip("_") or "all"
+    return StreamingResponse(
+        stream_receipts_zip(order_ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="receipts_{period}.zip"'},
     )
 
 
@@ -470,39 +249,22 @@ async def cancel_order(
     if order.status == OrderStatusEnum.CANCELLED.value:
         raise HTTPException(status_code=400, detail="Заказ уже отменен")
     
-    # Возвращаем товары на склад (вручную обновляем stock_count, не удаляя order_items для истории)
+    # Отменяем заказ (order_items остаются для истории заказа). Статус выше прочитан
+    # без блокировки: из параллельных отмен склад вернёт только та, что заняла переход
+    if not await claim_order_cancellation(session, order_id, current_user.user_id):
+        raise HTTPException(status_code=400, detail="Заказ уже отменен или доставлен")
+    
+    # Возвращаем товары на склад (order_items остаются для истории)
     if order.order_items:
-        from src.database.models import Part
-        for item in order.order_items:
-            # Получаем текущее количество на складе
-            part_stmt = select(Part).where(Part.part_id == item.part_id)
-            part_result = await session.execute(part_stmt)
-            part = part_result.scalar_one_or_none()
-            if part:
-                # Увеличиваем количество на складе на количество из отмененного заказа
-                new_stock = (part.stock_count or 0) + item.quantity
-                await session.execute(
-                    update(Part)
-                    .where(Part.part_id == item.part_id)
-                    .values(stock_count=new_stock)
-                )
-    
-    # Возвращаем автомобили в список (делаем видимыми)
+        await release_stock(
+            session, [(item.part_id, item.quantity) for item in order.order_items],
+            order_id=order.order_id, actor_id=current_user.user_id
+        )
+    
+    # Снимаем бронь с автомобилей — они снова в продаже
     if order.car_orders:
-        from src.database.models import Car
-        for car_order in order.car_orders:
-            await session.execute(
-                update(Car)
-                .where(Car.car_id == car_order.car_id)
-                .values(is_visible=True)
-            )
+        await release_cars(session, [car_order.car_id for car_order in order.car_orders])
     
-    # Отменяем заказ (order_items остаются для истории заказа)
-    await session.execute(
-        update(Order)
-        .where(Order.order_id == order_id)
-        .values(status=OrderStatusEnum.CANCELLED.value)
-    )
     await session.commit()
     
     # Формируем сообщение
@@ -565,8 +327,8 @@ async def car_order_page(
             status_code=404
         )
     
-    # Проверяем видимость автомобиля
-    if not car.is_visible:
+    # Проверяем, что автомобиль в продаже
+    if not car.is_visible or car.availability != CarAvailabilityEnum.AVAILABLE.value:
         return templates.TemplateResponse(
             "error.html",
             {
@@ -611,8 +373,8 @@ async def create_car_order(
     if not car:
         raise HTTPException(status_code=404, detail="Автомобиль не найден")
     
-    # Проверяем видимость автомобиля
-    if not car.is_visible:
+    # Проверяем, что автомобиль в продаже (окончательно — при бронировании ниже)
+    if not car.is_visible or car.availability != CarAvailabilityEnum.AVAILABLE.value:
         raise HTTPException(status_code=400, detail="Автомобиль недоступен для заказа")
     
     if not car.price:
@@ -657,6 +419,10 @@ async def create_car_order(
         customer_notes=order_data.customer_notes,
         is_paid=False  # Всегда создаем неоплаченным, оплата происходит отдельно
     )
+    # Бронируем автомобиль условным UPDATE: из одновременных заказов проходит один
+    if not await reserve_car(session, car.car_id):
+        raise HTTPException(status_code=409, detail="Автомобиль уже заказан")
+    
     session.add(order)
     await session.flush()  # Получаем order_id
     
@@ -668,13 +434,6 @@ async def create_car_order(
     )
     session.add(car_order)
     
-    # Помечаем автомобиль как невидимый (скрываем из списка)
-    await session.execute(
-        update(Car)
-        .where(Car.car_id == car.car_id)
-        .values(is_visible=False)
-    )
-    
     await session.commit()
     await session.refresh(order)
     
@@ -859,6 +618,17 @@ async def create_part_order(
     session.add(order)
     await session.flush()  # Получаем order_id
     
+    # Списываем товары со склада — все позиции или ни одной
+    try:
+        await reserve_stock(
+            session, [(item.part_id, item.quantity) for item in cart_items],
+            order_id=order.order_id, actor_id=current_user.user_id
+        )
+    except InsufficientStockError as e:
+        names = {item.part_id: item.part.part_name for item in cart_items}
+        details = ", ".join(f"{names[part_id]} (в наличии: {available} шт.)" for part_id, available in e.shortages.items())
+        raise HTTPException(status_code=409, detail=f"Недостаточно товара на складе: {details}")
+    
     # Создаём записи о заказанных товарах
     for cart_item in cart_items:
         order_item = OrderItem(
@@ -1,32 +1,71 @@
-from fastapi import APIRouter, Query, Depends, HTTPException
+from fastapi import APIRouter, Query, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Dict, Union, List
 import json
 
-from src.database.database import get_async_session
+from src.database.database import get_read_session
 from src.repositories.part_repo import (
-    search_and_filter_parts,
+    search_and_filter_parts_page,
     get_categories_tree,
     is_leaf_category,
     get_filters_config_for_category,
+    get_parts_facets,
     get_part_by_id,
+    part_list_item_to_dict,
 )
+from src.repositories.category_tree import CATEGORIES_SCOPE
+from src.cache.generations import part_detail_scope
+from src.cache.http import cached_json_response
+from src.api.serializers import part_detail_to_dict, typed_json_response
+from src.schemas.part import part_list_response_adapter, part_response_adapter
 
 router = APIRouter(prefix="/parts", tags=["parts"])
 
+
+def _parse_specs_filter(specs: Optional[str]) -> Optional[Dict[str, Union[str, List[str]]]]:
+    """
+    Разбирает параметр specs (JSON) в фильтр спецификаций.
+    """
+    if not specs:
+        return None
+    try:
+        parsed = json.loads(specs)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Некорректный JSON в параметре specs")
+    if not isinstance(parsed, dict):
+        return None
+    # Границы диапазонов — числа: иначе build_spec_condition упадёт на float()
+    for spec_name, spec_values in parsed.items():
+        if isinstance(spec_values, dict):
+            for bound in ("min", "max"):
+                value = spec_values.get(bound)
+                if value is None:
+                    continue
+                try:
+                    float(value)
+                except (TypeError, ValueError):
+                    raise HTTPException(
+                        status_code=400, detail=f"Граница {bound} для '{spec_name}' должна быть числом"
+                    )
+    return parsed
+
+
 @router.get("/categories")
-async def parts_categories(session: AsyncSession = Depends(get_async_session)):
+async def parts_categories(request: Request, session: AsyncSession = Depends(get_read_session)):
     """
     Дерево категорий/подкатегорий для фильтра.
     """
-    tree = await get_categories_tree(session)
-    return {"categories": tree}
+    async def build():
+        tree = await get_categories_tree(session)
+        return {"categories": tree}
+
+    return await cached_json_response(request, session, "parts:categories", (CATEGORIES_SCOPE,), build)
 
 
 @router.get("/specs-meta")
 async def parts_specs_meta(
     category_id: int = Query(..., ge=1),
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """
     Метаданные фильтров по спецификациям.
@@ -39,114 +78,89 @@ async def parts_specs_meta(
     return {"category_id": category_id, "filters": config}
 
 
+@router.get("/facets")  # /api/parts/facets
+async def parts_facets(
+    query: str = Query(""),
+    category_id: Optional[int] = Query(default=None, ge=1),
+    specs: Optional[str] = Query(default=None, description="JSON, как в /api/parts/"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Счётчики для фильтров при текущем поиске и фильтрах:
+    по значениям спецификаций (для leaf категории), по производителям и общий итог.
+    """
+    specs_filter = _parse_specs_filter(specs)
+    return await get_parts_facets(
+        session=session,
+        query=query if query else None,
+        category_id=category_id,
+        specs_filter=specs_filter,
+    )
+
+
 @router.get("/{part_id}")  # /api/parts/{part_id}
 async def get_part_detail(
     part_id: int,
-    session: AsyncSession = Depends(get_async_session),
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
 ):
     """
     Получить одну запчасть с фото, категорией и спецификациями.
     """
-    part = await get_part_by_id(session, part_id)
-    if not part:
-        raise HTTPException(status_code=404, detail="Запчасть не найдена")
-
-    return {
-        "part_id": part.part_id,
-        "part_name": part.part_name,
-        "part_article": part.part_article,
-        "description": part.description,
-        "price": float(part.price) if part.price is not None else None,
-        "stock_count": part.stock_count,
-        "manufacturer": str(part.manufacturer) if part.manufacturer is not None else None,
-        "category": {
-            "category_id": part.category.category_id if part.category else None,
-            "category_name": part.category.category_name if part.category else None,
-            "parent_id": part.category.parent_id if part.category else None,
-        },
-        "images": [
-            {"url": img.url, "alt_text": img.alt_text, "sort_order": img.sort_order}
-            for img in sorted(part.images or [], key=lambda x: x.sort_order)
-        ],
-        "specifications": [
-            {"spec_name": s.spec_name, "spec_value": s.spec_value, "spec_unit": s.spec_unit}
-            for s in (part.specifications or [])
-            if (s.spec_name and s.spec_value)
-        ],
-    }
+    async def build():
+        part = await get_part_by_id(session, part_id)
+        if not part:
+            raise HTTPException(status_code=404, detail="Запчасть не найдена")
+
+        return part_detail_to_dict(part)
+
+    # Своё поколение у каждой карточки; категория входит в ответ — и дерево категорий
+    return await cached_json_response(
+        request, session, f"parts:detail:{part_id}", (part_detail_scope(part_id), CATEGORIES_SCOPE), build,
+        adapter=part_response_adapter,
+    )
 
 
 @router.get("/")  # /api/parts/
 async def get_parts(
     offset: int = Query(default=0, ge=0),
     limit: int = Query(default=12, ge=1, le=50),
+    cursor: Optional[str] = Query(default=None, description="next_cursor из предыдущего ответа; с ним offset не используется"),
     query: str = Query(""),
     category_id: Optional[int] = Query(default=None, ge=1),
     specs: Optional[str] = Query(default=None, description="JSON: {\"SpecName\": [\"Value1\", ...] } or {\"SpecName\": \"Value\"}"),
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """
     Получить список запчастей с пагинацией и (опционально) текстовым поиском.
     Фильтры: category_id (включая подкатегории) и specs (JSON).
     """
-    specs_filter: Optional[Dict[str, Union[str, List[str]]]] = None
-    if specs:
-        try:
-            parsed = json.loads(specs)
-            if isinstance(parsed, dict):
-                specs_filter = parsed
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=400, detail="Некорректный JSON в параметре specs")
+    specs_filter = _parse_specs_filter(specs)
 
     category_ids = [category_id] if category_id else None
 
-    parts = await search_and_filter_parts(
-        session=session,
-        query=query if query else None,
-        category_ids=category_ids,
-        specs_filter=specs_filter,
-        limit=limit,
-        offset=offset,
-    )
-    next_batch = await search_and_filter_parts(
-        session=session,
-        query=query if query else None,
-        category_ids=category_ids,
-        specs_filter=specs_filter,
-        limit=limit,
-        offset=offset + limit,
-    )
-    has_more = len(next_batch) > 0
-
-    parts_data = []
-    for part in parts:
-        parts_data.append(
-            {
-                "part_id": part.part_id,
-                "part_name": part.part_name,
-                "part_article": part.part_article,
-                "description": part.description,
-                "price": float(part.price) if part.price is not None else None,
-                "stock_count": part.stock_count,
-                "manufacturer": str(part.manufacturer) if part.manufacturer is not None else None,
-                "category": {
-                    "category_id": part.category.category_id if part.category else None,
-                    "category_name": part.category.category_name if part.category else None,
-                    "parent_id": part.category.parent_id if part.category else None,
-                },
-                "images": [
-                    {"url": img.url, "alt_text": img.alt_text, "sort_order": img.sort_order}
-                    for img in sorted(part.images or [], key=lambda x: x.sort_order)
-                ],
-            }
+    try:
+        page = await search_and_filter_parts_page(
+            session=session,
+            query=query if query else None,
+            category_ids=category_ids,
+            specs_filter=specs_filter,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    parts_data = [part_list_item_to_dict(part) for part in page.items]
 
-    return {
+    return typed_json_response(part_list_response_adapter, {
         "parts": parts_data,
         "offset": offset,
         "limit": limit,
-        "has_more": has_more,
+        "has_more": page.has_more,
+        "next_cursor": page.next_cursor,
         "total": len(parts_data),
-    }
+    })
 
 
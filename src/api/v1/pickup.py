@@ -2,7 +2,7 @@ from fastapi import APIRouter, Query, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from src.database.database import get_async_session
+from src.database.database import get_read_session
 from src.repositories.pickup_repo import (
     get_countries,
     get_regions,
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/api/pickup", tags=["pickup"])
 
 
 @router.get("/countries")
-async def get_pickup_countries(session: AsyncSession = Depends(get_async_session)):
+async def get_pickup_countries(session: AsyncSession = Depends(get_read_session)):
     """Получает список всех стран с пунктами выдачи"""
     countries = await get_countries(session)
     return {"countries": countries}
@@ -24,7 +24,7 @@ async def get_pickup_countries(session: AsyncSession = Depends(get_async_session
 @router.get("/regions")
 async def get_pickup_regions(
     country: str = Query(..., description="Название страны"),
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Получает список областей/регионов для указанной страны"""
     regions = await get_regions(session, country)
@@ -35,7 +35,7 @@ async def get_pickup_regions(
 async def get_pickup_cities(
     country: str = Query(..., description="Название страны"),
     region: str = Query(..., description="Название области/региона"),
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Получает список городов для указанной страны и области"""
     cities = await get_cities(session, country, region)
@@ -47,7 +47,7 @@ async def get_pickup_points_list(
     country: str = Query(..., description="Название страны"),
     region: str = Query(..., description="Название области/региона"),
     city: str = Query(..., description="Название города"),
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Получает список пунктов выдачи для указанной страны, области и города"""
     points = await get_pickup_points(session, country, region, city)
@@ -70,7 +70,7 @@ async def get_pickup_points_list(
 @router.get("/point/{pickup_point_id}")
 async def get_pickup_point(
     pickup_point_id: int,
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Получает информацию о пункте выдачи по ID"""
     point = await get_pickup_point_by_id(session, pickup_point_id)
@@ -7,7 +7,7 @@ from fastapi.security import OAuth2PasswordBearer
 
 from src.config import JWT_KEY
 from src.database.database import get_async_session
-from src.repositories.user_repo import get_user_by_email
+from src.repositories.user_repo import UserSnapshot, get_user_snapshot
 from src.database.models import User
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -30,85 +30,89 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return jwt.encode(to_encode, JWT_KEY, algorithm=ALGORITHM)
 
 
+def user_token_claims(user: User) -> dict:
+    """
+    Claims токена пользователя: email (sub), user_id, роль и статус на момент входа.
+    Права проверяются по снимку пользователя (get_user_snapshot), а не по claims.
+    """
+    return {"sub": user.email, "uid": user.user_id, "role": user.role, "status": user.status}
+
+
+# --- ТЕКУЩИЙ ПОЛЬЗОВАТЕЛЬ ---
+# Пользователь определяется один раз за запрос (request.state), снимок берётся
+# из кэша процесса по user_id из токена. Без токена БД не используется.
+
+_ANONYMOUS = object()
+
+
+async def _resolve_user(request: Request, session: AsyncSession, token: Optional[str]) -> Optional[UserSnapshot]:
+    """
+    Пользователь по токену или None (нет токена, токен неверный, пользователя нет).
+    """
+    cached = getattr(request.state, "current_user", None)
+    if cached is not None:
+        return None if cached is _ANONYMOUS else cached
+
+    user = None
+    if token:
+        try:
+            payload = jwt.decode(token, JWT_KEY, algorithms=[ALGORITHM])
+        except jwt.PyJWTError:
+            payload = {}
+        user_id, email = payload.get("uid"), payload.get("sub")
+        if isinstance(user_id, int):
+            user = await get_user_snapshot(session, user_id=user_id)
+        elif email:
+            # Токены, выданные до появления uid
+            user = await get_user_snapshot(session, email=email)
+
+    request.state.current_user = user if user is not None else _ANONYMOUS
+    return user
+
+
 async def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_async_session)
-) -> dict:
+) -> UserSnapshot:
     """
     Получает текущего пользователя из токена.
     Используется как зависимость.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Не удалось проверить учётные данные",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, JWT_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except jwt.PyJWTError:
-        raise credentials_exception
-
-    user = await get_user_by_email(session, email=email)
+    user = await _resolve_user(request, session, token)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Не удалось проверить учётные данные",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 
 async def get_current_user_from_cookie(
     request: Request,
     session: AsyncSession = Depends(get_async_session)
-):
+) -> UserSnapshot:
     """
     Получает текущего пользователя из cookie (для веб-интерфейса).
     Используется как зависимость для роутеров, которые работают с cookie.
     """
-    
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Не авторизован",
-    )
-    
-    token = request.cookies.get("access_token")
-    if not token:
-        raise credentials_exception
-    
-    try:
-        payload = jwt.decode(token, JWT_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except jwt.PyJWTError:
-        raise credentials_exception
-    
-    user = await get_user_by_email(session, email=email)
+    user = await _resolve_user(request, session, request.cookies.get("access_token"))
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Не авторизован",
+        )
     return user
 
 
 async def get_optional_user_from_cookie(
     request: Request,
     session: AsyncSession = Depends(get_async_session)
-) -> Optional[User]:
+) -> Optional[UserSnapshot]:
     """
     Получает текущего пользователя из cookie (для веб-интерфейса).
     Возвращает None, если пользователь не авторизован (не выбрасывает исключение).
     Используется для опциональной авторизации.
     """
-    token = request.cookies.get("access_token")
-    if not token:
-        return None
-    
-    try:
-        payload = jwt.decode(token, JWT_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-    except jwt.PyJWTError:
-        return None
-    
-    user = await get_user_by_email(session, email=email)
-    return user
+    return await _resolve_user(request, session, request.cookies.get("access_token"))
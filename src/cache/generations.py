@@ -0,0 +1,137 @@
+import logging
+import time
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.config import CACHE_GENERATIONS_POLL_INTERVAL
+from src.database.models import CacheGeneration
+
+logger = logging.getLogger(__name__)
+
+
+# --- ПОКОЛЕНИЯ КЭША ---
+# Счётчик поколения на каждую область (scope) хранится в таблице cache_generations.
+# Запись увеличивает его в той же транзакции, что и изменение данных; ключи кэша
+# включают поколение, поэтому после commit все воркеры перестают видеть старые
+# записи (не позже чем через CACHE_GENERATIONS_POLL_INTERVAL секунд).
+#
+# Поколения хранятся отдельно для каждого движка (основная БД / реплика):
+# реплика видит новое поколение только вместе с данными, которые его увеличили,
+# поэтому ответ, собранный по отстающей реплике, не попадает в кэш под новым ключом.
+#
+# Частые короткие изменения (склад) увеличивают поколения после commit, отдельной
+# транзакцией (defer_generations): строки cache_generations не блокируются на всё
+# время транзакции изменения.
+
+_LOCAL: Dict[Any, Dict[str, int]] = {}  # движок -> {область: поколение}
+_LAST_POLL: Dict[Any, float] = {}
+
+
+# Области ответов каталога (src/cache/http.py): любые изменения автомобилей;
+# запчасти — списки и ленты (PARTS_SCOPE) отдельно от карточек (part_detail_scope)
+CARS_SCOPE = "cars"
+PARTS_SCOPE = "parts"
+
+
+def parts_category_scope(category_id: int) -> str:
+    return f"parts:{category_id}"
+
+
+def part_detail_scope(part_id: int) -> str:
+    return f"parts:detail:{part_id}"
+
+
+async def _poll(session: AsyncSession, source: Any) -> None:
+    result = await session.execute(select(CacheGeneration.scope, CacheGeneration.generation))
+    fresh = {scope: generation for scope, generation in result.fetchall()}
+    _LOCAL[source] = fresh
+    _LAST_POLL[source] = time.monotonic()
+
+
+async def get_generation(session: AsyncSession, scope: str) -> int:
+    """
+    Текущее поколение области. Таблица перечитывается целиком (она маленькая)
+    не чаще раза в CACHE_GENERATIONS_POLL_INTERVAL секунд.
+    """
+    source = session.sync_session.bind
+    if time.monotonic() - _LAST_POLL.get(source, 0.0) >= CACHE_GENERATIONS_POLL_INTERVAL:
+        await _poll(session, source)
+    return _LOCAL.get(source, {}).get(scope, 0)
+
+
+async def bump_generations(session: AsyncSession, scopes: Iterable[str]) -> Dict[str, int]:
+    """
+    Увеличивает поколения областей в текущей транзакции одним запросом
+    (commit — за вызывающим). Строки блокируются в порядке имени области.
+    """
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return {}
+    stmt = (
+        insert(CacheGeneration)
+        .values([{"scope": scope, "generation": 1} for scope in scopes])
+        .on_conflict_do_update(
+            index_elements=[CacheGeneration.scope],
+            set_={"generation": CacheGeneration.generation + 1},
+        )
+        .returning(CacheGeneration.scope, CacheGeneration.generation)
+    )
+    bumped = {scope: generation for scope, generation in (await session.execute(stmt)).all()}
+    session.info.setdefault("bumped_generations", {}).update(bumped)
+    return bumped
+
+
+async def bump_generation(session: AsyncSession, scope: str) -> int:
+    """
+    Увеличивает поколение области в текущей транзакции (commit — за вызывающим).
+    """
+    return (await bump_generations(session, [scope]))[scope]
+
+
+def defer_generations(session: AsyncSession, scopes: Iterable[str]) -> None:
+    """
+    Увеличить поколения областей после commit текущей транзакции — отдельной
+    транзакцией (bump_deferred_generations, вызывает AppSession.commit).
+    До этого ответы собираются уже по новым данным под старым ключом — это безопасно.
+    """
+    session.info.setdefault("deferred_generations", set()).update(scopes)
+
+
+async def bump_deferred_generations(session: AsyncSession) -> None:
+    """
+    Отложенные поколения — короткой транзакцией сразу после commit данных.
+    Ошибка не отменяет изменение: старые ответы доживут до TTL кэша.
+    """
+    scopes = session.info.pop("deferred_generations", None)
+    if not scopes:
+        return
+    try:
+        await bump_generations(session, scopes)
+        await session.commit()
+    except Exception:
+        logger.exception("Не удалось увеличить поколения кэша: %s", sorted(scopes))
+        await session.rollback()
+
+
+# Этот воркер видит новое поколение сразу после commit, не дожидаясь опроса.
+# До commit нельзя: параллельный запрос закэшировал бы старые данные под новым ключом.
+@event.listens_for(Session, "after_commit")
+def _apply_bumped_generations(session: Session) -> None:
+    bumped = session.info.pop("bumped_generations", None)
+    if bumped:
+        local = _LOCAL.setdefault(session.bind, {})
+        for scope, generation in bumped.items():
+            local[scope] = max(local.get(scope, 0), generation)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bumped_generations(session: Session) -> None:
+    # Откат точки сохранения (begin_nested) — внешняя транзакция ещё может закоммитить
+    if session.in_nested_transaction():
+        return
+    session.info.pop("bumped_generations", None)
+    session.info.pop("deferred_generations", None)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache.generations import bump_generations, defer_generations, get_generation
+from src.cache.lru import TTLCache
+from src.config import RESPONSE_CACHE_MAX_AGE, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+
+
+# --- HTTP-КЭШ ОТВЕТОВ КАТАЛОГА ---
+# Ответ хранится готовыми байтами JSON под ключом (ключ ответа, поколения областей).
+# ETag строится из тех же поколений, поэтому If-None-Match проверяется без запросов
+# к данным: повторный визит и ревалидация CDN получают 304 без тела.
+# Запись в каталог увеличивает поколение области (invalidate_responses) —
+# во всех воркерах меняются и ключ, и ETag.
+
+_RESPONSE_CACHE: TTLCache[Tuple[str, bytes]] = TTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+def render_json(content: Any, adapter: Optional[TypeAdapter] = None) -> bytes:
+    # Ответ по схеме (src/schemas) кодирует её TypeAdapter, без jsonable_encoder
+    if adapter is not None:
+        return adapter.dump_json(content)
+    # Те же параметры, что у fastapi.responses.JSONResponse
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def etag_for(data: bytes) -> str:
+    """
+    Сильный ETag: хэш переданных байтов (тела ответа или версии данных).
+    """
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # Для If-None-Match допустимо слабое сравнение (RFC 9110, 13.1.2)
+        if candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def cached_json_response(
+    request: Request,
+    session: AsyncSession,
+    key: str,
+    scopes: Sequence[str],
+    build: Callable[[], Awaitable[Any]],
+    max_age: int = RESPONSE_CACHE_MAX_AGE,
+    adapter: Optional[TypeAdapter] = None,
+) -> Response:
+    """
+    JSON-ответ с ETag / 304 и серверным кэшем байтов.
+
+    key — уникален для эндпоинта и его параметров; scopes — области поколений,
+    от которых зависит ответ. Без scopes (статичные данные) ETag — хэш тела.
+    build вызывается только при промахе кэша; HTTPException из него не кэшируется.
+    adapter — TypeAdapter схемы ответа, которым кодируется результат build.
+    """
+    versions = tuple([await get_generation(session, scope) for scope in scopes])
+    cache_key = (key, versions)
+
+    entry = _RESPONSE_CACHE.get(cache_key)
+    if entry is None and scopes:
+        etag = etag_for(f"{key}|{versions}".encode())
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified_response(etag, max_age)
+
+    if entry is None:
+        # Поколения прочитаны до построения: если данные изменят во время него,
+        # следующий запрос увидит новое поколение и построит ответ заново
+        body = render_json(await build(), adapter)
+        entry = (etag if scopes else etag_for(body), body)
+        _RESPONSE_CACHE.set(cache_key, entry)
+
+    return bytes_response(request, entry[0], entry[1], max_age)
+
+
+def not_modified_response(etag: str, max_age: int = RESPONSE_CACHE_MAX_AGE) -> Response:
+    return Response(status_code=304, headers=_cache_headers(etag, max_age))
+
+
+def bytes_response(
+    request: Request,
+    etag: str,
+    body: bytes,
+    max_age: int = RESPONSE_CACHE_MAX_AGE,
+) -> Response:
+    """
+    Готовое JSON-тело с ETag; 304 без тела, если клиент прислал тот же ETag.
+    """
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified_response(etag, max_age)
+    return Response(content=body, media_type="application/json", headers=_cache_headers(etag, max_age))
+
+
+def _cache_headers(etag: str, max_age: int) -> dict:
+    return {"ETag": etag, "Cache-Control": f"public, max-age={max_age}, must-revalidate"}
+
+
+async def invalidate_responses(session: AsyncSession, *scopes: str) -> None:
+    """
+    Сбрасывает закэшированные ответы областей во всех воркерах.
+    Вызывать в транзакции изменения, до commit.
+    """
+    await bump_generations(session, scopes)
+
+
+def invalidate_responses_after_commit(session: AsyncSession, *scopes: str) -> None:
+    """
+    Как invalidate_responses, но поколения увеличиваются после commit, отдельной
+    транзакцией: для частых изменений, которые не должны держать блокировку
+    на строках cache_generations (остатки на складе).
+    """
+    defer_generations(session, scopes)
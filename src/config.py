@@ -4,6 +4,8 @@ import os
 
 import secrets
 
+import tempfile
+
 load_dotenv()
 
 JWT_KEY = os.getenv('JWT_KEY')
@@ -14,4 +16,50 @@ DB_PORT = os.getenv('DB_PORT')
 DB_NAME = os.getenv('DB_NAME')
 
 DB_USER = os.getenv('DB_USER')
-DB_PASS = os.getenv('DB_PASS')
\ No newline at end of file
+DB_PASS = os.getenv('DB_PASS')
+
+# Кэши каталога (размер в записях, TTL и период опроса поколений — в секундах)
+PARTS_SPECS_CACHE_SIZE = int(os.getenv('PARTS_SPECS_CACHE_SIZE', '512'))
+PARTS_CACHE_TTL = float(os.getenv('PARTS_CACHE_TTL', '600'))
+CACHE_GENERATIONS_POLL_INTERVAL = float(os.getenv('CACHE_GENERATIONS_POLL_INTERVAL', '2'))
+
+# HTTP-кэш ответов каталога: размер (записей), TTL на сервере и max-age для клиентов/CDN (секунды)
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '1024'))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '300'))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv('RESPONSE_CACHE_MAX_AGE', '30'))
+
+# Лента главной страницы: сколько позиций и период полной пересборки (секунды)
+HOME_FEED_SIZE = int(os.getenv('HOME_FEED_SIZE', '3'))
+HOME_FEED_REFRESH_INTERVAL = float(os.getenv('HOME_FEED_REFRESH_INTERVAL', '300'))
+
+# Подключение к БД: пул (размер, переполнение, ожидание и пересоздание соединений — секунды),
+# проверка соединения перед выдачей, кэш подготовленных запросов asyncpg
+# (0 — за PgBouncer в режиме transaction), statement_timeout на сервере (мс, 0 — без ограничения)
+DB_ECHO = os.getenv('DB_ECHO', 'false').lower() in ('1', 'true', 'yes')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '256'))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))
+
+# Реплика для чтения каталога (DSN postgresql+asyncpg://...; пусто — читаем из основной БД)
+# и окно "читаю свои записи": столько секунд после изменения запросы пользователя идут в основную БД
+DB_REPLICA_URL = os.getenv('DB_REPLICA_URL', '')
+READ_YOUR_WRITES_WINDOW = float(os.getenv('READ_YOUR_WRITES_WINDOW', '5'))
+
+# Кэш пользователей для авторизации: размер (записей) и время жизни снимка (секунды)
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '4096'))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '30'))
+
+# Хэширование паролей: стоимость bcrypt, потоки пула и сколько операций может ждать
+# в очереди (сверх — 503 без ожидания)
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', '16'))
+
+# PDF-чеки: процессы рендеринга, каталог кэша готовых чеков и размер пачки заказов при выгрузке архивом
+RECEIPT_RENDER_WORKERS = int(os.getenv('RECEIPT_RENDER_WORKERS', '2'))
+RECEIPT_CACHE_DIR = os.getenv('RECEIPT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'autoshop-receipts'))
+RECEIPT_EXPORT_BATCH_SIZE = int(os.getenv('RECEIPT_EXPORT_BATCH_SIZE', '50'))
@@ -1,20 +1,164 @@
-import asyncio
-from typing import AsyncGenerator
+import time
+from typing import AsyncGenerator, Dict
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Request, Response
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from src.config import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER
+from src.cache.generations import bump_deferred_generations
+from src.config import (
+    DB_ECHO,
+    DB_HOST,
+    DB_MAX_OVERFLOW,
+    DB_NAME,
+    DB_PASS,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_PORT,
+    DB_REPLICA_URL,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_STATEMENT_TIMEOUT_MS,
+    DB_USER,
+    READ_YOUR_WRITES_WINDOW,
+)
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True, # Все запросы в консоль выводить
-    # pool_size=5, # Максимальное кол-во подключений к базе данных
-    # max_overflow=10, # Доп. подключения
+
+# --- ПУЛ СОЕДИНЕНИЙ ---
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул, который считает выдачи соединений, время их получения
+    и таймауты ожидания (pool_timeout). Счётчики — для /api/health/db-pool.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        # Время выдачи: ожидание свободного соединения (+ pre-ping или новое соединение)
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def stats(self) -> Dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+def create_engine(url: str = DATABASE_URL, **overrides) -> AsyncEngine:
+    """
+    Движок с настройками пула и соединений из src/config.py (переменные окружения DB_*).
+    overrides — параметры create_async_engine поверх настроек по умолчанию.
+    """
+    connect_args = {
+        # Кэш подготовленных запросов: слой SQLAlchemy и сам asyncpg
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {
+            "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS),
+            "application_name": "autoshop",
+        },
+    }
+    options = dict(
+        echo=DB_ECHO,
+        poolclass=MonitoredQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args,
     )
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    options.update(overrides)
+    return create_async_engine(url, **options)
+
+
+def pool_stats(engine: AsyncEngine) -> Dict:
+    pool = engine.sync_engine.pool
+    if isinstance(pool, MonitoredQueuePool):
+        return pool.stats()
+    return {"status": pool.status()}
+
+
+class AppSession(AsyncSession):
+    """
+    Сессия основной БД: после commit увеличивает отложенные поколения кэша
+    (src/cache/generations.py, defer_generations).
+    """
+    async def commit(self) -> None:
+        await super().commit()
+        await bump_deferred_generations(self)
+
+
+engine = create_engine()
+async_session_maker = async_sessionmaker(engine, class_=AppSession, expire_on_commit=False)
+
+# Реплика для чтения; без DB_REPLICA_URL — тот же движок, что и для записи
+read_engine = create_engine(DB_REPLICA_URL) if DB_REPLICA_URL else engine
+async_read_session_maker = async_sessionmaker(read_engine, expire_on_commit=False)
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+# --- ЧТЕНИЕ С РЕПЛИКИ ---
+# После изменения (любой успешный не-GET запрос) пользователь READ_YOUR_WRITES_WINDOW
+# секунд читает из основной БД: cookie с моментом окончания окна ставит
+# mark_primary_sticky (middleware в src/main.py). Остальные — с реплики.
+
+PRIMARY_STICKY_COOKIE = "db_primary_until"
+
+
+def mark_primary_sticky(response: Response) -> None:
+    if read_engine is engine:
+        return
+    until = time.time() + READ_YOUR_WRITES_WINDOW
+    response.set_cookie(
+        PRIMARY_STICKY_COOKIE,
+        f"{until:.3f}",
+        max_age=max(int(READ_YOUR_WRITES_WINDOW), 1),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _is_primary_sticky(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_STICKY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия только для чтения: реплика, а в окне "читаю свои записи" — основная БД.
+    Не использовать для изменений.
+    """
+    maker = async_session_maker if _is_primary_sticky(request) else async_read_session_maker
+    async with maker() as session:
+        yield session
@@ -5,13 +5,17 @@ from sqlalchemy import (
     TIMESTAMP,
     Boolean,
     Integer, 
+    BigInteger,
     MetaData, 
     ForeignKey, 
     String,
     Text, 
     DECIMAL,
-    func
+    Index,
+    func,
+    text
 )
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 
 from typing import List, Optional
 
@@ -106,6 +110,19 @@ class OrderStatusEnum(Enum):
     DELIVERED = "Доставлен"
     CANCELLED = "Отменен"
 
+# Доступность автомобиля для заказа
+class CarAvailabilityEnum(Enum):
+    AVAILABLE = "В продаже"
+    RESERVED = "Забронирован"  # есть активный (не отменённый и не доставленный) заказ
+    SOLD = "Продан"
+
+# Причины движения товара по складу
+class StockMovementReasonEnum(Enum):
+    INITIAL = "Начальный остаток"
+    ADJUSTMENT = "Корректировка"
+    ORDER = "Заказ"
+    CANCELLATION = "Отмена заказа"
+
 # Роли пользователей
 class UserRoleEnum(Enum):
     CUSTOMER = "Покупатель"
@@ -142,6 +159,13 @@ class Base(DeclarativeBase):
 # Таблица с автомобильными частями
 class Part(Base):
     __tablename__ = 'parts'
+    __table_args__ = (
+        Index('ix_parts_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_parts_part_article_trgm', 'part_article', postgresql_using='gin', postgresql_ops={'part_article': 'gin_trgm_ops'}),
+        # Keyset-пагинация списка: (в наличии, part_id) по убыванию
+        Index('ix_parts_listing_order', text('(stock_count > 0)'), 'part_id'),
+        Index('ix_parts_category_id', 'category_id'),
+    )
 
     part_id: Mapped[intpk]
     part_name: Mapped[str] = mapped_column(String(50))
@@ -154,6 +178,9 @@ class Part(Base):
     manufacturer: Mapped[ManufacturerEnum] = mapped_column(String(50))                              # Производитель 
     
     category_id: Mapped[int] = mapped_column(ForeignKey('part_categories.category_id'))             # id категориии
+
+    # Поисковый документ (название, артикул, производитель, спецификации), обновляется в part_repo
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, nullable=True, deferred=True)
     
     # Связь с таблицей категорий
     category: Mapped['PartCategory'] = relationship('PartCategory', back_populates="part") 
@@ -174,12 +201,19 @@ class Part(Base):
 # Таблица спецификаций запчастей
 class PartSpecification(Base):
     __tablename__ = 'part_specifications'
+    __table_args__ = (
+        # Диапазонные фильтры: spec_name = ? AND spec_value_num BETWEEN ? AND ?
+        Index('ix_part_specifications_name_num', 'spec_name', 'spec_value_num', 'part_id'),
+        Index('ix_part_specifications_part_id', 'part_id'),
+        Index('ix_part_specifications_name_value', 'spec_name', 'spec_value'),
+    )
 
     spec_id: Mapped[intpk]
     part_id: Mapped[int] = mapped_column(ForeignKey('parts.part_id', ondelete="CASCADE"))  # Внешний ключ с таблицей запчастей
     spec_name: Mapped[str] = mapped_column(String(50))
     spec_value: Mapped[str] = mapped_column(String(100))               # Значение спецификации
     spec_unit: Mapped[str] = mapped_column(String(20), nullable=True)  # Единица измерения
+    spec_value_num: Mapped[float] = mapped_column(DECIMAL(18, 6), nullable=True)  # Число из spec_value (part_repo.parse_spec_number)
     
     # Связь с таблицей запчастей
     part: Mapped['Part'] = relationship('Part', back_populates='specifications')
@@ -187,6 +221,10 @@ class PartSpecification(Base):
 # Таблица категорий запчастей
 class PartCategory(Base):
     __tablename__ = 'part_categories'
+    __table_args__ = (
+        # Рекурсивное раскрытие поддерева идёт по parent_id
+        Index('ix_part_categories_parent_id', 'parent_id'),
+    )
 
     category_id: Mapped[intpk]
     category_name: Mapped[str] = mapped_column(String(50))
@@ -210,6 +248,12 @@ class PartCategory(Base):
 # Таблица автомобилей
 class Car(Base):
     __tablename__ = "cars"
+    __table_args__ = (
+        Index('ix_cars_vin_trgm', 'vin', postgresql_using='gin', postgresql_ops={'vin': 'gin_trgm_ops'}),
+        # Keyset-пагинация списка: (is_visible, car_id) по убыванию
+        Index('ix_cars_is_visible_car_id', 'is_visible', 'car_id'),
+        Index('ix_cars_availability', 'availability'),
+    )
     
     car_id: Mapped[intpk]
     trim_id: Mapped[int] = mapped_column(ForeignKey("car_trims.trim_id"))
@@ -220,6 +264,10 @@ class Car(Base):
     color: Mapped[ColorEnum] = mapped_column(String(30))
     price: Mapped[float] = mapped_column(DECIMAL(12, 2), nullable=True)  # цена для продажи
     is_visible: Mapped[bool] = mapped_column(Boolean, default=True)  # видимость в списке
+    # Меняется только условным UPDATE (car_repo.reserve_car / release_cars / mark_cars_sold)
+    availability: Mapped[CarAvailabilityEnum] = mapped_column(
+        String(20), default=CarAvailabilityEnum.AVAILABLE.value, server_default=CarAvailabilityEnum.AVAILABLE.value
+    )
     
     # Связь с таблицей комплектаций
     trim: Mapped["CarTrim"] = relationship("CarTrim", back_populates="cars")
@@ -234,9 +282,54 @@ class Car(Base):
     # Связь с заказами
     car_orders: Mapped[List["CarOrder"]] = relationship("CarOrder", back_populates="car")
 
+# Витрина списка автомобилей (read model): автомобиль + комплектация + фото + флаги в одной строке.
+# Поддерживается car_listing_repo.sync_car_listings в тех же транзакциях, что меняют
+# cars / car_trims / images / заказы автомобилей.
+class CarListing(Base):
+    __tablename__ = "car_listings"
+    __table_args__ = (
+        # Keyset-пагинация списка: (is_visible, car_id) по убыванию
+        Index('ix_car_listings_is_visible_car_id', 'is_visible', 'car_id'),
+        # Список для покупателей: availability = 'В продаже' AND is_visible, по car_id
+        Index('ix_car_listings_availability_is_visible_car_id', 'availability', 'is_visible', 'car_id'),
+        Index('ix_car_listings_vin_trgm', 'vin', postgresql_using='gin', postgresql_ops={'vin': 'gin_trgm_ops'}),
+        Index('ix_car_listings_model_name_trgm', 'model_name', postgresql_using='gin', postgresql_ops={'model_name': 'gin_trgm_ops'}),
+    )
+
+    car_id: Mapped[int] = mapped_column(ForeignKey("cars.car_id", ondelete="CASCADE"), primary_key=True)
+    trim_id: Mapped[int] = mapped_column(Integer)
+    vin: Mapped[str] = mapped_column(String(17))
+    production_year: Mapped[int] = mapped_column(Integer)
+    condition: Mapped[str] = mapped_column(String(20))
+    mileage: Mapped[int] = mapped_column(Integer)
+    color: Mapped[str] = mapped_column(String(30))
+    price: Mapped[float] = mapped_column(DECIMAL(12, 2), nullable=True)
+
+    brand_name: Mapped[str] = mapped_column(String(50))
+    model_name: Mapped[str] = mapped_column(String(100), nullable=True)
+    trim_name: Mapped[str] = mapped_column(String(100), nullable=True)
+    engine_volume: Mapped[float] = mapped_column(DECIMAL(3, 1), nullable=True)
+    engine_power: Mapped[int] = mapped_column(Integer, nullable=True)
+    engine_torque: Mapped[int] = mapped_column(Integer, nullable=True)
+    fuel_type: Mapped[str] = mapped_column(String(20), nullable=True)
+    transmission: Mapped[str] = mapped_column(String(20), nullable=True)
+    drive_type: Mapped[str] = mapped_column(String(20), nullable=True)
+    body_type: Mapped[str] = mapped_column(String(20), nullable=True)
+
+    primary_image_url: Mapped[str] = mapped_column(String(500), nullable=True)
+    images: Mapped[list] = mapped_column(JSONB, server_default=text("'[]'::jsonb"))  # [{"url", "alt_text", "sort_order"}] по sort_order
+
+    is_visible: Mapped[bool] = mapped_column(Boolean)
+    availability: Mapped[str] = mapped_column(String(20))
+
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+
 # Таблица комплектаций авто
 class CarTrim(Base):
     __tablename__ = "car_trims"
+    __table_args__ = (
+        Index('ix_car_trims_model_name_trgm', 'model_name', postgresql_using='gin', postgresql_ops={'model_name': 'gin_trgm_ops'}),
+    )
     
     trim_id: Mapped[intpk]
     trim_name: Mapped[str] = mapped_column(String(100), nullable=True)
@@ -286,6 +379,9 @@ class User(Base):
 # Адреса пользователей
 class UserAddress(Base):
     __tablename__ = "user_addresses"
+    __table_args__ = (
+        Index('ix_user_addresses_user_id_is_active', 'user_id', 'is_active'),
+    )
     
     address_id: Mapped[intpk]
     user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"))
@@ -317,6 +413,10 @@ class UserAddress(Base):
 # Таблица заказов пользователей
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index('ix_orders_user_id_order_date', 'user_id', 'order_date'),
+        Index('ix_orders_status', 'status'),
+    )
     
     order_id: Mapped[intpk]
     user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"))
@@ -348,6 +448,9 @@ class Order(Base):
 # Таблица заказанных предметов
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        Index('ix_order_items_order_id', 'order_id'),
+    )
     
     order_item_id: Mapped[intpk]
     order_id: Mapped[int] = mapped_column(ForeignKey("orders.order_id"))
@@ -362,6 +465,10 @@ class OrderItem(Base):
 # Таблица заказанных автомобилей
 class CarOrder(Base):
     __tablename__ = "car_orders"
+    __table_args__ = (
+        Index('ix_car_orders_car_id', 'car_id'),
+        Index('ix_car_orders_order_id', 'order_id'),
+    )
     
     car_order_id: Mapped[intpk]
     order_id: Mapped[int] = mapped_column(ForeignKey("orders.order_id", ondelete="CASCADE"))
@@ -377,6 +484,10 @@ class CarOrder(Base):
 # Таблица изображений
 class Image(Base):
     __tablename__ = "images"
+    __table_args__ = (
+        Index('ix_images_car_id_sort_order', 'car_id', 'sort_order'),
+        Index('ix_images_part_id_sort_order', 'part_id', 'sort_order'),
+    )
 
     image_id: Mapped[intpk]
     url: Mapped[str] = mapped_column(String(500))       # полный путь: /static/images/cars/1/car_1_1.jpg
@@ -395,6 +506,9 @@ class Image(Base):
 # Таблица пунктов выдачи (для самовывоза автомобилей)
 class PickupPoint(Base):
     __tablename__ = "pickup_points"
+    __table_args__ = (
+        Index('ix_pickup_points_location', 'country', 'region', 'city'),
+    )
     
     pickup_point_id: Mapped[intpk]
     country: Mapped[str] = mapped_column(String(50))
@@ -421,9 +535,38 @@ class Setting(Base):
     updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
+# Поколения кэшей: общий для всех воркеров счётчик инвалидации по области (scope)
+class CacheGeneration(Base):
+    __tablename__ = "cache_generations"
+
+    scope: Mapped[str] = mapped_column(String(100), primary_key=True)
+    generation: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+# Журнал движений по складу (только добавление): сумма delta по запчасти равна parts.stock_count
+class StockMovement(Base):
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        Index('ix_stock_movements_part_id_movement_id', 'part_id', 'movement_id'),
+        Index('ix_stock_movements_order_id', 'order_id'),
+    )
+
+    movement_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    part_id: Mapped[int] = mapped_column(ForeignKey("parts.part_id", ondelete="CASCADE"))
+    delta: Mapped[int] = mapped_column(Integer)                                                   # + приход, - расход
+    reason: Mapped[StockMovementReasonEnum] = mapped_column(String(30))
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.order_id", ondelete="SET NULL"), nullable=True)
+    actor_id: Mapped[int] = mapped_column(ForeignKey("users.user_id", ondelete="SET NULL"), nullable=True)  # кто провёл
+
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+
+
 # Таблица корзины пользователя
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        Index('ix_cart_items_user_id_part_id', 'user_id', 'part_id'),
+    )
     
     cart_item_id: Mapped[intpk]
     user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id", ondelete="CASCADE"))
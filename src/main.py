@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
@@ -13,8 +16,35 @@ from src.api.v1.settings import router as settings_router
 from src.api.v1.orders import router as orders_router
 from src.api.v1.addresses import router as addresses_router
 from src.api.v1.account import router as account_router
+from src.api.v1.health import router as health_router
+
+from src.api.serializers import FastJSONResponse
+from src.database.database import mark_primary_sticky
+from src.services import home_feed, passwords, receipts
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Фоновые задачи воркера
+    home_feed.start()
+    receipts.start()
+    yield
+    await home_feed.stop()
+    passwords.shutdown()
+    receipts.shutdown()
 
-app = FastAPI(title="Автомагазин")
+
+# JSON-ответы кодируются pydantic-core (src/api/serializers.py)
+app = FastAPI(title="Автомагазин", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# "Читаю свои записи": после изменения запросы пользователя какое-то время
+# читают из основной БД, а не с реплики (src/database/database.py)
+@app.middleware("http")
+async def primary_after_write(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        mark_primary_sticky(response)
+    return response
 
 # Подключаем статику и шаблоны
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
@@ -31,6 +61,16 @@ app.include_router(settings_router)  # /api/settings/...
 app.include_router(orders_router)  # /orders/...
 app.include_router(addresses_router)  # /api/addresses/...
 app.include_router(account_router)  # /account/...
+app.include_router(health_router)  # /api/health/...
+
+# Пул хэширования паролей перегружен — клиенту стоит повторить чуть позже
+@app.exception_handler(passwords.PasswordHashingBusy)
+async def password_hashing_busy_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервис временно перегружен, повторите попытку"},
+        headers={"Retry-After": "1"},
+    )
 
 # Кастомный 404
 @app.exception_handler(404)
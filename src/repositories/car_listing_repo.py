@@ -0,0 +1,237 @@
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, false, func, literal_column, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache.generations import CARS_SCOPE
+from src.cache.http import invalidate_responses
+from src.database.models import Car, CarAvailabilityEnum, CarListing, CarTrim, Image
+from src.repositories.car_search import LISTING_SEARCH_COLUMNS, car_search_conditions
+
+
+# --- СИНХРОНИЗАЦИЯ ВИТРИНЫ ---
+def _listing_source_select():
+    """
+    SELECT строк витрины из нормализованных таблиц (порядок колонок = _LISTING_COLUMNS).
+    """
+    images_json = (
+        select(
+            func.coalesce(
+                func.jsonb_agg(
+                    aggregate_order_by(
+                        func.jsonb_build_object(
+                            "url", Image.url,
+                            "alt_text", Image.alt_text,
+                            "sort_order", Image.sort_order,
+                        ),
+                        Image.sort_order, Image.image_id,
+                    )
+                ),
+                literal_column("'[]'::jsonb"),
+            )
+        )
+        .where(Image.car_id == Car.car_id)
+        .scalar_subquery()
+    )
+    primary_image_url = (
+        select(Image.url)
+        .where(Image.car_id == Car.car_id)
+        .order_by(Image.sort_order, Image.image_id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Car.car_id, Car.trim_id, Car.vin, Car.production_year, Car.condition,
+            Car.mileage, Car.color, Car.price,
+            CarTrim.brand_name, CarTrim.model_name, CarTrim.trim_name,
+            CarTrim.engine_volume, CarTrim.engine_power, CarTrim.engine_torque,
+            CarTrim.fuel_type, CarTrim.transmission, CarTrim.drive_type, CarTrim.body_type,
+            primary_image_url, images_json,
+            Car.is_visible, Car.availability,
+            func.now(),
+        )
+        .join(CarTrim, Car.trim_id == CarTrim.trim_id)
+    )
+
+
+_LISTING_COLUMNS = [
+    "car_id", "trim_id", "vin", "production_year", "condition",
+    "mileage", "color", "price",
+    "brand_name", "model_name", "trim_name",
+    "engine_volume", "engine_power", "engine_torque",
+    "fuel_type", "transmission", "drive_type", "body_type",
+    "primary_image_url", "images",
+    "is_visible", "availability",
+    "updated_at",
+]
+
+
+async def sync_car_listings(
+    session: AsyncSession,
+    car_ids: Optional[Iterable[int]] = None,
+    trim_id: Optional[int] = None,
+) -> None:
+    """
+    Пересобирает строки витрины для автомобилей (car_ids) или всех автомобилей
+    комплектации (trim_id) одним INSERT ... SELECT ... ON CONFLICT.
+    Вызывать в транзакции изменения, до commit. Удаление автомобиля чистит витрину
+    каскадом по внешнему ключу. Заодно сбрасывает закэшированные ответы по автомобилям.
+    """
+    source = _listing_source_select()
+    if car_ids is not None:
+        car_ids = list(car_ids)
+        if not car_ids:
+            return
+        source = source.where(Car.car_id.in_(car_ids))
+    elif trim_id is not None:
+        source = source.where(Car.trim_id == trim_id)
+    else:
+        raise ValueError("Нужно указать car_ids или trim_id")
+
+    # Изменения ORM-объектов должны попасть в БД до пересборки
+    await session.flush()
+
+    stmt = insert(CarListing).from_select(_LISTING_COLUMNS, source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CarListing.car_id],
+        set_={name: stmt.excluded[name] for name in _LISTING_COLUMNS if name != "car_id"},
+    )
+    await session.execute(stmt)
+    await invalidate_responses(session, CARS_SCOPE)
+
+
+# --- ФИЛЬТРЫ ПО ВИТРИНЕ ---
+# Фильтры-списки: параметр запроса -> колонка
+LISTING_OPTION_FILTERS = {
+    "brands": CarListing.brand_name,
+    "body_types": CarListing.body_type,
+    "fuel_types": CarListing.fuel_type,
+    "transmissions": CarListing.transmission,
+    "drive_types": CarListing.drive_type,
+    "colors": CarListing.color,
+    "conditions": CarListing.condition,
+}
+
+# Диапазоны: имя -> (параметр min, параметр max, колонка)
+LISTING_RANGE_FILTERS = {
+    "price": ("min_price", "max_price", CarListing.price),
+    "mileage": ("min_mileage", "max_mileage", CarListing.mileage),
+    "production_year": ("min_production_year", "max_production_year", CarListing.production_year),
+    "engine_power": ("min_engine_power", "max_engine_power", CarListing.engine_power),
+    "engine_volume": ("min_engine_volume", "max_engine_volume", CarListing.engine_volume),
+    "engine_torque": ("min_engine_torque", "max_engine_torque", CarListing.engine_torque),
+}
+
+
+def build_listing_filter_conditions(**filters) -> Dict[str, object]:
+    """
+    Условия фильтров по витрине, по одному на фильтр (ключи LISTING_OPTION_FILTERS /
+    LISTING_RANGE_FILTERS). Принимает те же аргументы, что car_repo.build_filter_conditions.
+    """
+    conditions = {}
+    for name, column in LISTING_OPTION_FILTERS.items():
+        values = filters.get(name)
+        if values:
+            conditions[name] = column.in_(values)
+    for name, (min_param, max_param, column) in LISTING_RANGE_FILTERS.items():
+        bounds = []
+        if filters.get(min_param) is not None:
+            bounds.append(column >= filters[min_param])
+        if filters.get(max_param) is not None:
+            bounds.append(column <= filters[max_param])
+        if bounds:
+            conditions[name] = and_(*bounds)
+    return conditions
+
+
+def listing_search_condition(query: str):
+    """
+    Условие текстового поиска по витрине (правила — car_search.car_search_conditions).
+    Если искать нечего — заведомо ложное условие.
+    """
+    conditions, _similarities = car_search_conditions(query, LISTING_SEARCH_COLUMNS)
+    return or_(*conditions) if conditions else false()
+
+
+def listing_base_conditions(query: Optional[str] = None, show_all: bool = False) -> List:
+    """
+    Условия, общие для списка и фасетов: видимость, доступность для заказа
+    и текстовый поиск. show_all (администраторы) — без видимости и доступности.
+    """
+    conditions = []
+    if not show_all:
+        conditions.append(CarListing.availability == CarAvailabilityEnum.AVAILABLE.value)
+        conditions.append(CarListing.is_visible == True)
+    if query and query.strip():
+        conditions.append(listing_search_condition(query))
+    return conditions
+
+
+# --- ФАСЕТЫ ---
+async def get_car_facets(
+    session: AsyncSession,
+    query: Optional[str] = None,
+    show_all: bool = False,
+    **filters
+) -> Dict:
+    """
+    Счётчики по марке, кузову, топливу, КПП, приводу, цвету и состоянию и min/max
+    цены, пробега, года, мощности, объёма и момента — одним проходом по car_listings.
+
+    Каждый фасет считается без собственного фильтра (остальные учитываются):
+    GROUPING SETS по колонкам-спискам, агрегаты с FILTER (WHERE ...).
+    """
+    conditions = build_listing_filter_conditions(**filters)
+
+    def except_own(name: str):
+        others = [condition for key, condition in conditions.items() if key != name]
+        return and_(*others) if others else None
+
+    def filtered(aggregate, name: Optional[str] = None):
+        condition = except_own(name) if name else (and_(*conditions.values()) if conditions else None)
+        return aggregate.filter(condition) if condition is not None else aggregate
+
+    option_columns = list(LISTING_OPTION_FILTERS.items())
+    columns = []
+    for name, column in option_columns:
+        columns.append(column.label(name))
+        columns.append(func.grouping(column).label(f"g_{name}"))
+        columns.append(filtered(func.count(), name).label(f"cnt_{name}"))
+    columns.append(filtered(func.count()).label("total"))
+    for name, (_min_param, _max_param, column) in LISTING_RANGE_FILTERS.items():
+        columns.append(filtered(func.min(column), name).label(f"min_{name}"))
+        columns.append(filtered(func.max(column), name).label(f"max_{name}"))
+
+    grouping_sets = [tuple_(column) for _name, column in option_columns] + [tuple_()]
+    stmt = select(*columns).group_by(func.grouping_sets(*grouping_sets))
+    base = listing_base_conditions(query, show_all)
+    if base:
+        stmt = stmt.where(and_(*base))
+
+    rows = (await session.execute(stmt)).mappings().all()
+
+    counts: Dict[str, List[Dict]] = {name: [] for name, _column in option_columns}
+    ranges: Dict[str, Dict] = {}
+    total = 0
+    for row in rows:
+        grouped_by = [name for name, _column in option_columns if row[f"g_{name}"] == 0]
+        if not grouped_by:
+            total = row["total"]
+            for name in LISTING_RANGE_FILTERS:
+                low, high = row[f"min_{name}"], row[f"max_{name}"]
+                ranges[name] = {
+                    "min": float(low) if low is not None else None,
+                    "max": float(high) if high is not None else None,
+                }
+            continue
+        name = grouped_by[0]
+        value, count = row[name], row[f"cnt_{name}"]
+        if value is not None and count:
+            counts[name].append({"value": value, "count": count})
+
+    for values in counts.values():
+        values.sort(key=lambda item: (-item["count"], str(item["value"])))
+
+    return {"total": total, "counts": counts, "ranges": ranges}
@@ -1,19 +1,24 @@
-import re
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_
+from sqlalchemy import Row, select, update, or_, and_, func
 from sqlalchemy.orm import selectinload
 from typing import List, Optional, Tuple
 
-from src.database.models import Car, CarTrim, Image
+from src.database.models import Car, CarAvailabilityEnum, CarListing, CarTrim, Image
+from src.repositories.car_listing_repo import (
+    build_listing_filter_conditions, listing_base_conditions, sync_car_listings,
+)
+from src.repositories.car_search import CAR_SEARCH_COLUMNS, car_search_conditions
+from src.repositories.pagination import Page, fetch_page_ids, order_by_ids
+from src.cache.generations import CARS_SCOPE
+from src.cache.http import invalidate_responses
 
 
-def normalize_text(text: str) -> str:
-    return re.sub(r'\s+', ' ', text.strip().lower())
-
+def for_sale_conditions() -> List:
+    """
+    Автомобиль в списке для покупателей: видим и не забронирован / не продан.
+    """
+    return [Car.is_visible == True, Car.availability == CarAvailabilityEnum.AVAILABLE.value]
 
-def extract_vin(query: str) -> Optional[str]:
-    cleaned = re.sub(r'[^A-HJ-NPR-Z0-9]', '', query.upper())
-    return cleaned if len(cleaned) == 17 else None
 
 async def get_car_by_id(session: AsyncSession, car_id: int) -> Optional[Car]:
     """
@@ -37,53 +42,15 @@ async def get_car_ids_by_search(
     Возвращает список car_id, найденных по текстовому запросу.
     Можно использовать для дальнейшей фильтрации.
     """
-    query = normalize_text(query)
-    if not query:
-        return []
-
-    # 1. VIN
-    vin = extract_vin(query)
-    if vin:
-        result = await session.execute(
-            select(Car.car_id).where(Car.vin == vin, Car.is_visible == True)
-        )
-        car_id = result.scalar()
-        return [car_id] if car_id else []
-
-    # 2. По словам
-    keywords = query.split()
-    conditions = []
-
-    for word in keywords:
-        if len(word) < 2:
-            continue
-
-        conditions.append(CarTrim.brand_name.ilike(f"%{word}%"))
-        conditions.append(CarTrim.model_name.ilike(f"%{word}%"))
-        conditions.append(Car.color.ilike(f"%{word}%"))
-
-        try:
-            cleaned = re.sub(r'[^\d.]', '', word)
-            if not cleaned or cleaned.count('.') > 1 or cleaned == '.':
-                continue
-            value = float(cleaned)
-
-            if value.is_integer():
-                int_value = int(value)
-                if 0 <= int_value <= 2030:
-                    conditions.append(Car.production_year == int_value)
-                elif 0 <= int_value <= 1000:
-                    conditions.append(CarTrim.engine_power >= int_value)
-            else:
-                if 0.1 <= value <= 10.0:
-                    conditions.append(CarTrim.engine_volume >= value)
-        except (ValueError, OverflowError):
-            continue
-
+    conditions, similarities = car_search_conditions(query, CAR_SEARCH_COLUMNS)
     if not conditions:
         return []
 
-    stmt = select(Car.car_id).join(Car.trim).where(or_(*conditions), Car.is_visible == True).limit(limit)
+    stmt = select(Car.car_id).join(Car.trim).where(or_(*conditions), *for_sale_conditions())
+    if similarities:
+        # Наиболее похожие совпадения не должны отсекаться лимитом
+        stmt = stmt.order_by(func.greatest(*similarities).desc())
+    stmt = stmt.limit(limit)
     result = await session.execute(stmt)
     return list(result.scalars().all())
 
@@ -195,26 +162,17 @@ async def search_cars(
     """
     Поиск по тексту — возвращает объекты Car.
     """
-    from src.database.models import CarOrder, Order, OrderStatusEnum
-    
-    # Исключаем автомобили, которые уже заказаны
-    ordered_car_ids_subquery = (
-        select(CarOrder.car_id)
-        .join(Order, CarOrder.order_id == Order.order_id)
-        .where(Order.status != OrderStatusEnum.CANCELLED.value)
-    )
-    
     car_ids = await get_car_ids_by_search(session, query, limit=200)
     if not car_ids:
-        # Если нет — возвращаем первые авто (только видимые)
-        stmt = select(Car).where(Car.is_visible == True)
+        # Если нет — возвращаем первые авто (только в продаже)
+        stmt = select(Car).where(*for_sale_conditions())
         return await apply_filters_and_execute(session, stmt, [], limit, offset)
 
     stmt = (
         select(Car)
         .where(
             Car.car_id.in_(car_ids),
-            Car.is_visible == True
+            *for_sale_conditions()
         )
     )
     return await apply_filters_and_execute(session, stmt, [], limit, offset)
@@ -272,11 +230,98 @@ async def filter_cars(
     stmt = (
         select(Car)
         .join(Car.trim)
-        .where(Car.is_visible == True)
+        .where(*for_sale_conditions())
     )
     return await apply_filters_and_execute(session, stmt, conditions_list, limit, offset)
 
 
+def _build_cars_listing_ids_stmt(
+    query: str = None,
+    show_all: bool = False,
+    **filters
+):
+    """
+    Строит запрос car_id для списка (поиск + фильтры) по витрине car_listings
+    и ключи сортировки по убыванию.
+    """
+    conditions_list = listing_base_conditions(query, show_all)
+    conditions_list.extend(build_listing_filter_conditions(**filters).values())
+
+    stmt = select(CarListing.car_id)
+    if conditions_list:
+        stmt = stmt.where(and_(*conditions_list))
+
+    # Сортировка (по убыванию): сначала видимые, потом невидимые (для администраторов)
+    if show_all:
+        return stmt, [CarListing.is_visible, CarListing.car_id]
+    return stmt, [CarListing.car_id]
+
+
+# Колонки витрины для списков; из галереи — только первое фото (images -> 0)
+_CAR_LIST_COLUMNS = (
+    CarListing.car_id, CarListing.vin, CarListing.production_year, CarListing.condition,
+    CarListing.mileage, CarListing.color, CarListing.price,
+    CarListing.is_visible, CarListing.availability,
+    CarListing.brand_name, CarListing.model_name, CarListing.trim_name,
+    CarListing.images[0].label("primary_image"),
+)
+
+
+async def get_cars_by_ids(session: AsyncSession, car_ids: List[int]) -> List[Row]:
+    """
+    Строки витрины (автомобиль + комплектация + главное фото) в порядке car_ids.
+    """
+    if not car_ids:
+        return []
+    result = await session.execute(select(*_CAR_LIST_COLUMNS).where(CarListing.car_id.in_(car_ids)))
+    return order_by_ids(result.all(), car_ids, key=lambda c: c.car_id)
+
+
+def car_list_item_to_dict(car: Row) -> dict:
+    """
+    Представление автомобиля в списках API (/api/cars/, лента главной).
+    images — только главное фото: размер ответа не зависит от галереи.
+    """
+    return {
+        "car_id": car.car_id,
+        "vin": car.vin,
+        "production_year": car.production_year,
+        "condition": car.condition,
+        "mileage": car.mileage,
+        "color": car.color,
+        "price": float(car.price) if car.price else None,
+        "is_visible": car.is_visible,
+        "availability": car.availability,
+        "trim": {
+            "brand_name": car.brand_name or "",
+            "model_name": car.model_name or "",
+            "trim_name": car.trim_name or ""
+        },
+        "images": [car.primary_image] if car.primary_image else []
+    }
+
+
+async def search_and_filter_cars_page(
+    session: AsyncSession,
+    query: str = None,
+    limit: int = 20,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    show_all: bool = False,
+    **filters
+) -> Page[Row]:
+    """
+    Страница поиска + фильтрации по витрине car_listings: один запрос id
+    (limit + 1 для has_more) и одна выборка колонок этой страницы, без JOIN.
+    С cursor (next_cursor прошлой страницы) offset не используется.
+    filters — те же аргументы, что у build_filter_conditions.
+    """
+    ids_stmt, sort_keys = _build_cars_listing_ids_stmt(query=query, show_all=show_all, **filters)
+    ids_page = await fetch_page_ids(session, ids_stmt, sort_keys, limit, offset, cursor)
+    cars = await get_cars_by_ids(session, ids_page.items)
+    return Page(items=cars, has_more=ids_page.has_more, next_cursor=ids_page.next_cursor)
+
+
 async def search_and_filter_cars(
     session: AsyncSession,
     query: str = None,
@@ -303,14 +348,17 @@ async def search_and_filter_cars(
     limit: int = 20,
     offset: int = 0,
     show_all: bool = False,  # Для администраторов показывать все, включая невидимые
-) -> List[Car]:
+) -> List[Row]:
     """
     Сначала ищет, потом фильтрует.
     Если show_all=True, показывает все автомобили, включая невидимые (для администраторов).
     """
-    from sqlalchemy import case
-    
-    conditions_list = build_filter_conditions(
+    page = await search_and_filter_cars_page(
+        session,
+        query=query,
+        limit=limit,
+        offset=offset,
+        show_all=show_all,
         colors=colors,
         min_mileage=min_mileage,
         max_mileage=max_mileage,
@@ -329,39 +377,9 @@ async def search_and_filter_cars(
         drive_types=drive_types,
         body_types=body_types,
         brands=brands,
-        fuel_types=fuel_types
+        fuel_types=fuel_types,
     )
-
-    if query and query.strip():
-        car_ids = await get_car_ids_by_search(session, query)
-        if not car_ids:
-            return []
-        stmt = (
-            select(Car)
-            .join(Car.trim)
-            .where(Car.car_id.in_(car_ids))
-        )
-        if not show_all:
-            stmt = stmt.where(Car.is_visible == True)
-    else:
-        stmt = (
-            select(Car)
-            .join(Car.trim)
-        )
-        if not show_all:
-            stmt = stmt.where(Car.is_visible == True)
-    
-    # Сортировка: сначала видимые, потом невидимые (для администраторов)
-    if show_all:
-        visibility_priority = case(
-            (Car.is_visible == True, 0),
-            else_=1
-        )
-        stmt = stmt.order_by(visibility_priority.asc(), Car.car_id.desc())
-    else:
-        stmt = stmt.order_by(Car.car_id.desc())
-
-    return await apply_filters_and_execute(session, stmt, conditions_list, limit, offset)
+    return page.items
 
 # === CRUD: АВТОМОБИЛИ ===
 
@@ -395,6 +413,8 @@ async def create_car(
     # Создаём объект
     car = Car(**car_data)
     session.add(car)
+    await session.flush()
+    await sync_car_listings(session, [car.car_id])
     await session.commit()
     await session.refresh(car)  # получаем ID и свежие данные
     return car
@@ -418,6 +438,7 @@ async def update_car(
         if value is not None:
             setattr(car, key, value)
 
+    await sync_car_listings(session, [car_id])
     await session.commit()
     await session.refresh(car)
     return car
@@ -435,5 +456,65 @@ async def delete_car(
         return False
 
     await session.delete(car)
+    await invalidate_responses(session, CARS_SCOPE)
     await session.commit()
     return True
+
+
+# === ДОСТУПНОСТЬ ДЛЯ ЗАКАЗА ===
+# Статус меняется только условным UPDATE по первичному ключу: строка блокируется,
+# и из двух одновременных заказов одного автомобиля успешен ровно один.
+# Функции не делают commit — вызываются в транзакции заказа.
+
+async def reserve_car(session: AsyncSession, car_id: int) -> bool:
+    """
+    Бронирует автомобиль под заказ. False — автомобиль уже забронирован,
+    продан или снят с продажи.
+    """
+    result = await session.execute(
+        update(Car)
+        .where(
+            Car.car_id == car_id,
+            *for_sale_conditions()
+        )
+        .values(availability=CarAvailabilityEnum.RESERVED.value)
+        .returning(Car.car_id)
+    )
+    if result.scalar_one_or_none() is None:
+        return False
+    await sync_car_listings(session, [car_id])
+    return True
+
+
+async def release_cars(session: AsyncSession, car_ids: List[int]) -> None:
+    """
+    Снимает бронь (отмена заказа): автомобиль снова в продаже.
+    """
+    if not car_ids:
+        return
+    await session.execute(
+        update(Car)
+        .where(
+            Car.car_id.in_(car_ids),
+            Car.availability == CarAvailabilityEnum.RESERVED.value
+        )
+        .values(availability=CarAvailabilityEnum.AVAILABLE.value)
+    )
+    await sync_car_listings(session, car_ids)
+
+
+async def mark_cars_sold(session: AsyncSession, car_ids: List[int]) -> None:
+    """
+    Помечает забронированные автомобили проданными (заказ доставлен).
+    """
+    if not car_ids:
+        return
+    await session.execute(
+        update(Car)
+        .where(
+            Car.car_id.in_(car_ids),
+            Car.availability == CarAvailabilityEnum.RESERVED.value
+        )
+        .values(availability=CarAvailabilityEnum.SOLD.value)
+    )
+    await sync_car_listings(session, car_ids)
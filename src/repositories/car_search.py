@@ -0,0 +1,132 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+
+from src.database.models import Car, CarListing, CarTrim
+
+
+# --- ТЕКСТОВЫЙ ПОИСК АВТОМОБИЛЕЙ ---
+# Одни правила разбора запроса для нормализованных таблиц (car_repo) и витрины
+# (car_listing_repo): полный VIN — точное совпадение; иначе по словам — марка,
+# модель (в т.ч. с опечаткой, pg_trgm), цвет, фрагмент VIN, год, мощность, объём.
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r'\s+', ' ', text.strip().lower())
+
+
+def extract_vin(query: str) -> Optional[str]:
+    cleaned = re.sub(r'[^A-HJ-NPR-Z0-9]', '', query.upper())
+    return cleaned if len(cleaned) == 17 else None
+
+
+# Минимальная длина слова для триграммного поиска (модель) и фрагмента VIN
+TRGM_MIN_LENGTH = 3
+VIN_FRAGMENT_MIN_LENGTH = 5
+
+
+def extract_vin_fragment(word: str) -> Optional[str]:
+    """
+    Фрагмент VIN: слово только из допустимых для VIN символов, с цифрой, короче 17 символов.
+    """
+    candidate = word.upper()
+    if not re.fullmatch(r'[A-HJ-NPR-Z0-9]+', candidate):
+        return None
+    if not (VIN_FRAGMENT_MIN_LENGTH <= len(candidate) < 17) or not re.search(r'\d', candidate):
+        return None
+    return candidate
+
+
+@dataclass(frozen=True)
+class CarSearchColumns:
+    """Колонки, по которым ищет car_search_conditions."""
+    vin: object
+    brand_name: object
+    model_name: object
+    color: object
+    production_year: object
+    engine_power: object
+    engine_volume: object
+
+
+# cars JOIN car_trims
+CAR_SEARCH_COLUMNS = CarSearchColumns(
+    vin=Car.vin,
+    brand_name=CarTrim.brand_name,
+    model_name=CarTrim.model_name,
+    color=Car.color,
+    production_year=Car.production_year,
+    engine_power=CarTrim.engine_power,
+    engine_volume=CarTrim.engine_volume,
+)
+
+# Витрина car_listings
+LISTING_SEARCH_COLUMNS = CarSearchColumns(
+    vin=CarListing.vin,
+    brand_name=CarListing.brand_name,
+    model_name=CarListing.model_name,
+    color=CarListing.color,
+    production_year=CarListing.production_year,
+    engine_power=CarListing.engine_power,
+    engine_volume=CarListing.engine_volume,
+)
+
+
+def car_search_conditions(query: str, columns: CarSearchColumns) -> Tuple[List, List]:
+    """
+    (условия, similarity) для текстового запроса. Условия объединяются через OR;
+    similarity — для ранжирования нечётких совпадений. Пустые условия — искать нечего.
+    """
+    query = normalize_text(query)
+    if not query:
+        return [], []
+
+    # 1. VIN
+    vin = extract_vin(query)
+    if vin:
+        return [columns.vin == vin], []
+
+    # 2. По словам
+    conditions = []
+    similarities = []
+
+    for word in query.split():
+        if len(word) < 2:
+            continue
+
+        conditions.append(columns.brand_name.ilike(f"%{word}%"))
+        conditions.append(columns.model_name.ilike(f"%{word}%"))
+        conditions.append(columns.color.ilike(f"%{word}%"))
+
+        # Модель с опечаткой — по триграммному индексу
+        if len(word) >= TRGM_MIN_LENGTH:
+            conditions.append(columns.model_name.op("%")(word))
+            similarities.append(func.similarity(columns.model_name, word))
+
+        # Частичный VIN — подстрока или похожая строка
+        vin_fragment = extract_vin_fragment(word)
+        if vin_fragment:
+            conditions.append(columns.vin.icontains(vin_fragment, autoescape=True))
+            conditions.append(columns.vin.op("%")(vin_fragment))
+            similarities.append(func.similarity(columns.vin, vin_fragment))
+
+        cleaned = re.sub(r'[^\d.]', '', word)
+        if not cleaned or cleaned.count('.') > 1 or cleaned == '.':
+            continue
+        try:
+            value = float(cleaned)
+        except (ValueError, OverflowError):
+            continue
+
+        if value.is_integer():
+            int_value = int(value)
+            if 0 <= int_value <= 2030:
+                conditions.append(columns.production_year == int_value)
+            elif 0 <= int_value <= 1000:
+                conditions.append(columns.engine_power >= int_value)
+        elif 0.1 <= value <= 10.0:
+            conditions.append(columns.engine_volume >= value)
+
+    return conditions, similarities
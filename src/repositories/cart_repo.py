@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, update
 from sqlalchemy.orm import selectinload
@@ -7,19 +8,65 @@ from src.database.models import CartItem, Part, Image, User
 
 
 async def get_cart_items(session: AsyncSession, user_id: int) -> List[CartItem]:
-    """Получает все товары в корзине пользователя"""
+    """Получает все товары в корзине пользователя (с запчастями, без фото и категорий)"""
     result = await session.execute(
         select(CartItem)
-        .options(
-            selectinload(CartItem.part).selectinload(Part.images),
-            selectinload(CartItem.part).selectinload(Part.category)
-        )
+        .options(selectinload(CartItem.part))
         .where(CartItem.user_id == user_id)
         .order_by(CartItem.created_at.desc())
     )
     return list(result.scalars().all())
 
 
+@dataclass(frozen=True)
+class CartRow:
+    """Строка корзины для /cart/api/items — только выводимые поля"""
+    cart_item_id: int
+    quantity: int
+    part_id: int
+    part_name: str
+    part_article: Optional[str]
+    manufacturer: Optional[str]
+    price: Optional[float]
+    stock_count: int
+    image_url: Optional[str]  # первое фото по sort_order
+
+
+async def get_cart_rows(session: AsyncSession, user_id: int) -> List[CartRow]:
+    """Корзина пользователя одним запросом: колонки запчасти и URL первого фото"""
+    first_image_url = (
+        select(Image.url)
+        .where(Image.part_id == Part.part_id)
+        .order_by(Image.sort_order, Image.image_id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        select(
+            CartItem.cart_item_id, CartItem.quantity,
+            Part.part_id, Part.part_name, Part.part_article, Part.manufacturer,
+            Part.price, Part.stock_count, first_image_url.label("image_url"),
+        )
+        .join(Part, CartItem.part_id == Part.part_id)
+        .where(CartItem.user_id == user_id)
+        .order_by(CartItem.created_at.desc())
+    )
+    return [
+        CartRow(
+            cart_item_id=row.cart_item_id,
+            quantity=row.quantity,
+            part_id=row.part_id,
+            part_name=row.part_name,
+            part_article=row.part_article,
+            manufacturer=str(row.manufacturer) if row.manufacturer else None,
+            price=float(row.price) if row.price else None,
+            stock_count=row.stock_count,
+            image_url=row.image_url,
+        )
+        for row in result
+    ]
+
+
 async def get_cart_item(session: AsyncSession, user_id: int, part_id: int) -> Optional[CartItem]:
     """Получает конкретный товар в корзине пользователя"""
     result = await session.execute(
@@ -0,0 +1,128 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache.generations import bump_generation, get_generation
+from src.database.models import PartCategory
+
+
+# --- СНИМОК ДЕРЕВА КАТЕГОРИЙ ---
+# Категории меняются редко, а читаются на каждом запросе каталога.
+# Дерево загружается одним запросом, хранится в памяти процесса как неизменяемый
+# снимок и пересобирается, когда меняется поколение области "categories"
+# (invalidate_category_tree) — в любом воркере.
+
+CATEGORIES_SCOPE = "categories"
+
+
+@dataclass(frozen=True)
+class CategoryTree:
+    """
+    Неизменяемый снимок дерева категорий.
+    Не изменяйте возвращаемые структуры: снимок общий для всех запросов.
+    """
+    version: int  # поколение CATEGORIES_SCOPE, из которого построен снимок
+    names: Dict[int, str]
+    parents: Dict[int, Optional[int]]
+    children: Dict[int, Tuple[int, ...]]
+    descendants: Dict[int, FrozenSet[int]]  # поддерево, включая саму категорию
+    nested: Tuple[dict, ...]  # готовое дерево для API (отсортировано по названию)
+
+    def is_leaf(self, category_id: int) -> bool:
+        return not self.children.get(category_id)
+
+    def subtree_ids(self, category_ids: Iterable[int]) -> Set[int]:
+        result: Set[int] = set()
+        for cid in category_ids:
+            result |= self.descendants.get(cid, frozenset((cid,)))
+        return result
+
+
+_TREE: Optional[CategoryTree] = None
+_LOCK = asyncio.Lock()
+
+
+def _build_tree(version: int, rows: List[Tuple[int, str, Optional[int]]]) -> CategoryTree:
+    names = {cid: name for cid, name, _pid in rows}
+    parents = {cid: pid for cid, _name, pid in rows}
+
+    children_lists: Dict[int, List[int]] = {cid: [] for cid in names}
+    roots: List[int] = []
+    for cid, pid in parents.items():
+        if pid is not None and pid in children_lists:
+            children_lists[pid].append(cid)
+        else:
+            roots.append(cid)
+
+    def by_name(ids: List[int]) -> Tuple[int, ...]:
+        return tuple(sorted(ids, key=lambda i: names[i]))
+
+    children = {cid: by_name(ids) for cid, ids in children_lists.items()}
+    roots_sorted = by_name(roots)
+
+    # Поддеревья: обход в глубину без рекурсии (защита от циклов в данных)
+    descendants: Dict[int, FrozenSet[int]] = {}
+    for cid in names:
+        seen = {cid}
+        stack = [cid]
+        while stack:
+            for child in children[stack.pop()]:
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        descendants[cid] = frozenset(seen)
+
+    def node(cid: int, path: FrozenSet[int]) -> dict:
+        kids = [c for c in children[cid] if c not in path]
+        return {
+            "category_id": cid,
+            "category_name": names[cid],
+            "parent_id": parents[cid],
+            "children": [node(c, path | {c}) for c in kids],
+            "is_leaf": not children[cid],
+        }
+
+    nested = tuple(node(cid, frozenset((cid,))) for cid in roots_sorted if parents[cid] is None)
+
+    return CategoryTree(
+        version=version,
+        names=names,
+        parents=parents,
+        children=children,
+        descendants=descendants,
+        nested=nested,
+    )
+
+
+async def get_category_tree(session: AsyncSession) -> CategoryTree:
+    """
+    Текущий снимок дерева. БД читается только при первом обращении
+    и после смены поколения (invalidate_category_tree).
+    """
+    global _TREE
+    version = await get_generation(session, CATEGORIES_SCOPE)
+    tree = _TREE
+    if tree is not None and tree.version == version:
+        return tree
+
+    async with _LOCK:
+        if _TREE is not None and _TREE.version == version:
+            return _TREE
+        result = await session.execute(
+            select(PartCategory.category_id, PartCategory.category_name, PartCategory.parent_id)
+        )
+        # Поколение прочитано до загрузки: если дерево изменят во время неё,
+        # следующий запрос увидит новое поколение и перечитает дерево
+        _TREE = _build_tree(version, [tuple(row) for row in result.fetchall()])
+        return _TREE
+
+
+async def invalidate_category_tree(session: AsyncSession) -> None:
+    """
+    Сбрасывает снимок во всех воркерах. Вызывать в транзакции,
+    изменяющей part_categories, до commit.
+    """
+    await bump_generation(session, CATEGORIES_SCOPE)
@@ -0,0 +1,35 @@
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Image
+
+
+# --- ГЛАВНОЕ ФОТО ---
+# Для миниатюр в списках нужно одно фото на сущность, а не вся галерея.
+# DISTINCT ON (владелец) ... ORDER BY владелец, sort_order идёт по индексам
+# ix_images_car_id_sort_order / ix_images_part_id_sort_order.
+
+async def get_primary_images(
+    session: AsyncSession,
+    owner_column,
+    owner_ids: Iterable[int],
+) -> Dict[int, Dict]:
+    """
+    Первое фото (по sort_order) для каждого владельца: {id: {"url", "alt_text", "sort_order"}}.
+    owner_column — Image.car_id или Image.part_id. Владельцы без фото в ответ не попадают.
+    """
+    owner_ids = list(set(owner_ids))
+    if not owner_ids:
+        return {}
+    result = await session.execute(
+        select(owner_column, Image.url, Image.alt_text, Image.sort_order)
+        .distinct(owner_column)
+        .where(owner_column.in_(owner_ids))
+        .order_by(owner_column, Image.sort_order, Image.image_id)
+    )
+    return {
+        owner_id: {"url": url, "alt_text": alt_text, "sort_order": sort_order}
+        for owner_id, url, alt_text, sort_order in result
+    }
@@ -0,0 +1,275 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, String, column, func, insert, literal, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache.generations import PARTS_SCOPE, part_detail_scope
+from src.cache.http import invalidate_responses_after_commit
+from src.database.models import Part, StockMovement, StockMovementReasonEnum
+
+
+# --- СКЛАД ЗАПЧАСТЕЙ ---
+# parts.stock_count — материализованный остаток, stock_movements — журнал его
+# изменений. Остаток и журнал меняются одним запросом: UPDATE ... RETURNING
+# в CTE и INSERT в журнал из него. Строки parts блокируются по возрастанию
+# part_id (CTE с FOR UPDATE), поэтому параллельные заказы с пересекающимися
+# запчастями не взаимоблокируются; блокировка держится до commit вызывающего,
+# так что вызывать — как можно ближе к нему.
+#
+# Кэш ответов: сбрасываются карточки изменённых запчастей; списки и ленты
+# (PARTS_SCOPE) — только когда запчасть закончилась или снова появилась
+# в наличии. Сами числа остатка в лентах обновятся при их плановой пересборке.
+# Поколения увеличиваются после commit (invalidate_responses_after_commit):
+# общая строка 'parts' в cache_generations не блокируется вместе со складом.
+
+
+class InsufficientStockError(ValueError):
+    """
+    Не хватает запчастей на складе. shortages: part_id -> сколько есть (0 — нет такой запчасти).
+    """
+    def __init__(self, shortages: Dict[int, int]):
+        self.shortages = shortages
+        super().__init__("Недостаточно товара на складе")
+
+
+def _merge_quantities(items: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    quantities: Dict[int, int] = {}
+    for part_id, quantity in items:
+        if quantity <= 0:
+            raise ValueError("Количество должно быть положительным")
+        quantities[part_id] = quantities.get(part_id, 0) + quantity
+    return quantities
+
+
+def _locked_parts(part_ids: Iterable[int]):
+    return (
+        select(Part.part_id)
+        .where(Part.part_id.in_(sorted(part_ids)))
+        .order_by(Part.part_id)
+        .with_for_update()
+    )
+
+
+def _stock_scopes(part_ids: Iterable[int], availability_changed: bool) -> List[str]:
+    scopes = [part_detail_scope(part_id) for part_id in part_ids]
+    if availability_changed:
+        scopes.append(PARTS_SCOPE)
+    return scopes
+
+
+def _move_stock_stmt(
+    quantities: Dict[int, int],
+    sign: int,
+    reason: StockMovementReasonEnum,
+    order_id: Optional[int],
+    actor_id: Optional[int],
+):
+    """
+    WITH changed AS (UPDATE parts SET stock_count = stock_count ± quantity
+                     FROM (VALUES ...) RETURNING part_id, stock_count, delta),
+         logged AS (INSERT INTO stock_movements SELECT ... FROM changed)
+    SELECT part_id, stock_count, delta FROM changed — остаток уже после изменения
+    """
+    requested = values(
+        column("part_id", Integer), column("quantity", Integer), name="requested"
+    ).data(sorted(quantities.items()))
+    locked = _locked_parts(quantities).cte("locked")
+    delta = sign * requested.c.quantity
+
+    changed = (
+        update(Part)
+        .where(Part.part_id == requested.c.part_id, Part.part_id == locked.c.part_id)
+        .values(stock_count=func.coalesce(Part.stock_count, 0) + delta)
+    )
+    if sign < 0:
+        changed = changed.where(Part.stock_count >= requested.c.quantity)
+    changed = changed.returning(Part.part_id, Part.stock_count, delta.label("delta")).cte("changed")
+
+    logged = (
+        insert(StockMovement)
+        .from_select(
+            ["part_id", "delta", "reason", "order_id", "actor_id"],
+            select(
+                changed.c.part_id,
+                changed.c.delta,
+                literal(reason.value, String),
+                literal(order_id, Integer),
+                literal(actor_id, Integer),
+            ),
+        )
+        .cte("logged")
+    )
+    return select(changed.c.part_id, changed.c.stock_count, changed.c.delta).add_cte(logged)
+
+
+def _availability_changed(rows) -> bool:
+    """
+    Запчасть закончилась (остаток стал 0) или появилась (остаток был 0 и стал delta).
+    """
+    return any(stock == 0 or stock == delta for _part_id, stock, delta in rows)
+
+
+async def reserve_stock(
+    session: AsyncSession,
+    items: Iterable[Tuple[int, int]],
+    order_id: Optional[int] = None,
+    actor_id: Optional[int] = None,
+) -> None:
+    """
+    Списывает со склада (part_id, количество) под заказ — всё или ничего.
+    Если хоть одной запчасти не хватает, склад не меняется и выбрасывается
+    InsufficientStockError. Commit — за вызывающим.
+    """
+    quantities = _merge_quantities(items)
+    if not quantities:
+        return
+
+    stmt = _move_stock_stmt(quantities, -1, StockMovementReasonEnum.ORDER, order_id, actor_id)
+
+    # Точка сохранения: при нехватке откатывается только списание
+    try:
+        async with session.begin_nested():
+            rows = (await session.execute(stmt)).all()
+            reserved = {row.part_id for row in rows}
+            if len(reserved) != len(quantities):
+                raise InsufficientStockError({})
+    except InsufficientStockError:
+        missing = [part_id for part_id in quantities if part_id not in reserved]
+        result = await session.execute(
+            select(Part.part_id, Part.stock_count).where(Part.part_id.in_(missing))
+        )
+        available = {part_id: stock or 0 for part_id, stock in result.all()}
+        raise InsufficientStockError({part_id: available.get(part_id, 0) for part_id in missing})
+
+    invalidate_responses_after_commit(session, *_stock_scopes(reserved, _availability_changed(rows)))
+
+
+async def release_stock(
+    session: AsyncSession,
+    items: Iterable[Tuple[int, int]],
+    order_id: Optional[int] = None,
+    actor_id: Optional[int] = None,
+) -> None:
+    """
+    Возвращает на склад (part_id, количество) при отмене заказа.
+    Удалённые запчасти пропускаются. Commit — за вызывающим.
+    """
+    quantities = _merge_quantities(items)
+    if not quantities:
+        return
+
+    rows = (await session.execute(
+        _move_stock_stmt(quantities, 1, StockMovementReasonEnum.CANCELLATION, order_id, actor_id)
+    )).all()
+    invalidate_responses_after_commit(
+        session, *_stock_scopes([row.part_id for row in rows], _availability_changed(rows))
+    )
+
+
+async def set_stock(
+    session: AsyncSession,
+    part_id: int,
+    stock_count: int,
+    actor_id: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Ручная корректировка: устанавливает остаток, в журнал пишет разницу.
+    Возвращает новый остаток или None, если запчасти нет. Commit — за вызывающим.
+    """
+    current = (await session.execute(_locked_parts([part_id]).add_columns(Part.stock_count))).first()
+    if current is None:
+        return None
+
+    previous = current.stock_count or 0
+    delta = stock_count - previous
+    if delta:
+        await session.execute(
+            update(Part).where(Part.part_id == part_id).values(stock_count=stock_count)
+        )
+        session.add(StockMovement(
+            part_id=part_id, delta=delta,
+            reason=StockMovementReasonEnum.ADJUSTMENT.value, actor_id=actor_id
+        ))
+        invalidate_responses_after_commit(session, *_stock_scopes([part_id], (previous > 0) != (stock_count > 0)))
+    return stock_count
+
+
+def record_initial_stock(session: AsyncSession, part: Part, actor_id: Optional[int] = None) -> None:
+    """
+    Начальный остаток новой запчасти (part уже с part_id).
+    """
+    if part.stock_count:
+        session.add(StockMovement(
+            part_id=part.part_id, delta=part.stock_count,
+            reason=StockMovementReasonEnum.INITIAL.value, actor_id=actor_id
+        ))
+
+
+# --- ЖУРНАЛ: ИСТОРИЯ И СВЕРКА ---
+
+async def get_stock_movements(
+    session: AsyncSession,
+    part_id: int,
+    limit: int = 50,
+    before_id: Optional[int] = None,
+) -> List[StockMovement]:
+    """
+    Движения по запчасти, новые первыми. Keyset-пагинация по movement_id (before_id).
+    """
+    stmt = select(StockMovement).where(StockMovement.part_id == part_id)
+    if before_id is not None:
+        stmt = stmt.where(StockMovement.movement_id < before_id)
+    result = await session.execute(stmt.order_by(StockMovement.movement_id.desc()).limit(limit))
+    return list(result.scalars().all())
+
+
+def _ledger_totals(part_ids: Optional[List[int]]):
+    totals = select(StockMovement.part_id, func.sum(StockMovement.delta).label("total")).group_by(StockMovement.part_id)
+    if part_ids is not None:
+        totals = totals.where(StockMovement.part_id.in_(part_ids))
+    return totals.subquery("ledger")
+
+
+async def verify_stock(session: AsyncSession, part_ids: Optional[List[int]] = None) -> List[Dict[str, int]]:
+    """
+    Сверка остатков с журналом: запчасти, у которых stock_count != сумме движений.
+    """
+    ledger = _ledger_totals(part_ids)
+    ledger_total = func.coalesce(ledger.c.total, 0)
+    stmt = (
+        select(Part.part_id, func.coalesce(Part.stock_count, 0).label("stock_count"), ledger_total.label("ledger_total"))
+        .outerjoin(ledger, ledger.c.part_id == Part.part_id)
+        .where(func.coalesce(Part.stock_count, 0) != ledger_total)
+        .order_by(Part.part_id)
+    )
+    if part_ids is not None:
+        stmt = stmt.where(Part.part_id.in_(part_ids))
+    result = await session.execute(stmt)
+    return [
+        {"part_id": row.part_id, "stock_count": row.stock_count, "ledger_total": int(row.ledger_total)}
+        for row in result.all()
+    ]
+
+
+async def replay_stock(session: AsyncSession, part_ids: Optional[List[int]] = None) -> List[Dict[str, int]]:
+    """
+    Пересчитывает stock_count из журнала для расходящихся запчастей.
+    Строки сначала блокируются, затем сверяются: движения по ним до commit
+    записаться не могут. Возвращает исправленные расхождения. Commit — за вызывающим.
+    """
+    mismatches = await verify_stock(session, part_ids)
+    if not mismatches:
+        return []
+
+    await session.execute(_locked_parts(m["part_id"] for m in mismatches))
+    # Повторная сверка уже под блокировкой
+    mismatches = await verify_stock(session, [m["part_id"] for m in mismatches])
+    if mismatches:
+        replayed = values(
+            column("part_id", Integer), column("stock_count", Integer), name="replayed"
+        ).data([(m["part_id"], m["ledger_total"]) for m in mismatches])
+        await session.execute(
+            update(Part).where(Part.part_id == replayed.c.part_id).values(stock_count=replayed.c.stock_count)
+        )
+        invalidate_responses_after_commit(session, *_stock_scopes([m["part_id"] for m in mismatches], True))
+    return mismatches
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from src.database.models import Car, CarOrder, Order, OrderItem, OrderStatusEnum
+
+
+def receipt_load_options():
+    """
+    Связи заказа, которые печатаются в чеке (src/services/receipts.receipt_data).
+    """
+    return (
+        selectinload(Order.order_items).selectinload(OrderItem.part),
+        selectinload(Order.car_orders).selectinload(CarOrder.car).selectinload(Car.trim),
+        selectinload(Order.shipping_address),
+        selectinload(Order.pickup_point),
+        selectinload(Order.user),
+    )
+
+
+async def get_paid_order_ids(
+    session: AsyncSession,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    status: Optional[str] = None,
+) -> List[int]:
+    """
+    id оплаченных заказов за период [date_from, date_to) и/или в статусе, по возрастанию.
+    """
+    stmt = select(Order.order_id).where(Order.is_paid == True)
+    if date_from is not None:
+        stmt = stmt.where(Order.order_date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(Order.order_date < date_to)
+    if status is not None:
+        stmt = stmt.where(Order.status == status)
+    result = await session.execute(stmt.order_by(Order.order_id))
+    return list(result.scalars().all())
+
+
+async def get_management_orders(session: AsyncSession, active_only: bool = False) -> List[Order]:
+    """
+    Заказы для управления: Отправлен → В обработке → Доставлен → Отменен, внутри — новые выше.
+    active_only (менеджер) — только незавершённые; статусы перечислены через IN,
+    а не "!=", чтобы условие шло по ix_orders_status.
+    """
+    status_priority = case(
+        (Order.status == OrderStatusEnum.SHIPPED.value, 1),
+        (Order.status == OrderStatusEnum.PROCESSING.value, 2),
+        (Order.status == OrderStatusEnum.DELIVERED.value, 3),
+        (Order.status == OrderStatusEnum.CANCELLED.value, 4),
+        else_=5
+    )
+    stmt = select(Order).options(*receipt_load_options())
+    if active_only:
+        stmt = stmt.where(Order.status.in_([OrderStatusEnum.SHIPPED.value, OrderStatusEnum.PROCESSING.value]))
+    result = await session.execute(stmt.order_by(status_priority.asc(), Order.order_date.desc()))
+    return list(result.scalars().all())
+
+
+async def get_orders_for_receipts(session: AsyncSession, order_ids: List[int]) -> List[Order]:
+    """
+    Заказы пачкой для чеков: по одному запросу на связь на всю пачку, по возрастанию id.
+    """
+    if not order_ids:
+        return []
+    result = await session.execute(
+        select(Order)
+        .where(Order.order_id.in_(order_ids))
+        .options(*receipt_load_options())
+        .order_by(Order.order_id)
+    )
+    return list(result.scalars().all())
+
+
+async def claim_order_cancellation(session: AsyncSession, order_id: int, user_id: Optional[int] = None) -> bool:
+    """
+    Переводит заказ в "Отменен", если он ещё не отменён и не доставлен (user_id — только свой заказ).
+    Переход занимается одним UPDATE: строка заказа заблокирована до commit, параллельная
+    отмена дождётся его и получит False — склад и автомобили возвращает только выигравший.
+    Commit — за вызывающим.
+    """
+    stmt = (
+        update(Order)
+        .where(
+            Order.order_id == order_id,
+            Order.status.notin_([OrderStatusEnum.CANCELLED.value, OrderStatusEnum.DELIVERED.value]),
+        )
+        .values(status=OrderStatusEnum.CANCELLED.value)
+        .returning(Order.order_id)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Order.user_id == user_id)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none() is not None
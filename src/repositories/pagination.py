@@ -0,0 +1,87 @@
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+
+@dataclass
+class Page(Generic[T]):
+    """
+    Страница списка: элементы + признак наличия следующей страницы
+    + курсор, с которого её можно продолжить.
+    """
+    items: List[T]
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+
+# --- КУРСОР ---
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Непрозрачный курсор: значения ключей сортировки последней строки страницы.
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Разбирает курсор. ValueError — если курсор битый или от другой сортировки.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Некорректный курсор")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Некорректный курсор")
+    if not all(isinstance(v, (int, float, bool)) for v in values):
+        raise ValueError("Некорректный курсор")
+    return values
+
+
+# --- ВЫБОРКА СТРАНИЦЫ ---
+async def fetch_page_ids(
+    session: AsyncSession,
+    ids_stmt: Select,
+    sort_keys: Sequence,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None
+) -> Page[int]:
+    """
+    Выбирает limit + 1 id одним запросом.
+    Лишний id не загружается дальше — он только говорит, что есть следующая страница.
+
+    sort_keys — выражения сортировки по убыванию, последний ключ уникален (id).
+    С курсором страница начинается строго после него:
+    (k1, k2, ..., id) < (v1, v2, ..., vN) — сравнение строк идёт по индексу,
+    поэтому стоимость страницы не зависит от глубины прокрутки.
+    Без курсора работает обычный OFFSET.
+    """
+    stmt = ids_stmt.add_columns(*sort_keys)
+    if cursor:
+        values = decode_cursor(cursor, len(sort_keys))
+        stmt = stmt.where(tuple_(*sort_keys) < tuple_(*values))
+        offset = 0
+
+    stmt = stmt.order_by(*[key.desc() for key in sort_keys]).limit(limit + 1).offset(offset)
+    rows = (await session.execute(stmt)).all()
+
+    page_rows = rows[:limit]
+    has_more = len(rows) > limit
+    next_cursor = encode_cursor(page_rows[-1][1:]) if has_more else None
+    return Page(items=[row[0] for row in page_rows], has_more=has_more, next_cursor=next_cursor)
+
+
+def order_by_ids(items: Sequence[T], ids: List[int], key: Callable[[T], int]) -> List[T]:
+    """
+    Восстанавливает порядок сущностей, загруженных через IN (...), по списку id.
+    """
+    position = {item_id: index for index, item_id in enumerate(ids)}
+    return sorted(items, key=lambda item: position[key(item)])
@@ -1,12 +1,24 @@
+import copy
 import json
 from typing import Dict, List, Optional, Set, Union, Literal, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import delete, select, or_, and_, func, insert, case, cast
-from sqlalchemy import Float
+from sqlalchemy import delete, select, update, or_, and_, func, insert, cast, tuple_, union_all, case
+from sqlalchemy import Numeric, String, literal_column
 from sqlalchemy.orm import selectinload
-from dataclasses import asdict
+from dataclasses import asdict, dataclass
+from decimal import Decimal
 
 from src.database.models import Part, PartCategory, PartSpecification, Image
+from src.repositories.pagination import Page, fetch_page_ids, order_by_ids
+from src.repositories.category_tree import get_category_tree
+from src.repositories.image_repo import get_primary_images
+from src.repositories.inventory_repo import record_initial_stock
+from src.cache.lru import TTLCache
+from src.cache.generations import (
+    PARTS_SCOPE, bump_generations, get_generation, part_detail_scope, parts_category_scope,
+)
+from src.cache.http import invalidate_responses
+from src.config import PARTS_SPECS_CACHE_SIZE, PARTS_CACHE_TTL
 
 import re
 
@@ -15,14 +27,19 @@ FilterType = Literal["range", "options"]
 
 # --- КЭШИРОВАНИЕ СПЕЦИФИКАЦИЙ ПО КАТЕГОРИИ ---
 # Важно: нельзя использовать lru_cache на async-функциях с параметром session.
-# Делаем простой in-memory cache по category_id и очищаем его при CRUD.
-_SPECS_CACHE: Dict[int, Dict[str, List[Tuple[str, Optional[str]]]]] = {}
-_FILTERS_CACHE: Dict[int, Dict[str, Dict]] = {}
+# Кэш в памяти воркера ограничен по размеру и TTL; ключ — (category_id, поколение
+# категории). CRUD увеличивает поколение в БД, и старые записи перестают
+# использоваться во всех воркерах.
+_SPECS_CACHE: TTLCache[Dict[str, List[Tuple[str, Optional[str]]]]] = TTLCache(PARTS_SPECS_CACHE_SIZE, PARTS_CACHE_TTL)
+_FILTERS_CACHE: TTLCache[Dict[str, Dict]] = TTLCache(PARTS_SPECS_CACHE_SIZE, PARTS_CACHE_TTL)
 
 
-def clear_parts_filters_cache() -> None:
-    _SPECS_CACHE.clear()
-    _FILTERS_CACHE.clear()
+async def invalidate_parts_category_cache(session: AsyncSession, *category_ids: Optional[int]) -> None:
+    """
+    Сбрасывает кэш спецификаций/фильтров категорий во всех воркерах.
+    Вызывать в транзакции изменения, до commit.
+    """
+    await bump_generations(session, [parts_category_scope(cid) for cid in category_ids if cid is not None])
 
 
 async def get_specs_for_category(
@@ -33,8 +50,10 @@ async def get_specs_for_category(
     Возвращает уникальные спецификации для ТОЛЬКО ЭТОЙ категории (без подкатегорий):
     spec_name -> list[(spec_value, spec_unit)]
     """
-    if category_id in _SPECS_CACHE:
-        return _SPECS_CACHE[category_id]
+    cache_key = (category_id, await get_generation(session, parts_category_scope(category_id)))
+    cached = _SPECS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
 
     result = await session.execute(
         select(PartSpecification.spec_name, PartSpecification.spec_value, PartSpecification.spec_unit)
@@ -53,9 +72,28 @@ async def get_specs_for_category(
         specs[name].add((str(value), str(unit) if unit else None))
 
     normalized = {name: sorted(values) for name, values in specs.items()}
-    _SPECS_CACHE[category_id] = normalized
+    _SPECS_CACHE.set(cache_key, normalized)
     return normalized
 
+def spec_option_value(value: str, unit: Optional[str]) -> str:
+    """
+    Значение options-фильтра так, как его показывает и присылает UI: "значение единица".
+    По нему же ключуются счётчики фасетов и сравнивается фильтр.
+    """
+    return f"{value} {unit}".strip() if unit else value
+
+
+def _spec_option_expr():
+    # SQL-вариант spec_option_value. Константы — литералами, не параметрами:
+    # выражение стоит и в SELECT, и в GROUP BY и должно совпасть текстуально
+    spec = PartSpecification
+    empty, space = literal_column("''"), literal_column("' '")
+    return case(
+        (func.coalesce(spec.spec_unit, empty) != empty, func.trim(spec.spec_value.concat(space).concat(spec.spec_unit))),
+        else_=spec.spec_value,
+    )
+
+
 def detect_spec_type(values: List[str]) -> FilterType:
     if not values:
         return "options"
@@ -81,8 +119,10 @@ async def get_filters_config_for_category(
     Возвращает типы фильтров по категории: диапазон или выбор.
     Фильтры строятся ТОЛЬКО по спецификациям товаров в этой категории (без детей).
     """
-    if category_id in _FILTERS_CACHE:
-        return _FILTERS_CACHE[category_id]
+    cache_key = (category_id, await get_generation(session, parts_category_scope(category_id)))
+    cached = _FILTERS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
 
     specs = await get_specs_for_category(session, category_id)
     config = {}
@@ -92,10 +132,7 @@ async def get_filters_config_for_category(
 
         if spec_type == "options":
             # Склеиваем value + unit в одну строку (если unit есть) и делаем уникальными
-            rendered = []
-            for v, u in values:
-                rendered.append(f"{v} {u}".strip() if u else v)
-            config[name] = {"type": "options", "values": sorted(set(rendered))}
+            config[name] = {"type": "options", "values": sorted({spec_option_value(v, u) for v, u in values})}
             continue
 
         # range: пытаемся извлечь числа
@@ -114,7 +151,7 @@ async def get_filters_config_for_category(
 
         if not nums:
             # fallback
-            config[name] = {"type": "options", "values": sorted(set([vv for (vv, _uu) in values]))}
+            config[name] = {"type": "options", "values": sorted({spec_option_value(v, u) for v, u in values})}
         else:
             unit = None
             if units:
@@ -122,46 +159,27 @@ async def get_filters_config_for_category(
                 unit = max(set(units), key=units.count)
             config[name] = {"type": "range", "min": min(nums), "max": max(nums), "unit": unit}
 
-    _FILTERS_CACHE[category_id] = config
+    _FILTERS_CACHE.set(cache_key, config)
     return config
 
 
 # --- КАТЕГОРИИ / ПОДКАТЕГОРИИ ---
+# Все три функции отвечают из снимка дерева в памяти (category_tree.py)
 async def get_categories_tree(session: AsyncSession) -> List[dict]:
     """
     Возвращает дерево категорий: parent -> children, с флагом is_leaf.
+    Результат — копия: вызывающий может его менять, не портя общий снимок.
     """
-    res = await session.execute(select(PartCategory.category_id, PartCategory.category_name, PartCategory.parent_id))
-    rows = res.fetchall()
-
-    nodes = {cid: {"category_id": cid, "category_name": name, "parent_id": pid, "children": [], "is_leaf": True} for cid, name, pid in rows}
-    for cid, name, pid in rows:
-        if pid is not None and pid in nodes:
-            nodes[pid]["children"].append(nodes[cid])
-            nodes[pid]["is_leaf"] = False
-
-    # top-level
-    top = [n for n in nodes.values() if n["parent_id"] is None]
-    # сортировка
-    def sort_children(n):
-        n["children"].sort(key=lambda x: x["category_name"])
-        for c in n["children"]:
-            sort_children(c)
-
-    top.sort(key=lambda x: x["category_name"])
-    for n in top:
-        sort_children(n)
-    return top
+    tree = await get_category_tree(session)
+    return copy.deepcopy(list(tree.nested))
 
 
 async def is_leaf_category(session: AsyncSession, category_id: int) -> bool:
     """
     Категория leaf, если у неё нет дочерних категорий.
     """
-    res = await session.execute(
-        select(func.count(PartCategory.category_id)).where(PartCategory.parent_id == category_id)
-    )
-    return (res.scalar() or 0) == 0
+    tree = await get_category_tree(session)
+    return tree.is_leaf(category_id)
 
 
 # --- РЕКУРСИВНЫЙ ПОИСК ПОДКАТЕГОРИЙ ---
@@ -170,22 +188,111 @@ async def get_all_subcategories(
     parent_ids: List[int]
 ) -> List[int]:
     """
-    Рекурсивно находит все подкатегории.
+    Рекурсивно находит все подкатегории (из снимка дерева, без запроса к БД).
+    """
+    tree = await get_category_tree(session)
+    return list(tree.subtree_ids(parent_ids))
+
+
+# --- ПОЛНОТЕКСТОВЫЙ ПОИСК ---
+# Конфигурация 'simple': без стемминга, зато одинаково работает для названий,
+# артикулов и значений спецификаций на любом языке.
+SEARCH_CONFIG = "simple"
+
+
+def _weight(label: str):
+    # setweight ждёт тип "char" — передаём литерал, а не bind-параметр varchar
+    return literal_column(f"'{label}'")
+
+
+def _search_document_expr():
+    """
+    SQL выражение поискового документа запчасти (tsvector).
+    Вес A: название и артикул, B: производитель, C: спецификации.
+    Должно совпадать с выражением в миграции add_parts_search_vector.
+    """
+    specs_text = (
+        select(func.string_agg(PartSpecification.spec_name + " " + PartSpecification.spec_value, " "))
+        .where(PartSpecification.part_id == Part.part_id)
+        .correlate(Part)
+        .scalar_subquery()
+    )
+    return (
+        func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(Part.part_name, "")), _weight("A"))
+        .op("||")(func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(Part.part_article, "")), _weight("A")))
+        .op("||")(func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(Part.manufacturer, "")), _weight("B")))
+        .op("||")(func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(specs_text, "")), _weight("C")))
+    )
+
+
+async def refresh_part_search_vector(session: AsyncSession, part_id: int) -> None:
+    """
+    Пересчитывает поисковый документ запчасти.
+    Вызывать после flush спецификаций, в той же транзакции.
+    """
+    await session.execute(
+        update(Part)
+        .where(Part.part_id == part_id)
+        .values(search_vector=_search_document_expr())
+    )
+
+
+def build_search_query(query: str) -> Optional[str]:
+    """
+    Строка для to_tsquery: каждое слово ищется по префиксу, слова объединяются через OR.
+    "тормозной дис" -> "тормозной:* | дис:*"
+    """
+    words = [w for w in re.findall(r"[^\W_]+", query.lower()) if len(w) >= 2]
+    if not words:
+        return None
+    return " | ".join(f"{w}:*" for w in words)
+
+
+# Короче трёх символов триграммный индекс не помогает
+TRGM_MIN_LENGTH = 3
+
+
+def _article_condition_and_rank(query: str):
+    """
+    Поиск по артикулу через pg_trgm: подстрока (ILIKE) или опечатка (оператор %).
+    Оба варианта используют GIN индекс ix_parts_part_article_trgm.
+    """
+    term = query.strip()
+    if len(term) < TRGM_MIN_LENGTH:
+        return None, None
+    condition = or_(
+        Part.part_article.icontains(term, autoescape=True),
+        Part.part_article.op("%")(term),
+    )
+    return condition, func.coalesce(func.similarity(Part.part_article, term), 0)
+
+
+def _search_condition_and_rank(query: str):
+    """
+    Возвращает (условие, выражение релевантности) для текстового запроса
+    или (None, None), если в запросе нет слов для поиска.
+    Полнотекстовый поиск дополняется нечётким поиском по артикулу.
     """
-    result_ids = set(parent_ids)
-    queue = list(parent_ids)
+    conditions = []
+    ranks = []
 
-    while queue:
-        parent_id = queue.pop(0)
-        subq = select(PartCategory.category_id).where(PartCategory.parent_id == parent_id)
-        subcats = await session.execute(subq)
-        new_ids = subcats.scalars().all()
-        for cid in new_ids:
-            if cid not in result_ids:
-                result_ids.add(cid)
-                queue.append(cid)
+    tsquery_text = build_search_query(query)
+    if tsquery_text:
+        tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+        conditions.append(Part.search_vector.op("@@")(tsquery))
+        ranks.append(func.ts_rank(Part.search_vector, tsquery))
 
-    return list(result_ids)
+    article_condition, article_rank = _article_condition_and_rank(query)
+    if article_condition is not None:
+        conditions.append(article_condition)
+        ranks.append(article_rank)
+
+    if not conditions:
+        return None, None
+    rank = ranks[0]
+    for extra in ranks[1:]:
+        rank = rank + extra
+    return or_(*conditions), rank
 
 
 # --- ПОИСК ЗАПЧАСТЕЙ ---
@@ -197,44 +304,17 @@ async def search_parts(
 ) -> List[Part]:
     """
     Поиск по: названию, артикулу, производителю, спецификациям.
+    Использует GIN индексы (search_vector и триграммы артикула), результаты упорядочены по релевантности.
     """
-    query = query.strip()
-    if not query:
-        stmt = (
-            select(Part)
-            .options(selectinload(Part.category))
-            .options(selectinload(Part.specifications))
-            .options(selectinload(Part.images))
-            .limit(limit)
-            .offset(offset)
-        )
-        result = await session.execute(stmt)
-        return result.scalars().all()
-
-    keywords = query.split()
-    conditions = []
+    search_condition, search_rank = _search_condition_and_rank(query.strip())
 
-    for word in keywords:
-        if len(word) < 2:
-            continue
-        word = f"%{word}%"
-        conditions.append(Part.part_name.ilike(word))
-        conditions.append(Part.part_article.ilike(word))
-        conditions.append(Part.manufacturer.ilike(word))
-
-        # Поиск в спецификациях
-        subq = select(PartSpecification.part_id).where(
-            or_(
-                PartSpecification.spec_name.ilike(word),
-                PartSpecification.spec_value.ilike(word)
-            )
+    stmt = select(Part)
+    if search_condition is not None:
+        stmt = (
+            stmt
+            .where(search_condition)
+            .order_by(search_rank.desc(), Part.part_id.desc())
         )
-        conditions.append(Part.part_id.in_(subq))
-
-    if not conditions:
-        stmt = select(Part)
-    else:
-        stmt = select(Part).where(or_(*conditions))
 
     stmt = (
         stmt
@@ -250,58 +330,81 @@ async def search_parts(
 
 
 # --- ФИЛЬТРАЦИЯ ПО СПЕЦИФИКАЦИЯМ ---
-def _numeric_value_expr():
+# Число из значения спецификации: оставляем цифры/знак/запятую/точку, запятая -> точка.
+# Не больше 12 знаков в целой части — столько помещается в spec_value_num NUMERIC(18, 6).
+# То же правило — в миграции add_spec_value_num.
+_SPEC_NUMBER_RE = re.compile(r"^-?[0-9]{1,12}(\.[0-9]+)?$")
+
+
+def parse_spec_number(value: Optional[str]) -> Optional[Decimal]:
     """
-    SQL выражение для безопасного извлечения числа из PartSpecification.spec_value (PostgreSQL).
-    Возвращает float или NULL, если распарсить нельзя.
+    Числовое значение спецификации для spec_value_num или None, если это не число.
     """
-    # 1) оставляем только цифры/знак/запятую/точку
-    cleaned = func.regexp_replace(PartSpecification.spec_value, r"[^0-9,\\.\\-]", "", "g")
-    # 2) заменяем запятую на точку
-    cleaned = func.replace(cleaned, ",", ".")
-    # 3) NULL если пусто
-    cleaned = func.nullif(cleaned, "")
-    # 4) кастуем только если это валидное число вида -12.34
-    # Используем класс [0-9], чтобы не зависеть от поддержки \d в postgres regex
-    is_number = cleaned.op("~")(r"^-?[0-9]+(\\.[0-9]+)?$")
-    return case((is_number, cast(cleaned, Float)), else_=None)
+    if not value:
+        return None
+    cleaned = re.sub(r"[^0-9,.\-]", "", value).replace(",", ".")
+    if not _SPEC_NUMBER_RE.match(cleaned):
+        return None
+    return Decimal(cleaned).quantize(Decimal("0.000001"))
 
 
-def build_spec_conditions(specs_filter: Dict[str, Union[str, List[str], Dict]]) -> List:
+def _make_specification(part_id: int, spec: dict) -> PartSpecification:
+    spec_value = spec["spec_value"].strip()
+    return PartSpecification(
+        part_id=part_id,
+        spec_name=spec["spec_name"].strip(),
+        spec_value=spec_value,
+        spec_value_num=parse_spec_number(spec_value),
+    )
+
+
+def build_spec_condition(spec_name: str, spec_values: Union[str, List[str], Dict]):
     """
-    Строит условия:
+    Условие на одну спецификацию или None, если фильтр пустой:
     - options: у запчасти есть спецификация с таким именем и значением (IN)
     - range: у запчасти есть спецификация с таким именем и числовым значением в диапазоне
     """
-    conditions = []
-    for spec_name, spec_values in specs_filter.items():
-        # range: {"min": 10, "max": 20}
-        if isinstance(spec_values, dict):
-            min_v = spec_values.get("min", None)
-            max_v = spec_values.get("max", None)
-            num_expr = _numeric_value_expr()
-
-            range_conds = [PartSpecification.spec_name == spec_name, num_expr.is_not(None)]
-            if min_v is not None:
-                range_conds.append(num_expr >= float(min_v))
-            if max_v is not None:
-                range_conds.append(num_expr <= float(max_v))
-
-            subq = select(PartSpecification.part_id).where(and_(*range_conds))
-            conditions.append(Part.part_id.in_(subq))
-            continue
+    # range: {"min": 10, "max": 20}
+    if isinstance(spec_values, dict):
+        min_v = spec_values.get("min", None)
+        max_v = spec_values.get("max", None)
+        # spec_value_num заполняется при записи — диапазон идёт по индексу
+        # (spec_name, spec_value_num, part_id)
+        num_expr = PartSpecification.spec_value_num
+
+        range_conds = [PartSpecification.spec_name == spec_name, num_expr.is_not(None)]
+        if min_v is not None:
+            range_conds.append(num_expr >= float(min_v))
+        if max_v is not None:
+            range_conds.append(num_expr <= float(max_v))
+
+        subq = select(PartSpecification.part_id).where(and_(*range_conds))
+        return Part.part_id.in_(subq)
+
+    # options: "X" или ["X","Y"]
+    if isinstance(spec_values, str):
+        spec_values = [spec_values]
+
+    if not isinstance(spec_values, list) or len(spec_values) == 0:
+        return None
 
-        # options: "X" или ["X","Y"]
-        if isinstance(spec_values, str):
-            spec_values = [spec_values]
+    # Значение из фильтра — как в UI ("значение единица"); голое значение тоже подходит
+    subq = select(PartSpecification.part_id).where(
+        PartSpecification.spec_name == spec_name,
+        or_(PartSpecification.spec_value.in_(spec_values), _spec_option_expr().in_(spec_values)),
+    )
+    return Part.part_id.in_(subq)
 
-        if not isinstance(spec_values, list) or len(spec_values) == 0:
-            continue
 
-        subq = select(PartSpecification.part_id).where(
-            and_(PartSpecification.spec_name == spec_name, PartSpecification.spec_value.in_(spec_values))
-        )
-        conditions.append(Part.part_id.in_(subq))
+def build_spec_conditions(specs_filter: Dict[str, Union[str, List[str], Dict]]) -> List:
+    """
+    Условия по всем спецификациям фильтра (см. build_spec_condition).
+    """
+    conditions = []
+    for spec_name, spec_values in specs_filter.items():
+        condition = build_spec_condition(spec_name, spec_values)
+        if condition is not None:
+            conditions.append(condition)
     return conditions
 
 
@@ -360,7 +463,15 @@ async def filter_parts(
 
 
 # --- ПОИСК + ФИЛЬТРАЦИЯ ---
-async def search_and_filter_parts(
+def in_stock_expr():
+    """
+    Признак наличия для сортировки. Константа — литерал, а не параметр,
+    иначе выражение не совпадёт с индексом ix_parts_listing_order.
+    """
+    return Part.stock_count > literal_column("0")
+
+
+async def _build_parts_listing_ids_stmt(
     session: AsyncSession,
     query: str = None,
     category_ids: Optional[List[int]] = None,
@@ -369,22 +480,19 @@ async def search_and_filter_parts(
     min_stock: Optional[int] = None,
     manufacturer: Optional[str] = None,
     specs_filter: Optional[Dict[str, Union[str, List[str]]]] = None,
-    limit: int = 20,
-    offset: int = 0,
-) -> List[Part]:
+):
     """
-    Сначала ищет, потом фильтрует.
+    Строит запрос part_id для списка (поиск + фильтры) и ключи сортировки по убыванию.
     """
-    stmt = select(Part)
+    stmt = select(Part.part_id)
     conditions = []
 
-    # Поиск
+    # Поиск (полнотекстовый, по индексу)
+    search_rank = None
     if query and query.strip():
-        found_parts = await search_parts(session, query, limit=200)
-        if not found_parts:
-            return []
-        found_ids = [p.part_id for p in found_parts]
-        conditions.append(Part.part_id.in_(found_ids))
+        search_condition, search_rank = _search_condition_and_rank(query.strip())
+        if search_condition is not None:
+            conditions.append(search_condition)
 
     # Категории
     if category_ids:
@@ -408,25 +516,285 @@ async def search_and_filter_parts(
     if conditions:
         stmt = stmt.where(and_(*conditions))
 
-    # Сортировка: сначала товары с stock_count > 0, потом с stock_count = 0
-    from sqlalchemy import case
-    stock_priority = case(
-        (Part.stock_count > 0, 0),
-        else_=1
+    # Сортировка (по убыванию): сначала товары с stock_count > 0, потом с stock_count = 0,
+    # внутри — по релевантности поиска (если есть запрос)
+    sort_keys = [in_stock_expr()]
+    if search_rank is not None:
+        sort_keys.append(search_rank)
+    sort_keys.append(Part.part_id)
+
+    return stmt, sort_keys
+
+
+@dataclass(frozen=True)
+class PartListItem:
+    """
+    Запчасть в списке: только то, что отдаёт /api/parts/ (без спецификаций и ORM-состояния).
+    """
+    part_id: int
+    part_name: str
+    part_article: Optional[str]
+    description: Optional[str]
+    price: Optional[float]
+    stock_count: int
+    manufacturer: Optional[str]
+    category_id: Optional[int]
+    category_name: Optional[str]
+    parent_id: Optional[int]
+    primary_image: Optional[Dict]  # первое фото {"url", "alt_text", "sort_order"}, без галереи
+
+
+async def get_part_list_items(session: AsyncSession, part_ids: List[int]) -> List[PartListItem]:
+    """
+    Проекция запчастей для списка в порядке part_ids: колонки запчастей и главное фото —
+    двумя запросами, категории — из снимка дерева.
+    """
+    if not part_ids:
+        return []
+    rows = (await session.execute(
+        select(
+            Part.part_id, Part.part_name, Part.part_article, Part.description,
+            Part.price, Part.stock_count, Part.manufacturer, Part.category_id,
+        )
+        .where(Part.part_id.in_(part_ids))
+    )).all()
+
+    primary_images = await get_primary_images(session, Image.part_id, part_ids)
+    tree = await get_category_tree(session)
+    items = [
+        PartListItem(
+            part_id=row.part_id,
+            part_name=row.part_name,
+            part_article=row.part_article,
+            description=row.description,
+            price=float(row.price) if row.price is not None else None,
+            stock_count=row.stock_count,
+            manufacturer=str(row.manufacturer) if row.manufacturer is not None else None,
+            category_id=row.category_id if row.category_id in tree.names else None,
+            category_name=tree.names.get(row.category_id),
+            parent_id=tree.parents.get(row.category_id),
+            primary_image=primary_images.get(row.part_id),
+        )
+        for row in rows
+    ]
+    return order_by_ids(items, part_ids, key=lambda p: p.part_id)
+
+
+def part_list_item_to_dict(part: PartListItem) -> Dict:
+    """
+    Представление запчасти в списках API (/api/parts/, лента главной).
+    images — только главное фото: размер ответа не зависит от галереи.
+    """
+    return {
+        "part_id": part.part_id,
+        "part_name": part.part_name,
+        "part_article": part.part_article,
+        "description": part.description,
+        "price": part.price,
+        "stock_count": part.stock_count,
+        "manufacturer": part.manufacturer,
+        "category": {
+            "category_id": part.category_id,
+            "category_name": part.category_name,
+            "parent_id": part.parent_id,
+        },
+        "images": [part.primary_image] if part.primary_image else [],
+    }
+
+
+async def search_and_filter_parts_page(
+    session: AsyncSession,
+    query: str = None,
+    category_ids: Optional[List[int]] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_stock: Optional[int] = None,
+    manufacturer: Optional[str] = None,
+    specs_filter: Optional[Dict[str, Union[str, List[str]]]] = None,
+    limit: int = 20,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> Page[PartListItem]:
+    """
+    Страница поиска + фильтрации: один запрос id (limit + 1 для has_more),
+    проекция (get_part_list_items) строится только для запчастей этой страницы.
+    С cursor (next_cursor прошлой страницы) offset не используется.
+    """
+    ids_stmt, sort_keys = await _build_parts_listing_ids_stmt(
+        session,
+        query=query,
+        category_ids=category_ids,
+        min_price=min_price,
+        max_price=max_price,
+        min_stock=min_stock,
+        manufacturer=manufacturer,
+        specs_filter=specs_filter,
     )
-    
-    stmt = (
-        stmt
-        .options(selectinload(Part.category))
-        .options(selectinload(Part.specifications))
-        .options(selectinload(Part.images))
-        .order_by(stock_priority.asc(), Part.part_id.desc())
-        .limit(limit)
-        .offset(offset)
+    ids_page = await fetch_page_ids(session, ids_stmt, sort_keys, limit, offset, cursor)
+    parts = await get_part_list_items(session, ids_page.items)
+    return Page(items=parts, has_more=ids_page.has_more, next_cursor=ids_page.next_cursor)
+
+
+async def search_and_filter_parts(
+    session: AsyncSession,
+    query: str = None,
+    category_ids: Optional[List[int]] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_stock: Optional[int] = None,
+    manufacturer: Optional[str] = None,
+    specs_filter: Optional[Dict[str, Union[str, List[str]]]] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[PartListItem]:
+    """
+    Сначала ищет, потом фильтрует.
+    """
+    page = await search_and_filter_parts_page(
+        session,
+        query=query,
+        category_ids=category_ids,
+        min_price=min_price,
+        max_price=max_price,
+        min_stock=min_stock,
+        manufacturer=manufacturer,
+        specs_filter=specs_filter,
+        limit=limit,
+        offset=offset,
     )
+    return page.items
 
-    result = await session.execute(stmt)
-    return result.scalars().all()
+
+# --- ФАСЕТЫ (СЧЁТЧИКИ ДЛЯ ФИЛЬТРОВ) ---
+async def get_parts_facets(
+    session: AsyncSession,
+    query: str = None,
+    category_id: Optional[int] = None,
+    specs_filter: Optional[Dict[str, Union[str, List[str]]]] = None,
+) -> Dict:
+    """
+    Счётчики для фильтров при текущем поиске и активных фильтрах — одним SQL запросом:
+    - по каждому значению options-спецификации и min/max/count для range-спецификаций
+      (только для leaf категории, как и specs-meta);
+    - по производителям и общее число найденных запчастей.
+
+    Счётчики спецификации считаются без её собственного фильтра (остальные фильтры
+    учитываются), чтобы было видно, сколько даст выбор соседнего значения.
+    """
+    base_conditions = []
+    if query and query.strip():
+        search_condition, _rank = _search_condition_and_rank(query.strip())
+        if search_condition is not None:
+            base_conditions.append(search_condition)
+
+    with_specs = False
+    if category_id:
+        all_category_ids = await get_all_subcategories(session, [category_id])
+        base_conditions.append(Part.category_id.in_(all_category_ids))
+        with_specs = await is_leaf_category(session, category_id)
+
+    # Флаг на каждый активный фильтр: совпадает ли с ним запчасть
+    spec_flags: List[Tuple[str, str]] = []
+    flag_columns = []
+    for spec_name, spec_values in (specs_filter or {}).items():
+        condition = build_spec_condition(spec_name, spec_values)
+        if condition is None:
+            continue
+        flag = f"f{len(flag_columns)}"
+        spec_flags.append((spec_name, flag))
+        flag_columns.append(condition.label(flag))
+
+    base = select(Part.part_id, Part.manufacturer, *flag_columns)
+    if base_conditions:
+        base = base.where(and_(*base_conditions))
+    base = base.cte("facet_base")
+
+    all_flags = [base.c[flag] for _name, flag in spec_flags]
+
+    # Производители + итог (пустой grouping set)
+    manufacturers = (
+        select(
+            literal_column("'manufacturer'").label("kind"),
+            cast(None, String).label("spec_name"),
+            base.c.manufacturer.label("value"),
+            func.grouping(base.c.manufacturer).label("is_total"),
+            func.count().label("cnt"),
+            cast(None, Numeric).label("min_num"),
+            cast(None, Numeric).label("max_num"),
+        )
+        .group_by(func.grouping_sets(tuple_(base.c.manufacturer), tuple_()))
+    )
+    if all_flags:
+        manufacturers = manufacturers.where(and_(*all_flags))
+
+    stmt = manufacturers
+    if with_specs:
+        spec = PartSpecification
+        # Строка спецификации учитывается, если запчасть проходит все фильтры,
+        # кроме фильтра по этой же спецификации
+        other_flags = [or_(spec.spec_name == name, base.c[flag]) for name, flag in spec_flags]
+        # Значения — в том же виде, что и в конфигурации фильтров (spec_option_value)
+        option_value = _spec_option_expr()
+        specs = (
+            select(
+                literal_column("'spec'").label("kind"),
+                spec.spec_name,
+                option_value.label("value"),
+                func.grouping(option_value).label("is_total"),
+                func.count(base.c.part_id.distinct()).label("cnt"),
+                func.min(spec.spec_value_num).label("min_num"),
+                func.max(spec.spec_value_num).label("max_num"),
+            )
+            .join(base, base.c.part_id == spec.part_id)
+            .group_by(func.grouping_sets(tuple_(spec.spec_name, option_value), tuple_(spec.spec_name)))
+        )
+        if other_flags:
+            specs = specs.where(and_(*other_flags))
+        stmt = union_all(manufacturers, specs)
+
+    rows = (await session.execute(stmt)).all()
+
+    total = 0
+    manufacturer_counts = []
+    spec_values: Dict[str, List[Tuple[str, int]]] = {}
+    spec_totals: Dict[str, Tuple[int, Optional[Decimal], Optional[Decimal]]] = {}
+    for kind, spec_name, value, is_total, cnt, min_num, max_num in rows:
+        if kind == "manufacturer":
+            if is_total:
+                total = cnt
+            else:
+                manufacturer_counts.append({"value": value, "count": cnt})
+        elif is_total:
+            spec_totals[spec_name] = (cnt, min_num, max_num)
+        elif value is not None:
+            spec_values.setdefault(spec_name, []).append((value, cnt))
+
+    manufacturer_counts.sort(key=lambda m: (-m["count"], str(m["value"])))
+
+    specs_facets: Dict[str, Dict] = {}
+    if with_specs:
+        # Тип фильтра и полный список значений — из конфигурации категории (кэш),
+        # чтобы значения с нулём тоже были видны
+        config = await get_filters_config_for_category(session, category_id)
+        for spec_name in sorted(set(config) | set(spec_totals)):
+            counts = dict(spec_values.get(spec_name, []))
+            spec_type = config.get(spec_name, {}).get("type") or detect_spec_type(list(counts))
+            cnt, min_num, max_num = spec_totals.get(spec_name, (0, None, None))
+            if spec_type == "range":
+                specs_facets[spec_name] = {
+                    "type": "range",
+                    "count": cnt,
+                    "min": float(min_num) if min_num is not None else None,
+                    "max": float(max_num) if max_num is not None else None,
+                }
+            else:
+                values = set(counts) | set(config.get(spec_name, {}).get("values", []))
+                specs_facets[spec_name] = {
+                    "type": "options",
+                    "values": [{"value": v, "count": counts.get(v, 0)} for v in sorted(values)],
+                }
+
+    return {"total": total, "manufacturers": manufacturer_counts, "specs": specs_facets}
 
 
 # === CRUD: ЗАПЧАСТИ ===
@@ -435,10 +803,12 @@ async def create_part(
     session: AsyncSession,
     part_data: dict,
     specifications: List[dict],  # [{"spec_name": "Диаметр", "spec_value": "280 мм"}]
-    image_urls: List[str] = None  # [{"url": "...", "alt_text": "...", "sort_order": 0}]
+    image_urls: List[str] = None,  # [{"url": "...", "alt_text": "...", "sort_order": 0}]
+    actor_id: Optional[int] = None,
 ) -> Part:
     """
     Создаёт запчасть, связывает с категорией, добавляет спецификации и фото.
+    Начальный остаток пишется в журнал склада той же транзакцией (actor_id — кто создал).
     """
     # Проверка: существует ли категория
     category_id = part_data["category_id"]
@@ -461,15 +831,11 @@ async def create_part(
     part = Part(**part_data)
     session.add(part)
     await session.flush()  # чтобы получить part_id
+    record_initial_stock(session, part, actor_id=actor_id)
 
     # Добавляем спецификации
     for spec in specifications:
-        spec_obj = PartSpecification(
-            part_id=part.part_id,
-            spec_name=spec["spec_name"].strip(),
-            spec_value=spec["spec_value"].strip()
-        )
-        session.add(spec_obj)
+        session.add(_make_specification(part.part_id, spec))
 
     # Добавляем фото
     if image_urls:
@@ -482,8 +848,13 @@ async def create_part(
             )
             session.add(img)
 
+    # Поисковый документ строится из уже записанных спецификаций
+    await session.flush()
+    await refresh_part_search_vector(session, part.part_id)
+
     # Инвалидируем кэш спецификаций для этой категории
-    clear_parts_filters_cache()
+    await invalidate_parts_category_cache(session, category_id)
+    await invalidate_responses(session, PARTS_SCOPE)
 
     await session.commit()
     await session.refresh(part)
@@ -519,6 +890,8 @@ async def update_part(
     if not part:
         return None
 
+    previous_category_id = part.category_id
+
     # Обновляем основные поля
     if part_data:
         for key, value in part_data.items():
@@ -531,12 +904,7 @@ async def update_part(
             delete(PartSpecification).where(PartSpecification.part_id == part_id)
         )
         for spec in specifications:
-            spec_obj = PartSpecification(
-                part_id=part.part_id,
-                spec_name=spec["spec_name"].strip(),
-                spec_value=spec["spec_value"].strip()
-            )
-            session.add(spec_obj)
+            session.add(_make_specification(part.part_id, spec))
 
     # Обновляем фото
     if image_urls is not None:
@@ -552,8 +920,13 @@ async def update_part(
             )
             session.add(img)
 
-    # Сброс кэша
-    clear_parts_filters_cache()
+    # Поисковый документ строится из уже записанных спецификаций
+    await session.flush()
+    await refresh_part_search_vector(session, part.part_id)
+
+    # Сброс кэша (и старой категории, если запчасть перенесли)
+    await invalidate_parts_category_cache(session, previous_category_id, part.category_id)
+    await invalidate_responses(session, PARTS_SCOPE, part_detail_scope(part_id))
 
     await session.commit()
     await session.refresh(part)
@@ -581,7 +954,8 @@ async def delete_part(
     await session.delete(part)
 
     # Сброс кэша
-    clear_parts_filters_cache()
+    await invalidate_parts_category_cache(session, part.category_id)
+    await invalidate_responses(session, PARTS_SCOPE, part_detail_scope(part_id))
 
     await session.commit()
     return True
\ No newline at end of file
@@ -1,13 +1,92 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy import select, update
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Optional, List
 
+from src.cache.generations import bump_generation, get_generation
+from src.cache.lru import TTLCache
+from src.config import USER_CACHE_SIZE, USER_CACHE_TTL
 from src.database.models import User, UserAddress, Order, OrderItem
-from passlib.context import CryptContext
+from src.services.passwords import hash_password
+
+
+# --- СНИМКИ ПОЛЬЗОВАТЕЛЕЙ ДЛЯ АВТОРИЗАЦИИ ---
+# Зависимости авторизации (src/auth/jwt.py) берут пользователя из кэша процесса
+# по user_id из токена, а не из БД на каждый запрос. Снимок живёт USER_CACHE_TTL
+# секунд; любое изменение пользователей увеличивает поколение области "users"
+# (invalidate_user_snapshots) — снимки сбрасываются во всех воркерах.
+
+USERS_SCOPE = "users"
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    Текущий пользователь: поля User без пароля и связей. Не ORM-объект —
+    для изменений загружайте пользователя через get_user_by_id.
+    """
+    user_id: int
+    email: str
+    first_name: str
+    last_name: str
+    middle_name: Optional[str]
+    phone_number: Optional[str]
+    role: str
+    status: str
+    registration_date: Optional[datetime]
+    email_verified: bool
+    phone_verified: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            user_id=user.user_id,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            middle_name=user.middle_name,
+            phone_number=user.phone_number,
+            role=user.role,
+            status=user.status,
+            registration_date=user.registration_date,
+            email_verified=user.email_verified,
+            phone_verified=user.phone_verified,
+        )
+
+
+_SNAPSHOTS: TTLCache[Optional[UserSnapshot]] = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+_SNAPSHOT_MISSING = object()
 
-# Инициализация контекста для хеширования
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+async def get_user_snapshot(
+    session: AsyncSession,
+    user_id: Optional[int] = None,
+    email: Optional[str] = None,
+) -> Optional[UserSnapshot]:
+    """
+    Снимок пользователя по user_id (или по email — для токенов без user_id).
+    None — пользователя нет (отсутствие тоже кэшируется до смены поколения).
+    """
+    version = await get_generation(session, USERS_SCOPE)
+    key = (version, "id", user_id) if user_id is not None else (version, "email", email)
+    snapshot = _SNAPSHOTS.get(key, _SNAPSHOT_MISSING)
+    if snapshot is not _SNAPSHOT_MISSING:
+        return snapshot
+
+    user = await get_user_by_id(session, user_id) if user_id is not None else await get_user_by_email(session, email)
+    snapshot = UserSnapshot.from_user(user) if user else None
+    _SNAPSHOTS.set(key, snapshot)
+    return snapshot
+
+
+async def invalidate_user_snapshots(session: AsyncSession) -> None:
+    """
+    Сбрасывает снимки пользователей во всех воркерах. Вызывать в транзакции,
+    изменяющей users, до commit.
+    """
+    await bump_generation(session, USERS_SCOPE)
 
 
 async def get_user_by_id(session: AsyncSession, user_id: int) -> Optional[User]:
@@ -37,7 +116,7 @@ async def create_user(session: AsyncSession, user_data: dict) -> User:
     Пароль хешируется.
     """
     # Хешируем пароль
-    hashed_password = pwd_context.hash(user_data["password_hash"])
+    hashed_password = await hash_password(user_data["password_hash"])
     
     user = User(
         email=user_data["email"],
@@ -66,9 +145,10 @@ async def update_user(session: AsyncSession, user_id: int, update_data: dict) ->
     for key, value in update_data.items():
         if value is not None and hasattr(user, key):
             if key == "password_hash":
-                value = pwd_context.hash(value)  # хешируем новый пароль
+                value = await hash_password(value)  # хешируем новый пароль
             setattr(user, key, value)
 
+    await invalidate_user_snapshots(session)
     await session.commit()
     await session.refresh(user)
     return user
@@ -82,7 +162,7 @@ async def change_user_password(session: AsyncSession, user_id: int, new_password
     if not user:
         return False
 
-    user.password_hash = pwd_context.hash(new_password)
+    user.password_hash = await hash_password(new_password)
     await session.commit()
     return True
 
@@ -96,6 +176,7 @@ async def activate_user(session: AsyncSession, user_id: int) -> bool:
         return False
 
     user.status = "Активный"
+    await invalidate_user_snapshots(session)
     await session.commit()
     return True
 
@@ -109,6 +190,7 @@ async def set_email_verified(session: AsyncSession, user_id: int) -> bool:
         return False
 
     user.email_verified = True
+    await invalidate_user_snapshots(session)
     await session.commit()
     return True
 
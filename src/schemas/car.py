@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
-from .image import ImageBase
+from typing_extensions import TypedDict
+from .image import ImageBase, ImageOut
 
 # Отдельно — данные из CarTrim (комплектация)
 class CarTrimBase(BaseModel):
@@ -39,9 +40,69 @@ class CarUpdate(BaseModel):
     color: Optional[str] = None
     price: Optional[float] = None
 
-class CarResponse(CarBase):
-    trim: CarTrimBase
-    images: List[ImageBase] = []
+# --- ОТВЕТЫ API ---
+# TypedDict + заранее построенный TypeAdapter: ответ сериализуется pydantic-core
+# напрямую в JSON, без jsonable_encoder и без валидации (src/api/serializers.py)
 
-    class Config:
-        from_attributes = True  # было: orm_mode = True
+class CarTrimOut(TypedDict):
+    trim_id: int
+    trim_name: Optional[str]
+    brand_name: Optional[str]
+    model_name: Optional[str]
+    engine_volume: Optional[float]
+    engine_power: Optional[int]
+    engine_torque: Optional[int]
+    fuel_type: Optional[str]
+    transmission: Optional[str]
+    drive_type: Optional[str]
+    body_type: Optional[str]
+    doors: Optional[int]
+    seats: Optional[int]
+
+# /api/cars/{car_id}
+class CarResponse(TypedDict):
+    car_id: int
+    vin: str
+    production_year: int
+    condition: str
+    mileage: int
+    color: str
+    price: Optional[float]
+    trim: CarTrimOut
+    images: List[ImageOut]
+
+class CarListTrimOut(TypedDict):
+    brand_name: str
+    model_name: str
+    trim_name: str
+
+class CarListItemOut(TypedDict):
+    car_id: int
+    vin: str
+    production_year: int
+    condition: str
+    mileage: int
+    color: str
+    price: Optional[float]
+    is_visible: bool
+    availability: str
+    trim: CarListTrimOut
+    images: List[ImageOut]  # только главное фото
+
+# /api/cars/
+class CarListResponse(TypedDict):
+    cars: List[CarListItemOut]
+    offset: int
+    limit: int
+    has_more: bool
+    next_cursor: Optional[str]
+    total: int
+
+# /api/home-cars
+class HomeCarsResponse(TypedDict):
+    cars: List[CarListItemOut]
+    total: int
+
+car_response_adapter = TypeAdapter(CarResponse)
+car_list_response_adapter = TypeAdapter(CarListResponse)
+home_cars_response_adapter = TypeAdapter(HomeCarsResponse)
@@ -1,7 +1,14 @@
 from pydantic import BaseModel
 from typing import Optional
+from typing_extensions import TypedDict
 
 class ImageBase(BaseModel):
     url: str
     alt_text: Optional[str] = None
     sort_order: int
+
+# Фото в ответах API (сериализация через TypeAdapter, без валидации)
+class ImageOut(TypedDict):
+    url: str
+    alt_text: Optional[str]
+    sort_order: int
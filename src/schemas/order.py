@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
+from typing_extensions import NotRequired, TypedDict
 from datetime import datetime
 from .user import UserAddressBase
 
@@ -8,11 +9,6 @@ class OrderItemBase(BaseModel):
     part_id: int
     quantity: int
 
-class OrderItemResponse(OrderItemBase):
-    part_name: str
-    part_price: float
-    total_price: float
-
 class OrderBase(BaseModel):
     order_id: int
     user_id: int
@@ -40,9 +36,60 @@ class OrderUpdate(BaseModel):
     tracking_number: Optional[str] = None
     estimated_delivery: Optional[datetime] = None
 
-class OrderResponse(OrderBase):
-    shipping_address: UserAddressBase
-    items: List[OrderItemResponse]
+# --- ОТВЕТЫ API ---
+# TypedDict + заранее построенный TypeAdapter (см. schemas/car.py)
+
+class OrderItemOut(TypedDict):
+    part_id: int
+    part_name: str
+    manufacturer: Optional[str]
+    quantity: int
+    price: float
+    total: float
+    image: str
+
+class OrderCarOut(TypedDict):
+    car_id: int
+    brand: str
+    model: str
+    year: Optional[int]
+    price: float
+    image: str
+
+class DeliveryInfoOut(TypedDict):
+    type: str  # "address" | "pickup"
+    full_address: str
+
+class OrderUserOut(TypedDict):
+    user_id: int
+    email: str
+    first_name: str
+    last_name: str
+    phone_number: Optional[str]
+
+# Заказ в личном кабинете; admin_notes и user — только в управлении заказами
+class OrderResponse(TypedDict):
+    order_id: int
+    order_date: Optional[str]  # ISO 8601
+    status: str
+    status_updated: Optional[str]  # ISO 8601
+    payment_method: str
+    is_paid: bool
+    service_fee: float
+    shipping_cost: float
+    discount: float
+    total_amount: float
+    tracking_number: Optional[str]
+    estimated_delivery: Optional[str]  # ISO 8601
+    customer_notes: Optional[str]
+    order_items: List[OrderItemOut]
+    car_orders: List[OrderCarOut]
+    delivery_info: Optional[DeliveryInfoOut]
+    admin_notes: NotRequired[Optional[str]]
+    user: NotRequired[OrderUserOut]
+
+# /account/api/orders, /account/api/management/orders
+class OrderListResponse(TypedDict):
+    orders: List[OrderResponse]
 
-    class Config:
-        from_attributes = True
+order_list_response_adapter = TypeAdapter(OrderListResponse)
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
-from .image import ImageBase
+from typing_extensions import TypedDict
+from .image import ImageBase, ImageOut
 
 class PartSpecificationBase(BaseModel):
     spec_name: str
@@ -33,10 +34,48 @@ class PartUpdate(BaseModel):
     manufacturer: Optional[str] = None
     category_id: Optional[int] = None
 
-class PartResponse(PartBase):
-    category: PartCategoryBase
-    specifications: List[PartSpecificationBase] = []
-    images: List[ImageBase] = []
+# --- ОТВЕТЫ API ---
+# TypedDict + заранее построенный TypeAdapter (см. schemas/car.py)
 
-    class Config:
-        from_attributes = True
+class PartCategoryOut(TypedDict):
+    category_id: Optional[int]
+    category_name: Optional[str]
+    parent_id: Optional[int]
+
+class PartSpecificationOut(TypedDict):
+    spec_name: str
+    spec_value: str
+    spec_unit: Optional[str]
+
+class PartListItemOut(TypedDict):
+    part_id: int
+    part_name: str
+    part_article: Optional[str]
+    description: Optional[str]
+    price: Optional[float]
+    stock_count: int
+    manufacturer: Optional[str]
+    category: PartCategoryOut
+    images: List[ImageOut]  # в списках — только главное фото
+
+# /api/parts/{part_id}
+class PartResponse(PartListItemOut):
+    specifications: List[PartSpecificationOut]
+
+# /api/parts/
+class PartListResponse(TypedDict):
+    parts: List[PartListItemOut]
+    offset: int
+    limit: int
+    has_more: bool
+    next_cursor: Optional[str]
+    total: int
+
+# /api/home-parts
+class HomePartsResponse(TypedDict):
+    parts: List[PartListItemOut]
+    total: int
+
+part_response_adapter = TypeAdapter(PartResponse)
+part_list_response_adapter = TypeAdapter(PartListResponse)
+home_parts_response_adapter = TypeAdapter(HomePartsResponse)
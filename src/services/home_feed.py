@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+from src.cache.generations import CARS_SCOPE, PARTS_SCOPE, get_generation
+from src.cache.http import etag_for, render_json
+from src.config import CACHE_GENERATIONS_POLL_INTERVAL, HOME_FEED_REFRESH_INTERVAL, HOME_FEED_SIZE
+from src.database.database import async_read_session_maker
+from src.database.models import CarAvailabilityEnum, CarListing, Part
+from src.repositories.car_repo import car_list_item_to_dict, get_cars_by_ids
+from src.repositories.category_tree import CATEGORIES_SCOPE
+from src.repositories.part_repo import get_part_list_items, in_stock_expr, part_list_item_to_dict
+from src.schemas.car import home_cars_response_adapter
+from src.schemas.part import home_parts_response_adapter
+
+logger = logging.getLogger(__name__)
+
+
+# --- ЛЕНТА ГЛАВНОЙ СТРАНИЦЫ ---
+# /api/home-cars и /api/home-parts отдают заранее собранные байты JSON.
+# Фоновая задача пересобирает их при смене поколений автомобилей / запчастей /
+# категорий (проверка раз в CACHE_GENERATIONS_POLL_INTERVAL) и не реже чем раз
+# в HOME_FEED_REFRESH_INTERVAL. В запросе к БД не обращаемся; только до первой
+# сборки (холодный старт) лента собирается по запросу.
+
+HOME_CARS = "cars"
+HOME_PARTS = "parts"
+
+# Поколения, от которых зависит каждая лента
+_SCOPES = {
+    HOME_CARS: (CARS_SCOPE,),
+    HOME_PARTS: (PARTS_SCOPE, CATEGORIES_SCOPE),
+}
+
+_PAYLOADS: Dict[str, Tuple[str, bytes]] = {}  # лента -> (ETag, тело)
+_VERSIONS: Dict[str, Tuple[int, ...]] = {}
+_BUILT_AT = 0.0
+_LOCK = asyncio.Lock()
+_TASK: Optional[asyncio.Task] = None
+
+
+# --- ОТБОР ---
+async def _featured_cars(session) -> dict:
+    """
+    Новые автомобили в продаже — по витрине car_listings, в проекции списка /api/cars/.
+    """
+    result = await session.execute(
+        select(CarListing.car_id)
+        .where(
+            CarListing.availability == CarAvailabilityEnum.AVAILABLE.value,
+            CarListing.is_visible == True
+        )
+        .order_by(CarListing.car_id.desc())
+        .limit(HOME_FEED_SIZE)
+    )
+    cars = await get_cars_by_ids(session, list(result.scalars().all()))
+    cars_data = [car_list_item_to_dict(car) for car in cars]
+    return {"cars": cars_data, "total": len(cars_data)}
+
+
+async def _featured_parts(session) -> dict:
+    """
+    Новые запчасти, сначала в наличии (порядок индекса ix_parts_listing_order),
+    в той же проекции, что и список /api/parts/.
+    """
+    result = await session.execute(
+        select(Part.part_id)
+        .order_by(in_stock_expr().desc(), Part.part_id.desc())
+        .limit(HOME_FEED_SIZE)
+    )
+    parts = await get_part_list_items(session, list(result.scalars().all()))
+    parts_data = [part_list_item_to_dict(part) for part in parts]
+    return {"parts": parts_data, "total": len(parts_data)}
+
+
+# Лента -> (отбор, TypeAdapter схемы ответа)
+_BUILDERS = {
+    HOME_CARS: (_featured_cars, home_cars_response_adapter),
+    HOME_PARTS: (_featured_parts, home_parts_response_adapter),
+}
+
+
+# --- СБОРКА ---
+async def refresh(force: bool = False) -> None:
+    """
+    Пересобирает ленты, поколения которых изменились (все — при force).
+    """
+    global _BUILT_AT
+    async with _LOCK:
+        async with async_read_session_maker() as session:
+            for name, scopes in _SCOPES.items():
+                # Поколения читаются до сборки: изменение во время неё вызовет ещё одну
+                versions = tuple([await get_generation(session, scope) for scope in scopes])
+                if not force and name in _PAYLOADS and _VERSIONS.get(name) == versions:
+                    continue
+                build, adapter = _BUILDERS[name]
+                body = render_json(await build(session), adapter)
+                _PAYLOADS[name] = (etag_for(body), body)
+                _VERSIONS[name] = versions
+        if force:
+            _BUILT_AT = time.monotonic()
+
+
+async def get_payload(name: str) -> Tuple[str, bytes]:
+    """
+    Готовая лента (ETag, тело). Собирает её только при холодном старте.
+    """
+    payload = _PAYLOADS.get(name)
+    if payload is None:
+        await refresh()
+        payload = _PAYLOADS[name]
+    return payload
+
+
+async def _run() -> None:
+    while True:
+        try:
+            force = time.monotonic() - _BUILT_AT >= HOME_FEED_REFRESH_INTERVAL
+            await refresh(force=force)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Остаётся прошлая версия ленты; следующая попытка — на следующем тике
+            logger.exception("Не удалось обновить ленту главной страницы")
+        await asyncio.sleep(CACHE_GENERATIONS_POLL_INTERVAL)
+
+
+def start() -> None:
+    global _TASK
+    if _TASK is None or _TASK.done():
+        _TASK = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    global _TASK
+    if _TASK is not None:
+        _TASK.cancel()
+        try:
+            await _TASK
+        except asyncio.CancelledError:
+            pass
+        _TASK = None
@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+
+from src.config import BCRYPT_ROUNDS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_WORKERS
+
+T = TypeVar("T")
+
+
+# --- ХЭШИРОВАНИЕ ПАРОЛЕЙ ---
+# bcrypt занимает CPU на 100–300 мс; в event loop это блокирует все запросы воркера.
+# Хэширование и проверка идут в отдельном пуле из PASSWORD_HASH_WORKERS потоков
+# (bcrypt отпускает GIL). Если операций в работе и в очереди уже
+# PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT, новая сразу получает
+# PasswordHashingBusy (503), а не ждёт неограниченно.
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_IN_FLIGHT = 0  # в работе + в очереди
+_REJECTED = 0
+
+
+class PasswordHashingBusy(Exception):
+    """Пул хэширования паролей перегружен — повторить запрос позже."""
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _EXECUTOR
+
+
+async def _run(func: Callable[..., T], *args) -> T:
+    global _IN_FLIGHT, _REJECTED
+    if _IN_FLIGHT >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT:
+        _REJECTED += 1
+        raise PasswordHashingBusy()
+    _IN_FLIGHT += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor(), func, *args)
+    finally:
+        _IN_FLIGHT -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    Проверяет пароль. Второй элемент — новый хэш, если сохранённый сделан
+    с другими настройками (например, сменилась BCRYPT_ROUNDS): его нужно записать.
+    """
+    return await _run(pwd_context.verify_and_update, password, password_hash)
+
+
+def stats() -> Dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue_limit": PASSWORD_HASH_QUEUE_LIMIT,
+        "in_flight": _IN_FLIGHT,
+        "queued": max(_IN_FLIGHT - PASSWORD_HASH_WORKERS, 0),
+        "rejected": _REJECTED,
+    }
+
+
+def shutdown() -> None:
+    global _EXECUTOR
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
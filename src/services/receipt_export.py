@@ -0,0 +1,111 @@
+import asyncio
+import csv
+import io
+import logging
+import zipfile
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional
+
+from src.config import RECEIPT_EXPORT_BATCH_SIZE
+from src.database.database import async_read_session_maker
+from src.repositories.order_repo import get_orders_for_receipts
+from src.services import receipts
+
+logger = logging.getLogger(__name__)
+
+# --- ВЫГРУЗКА ЧЕКОВ АРХИВОМ ---
+# ZIP пишется потоком: заказы загружаются пачками по RECEIPT_EXPORT_BATCH_SIZE,
+# чеки пачки рендерятся параллельно в пуле процессов (или берутся из кэша),
+# каждый PDF копируется в архив кусками и сразу уходит клиенту. Файлы открываются
+# и читаются в потоке (asyncio.to_thread), а не в цикле событий.
+# В памяти — только текущая пачка и строки summary.csv.
+
+_CHUNK_SIZE = 64 * 1024
+
+SUMMARY_COLUMNS = ["order_id", "order_date", "customer", "email", "status", "payment_method", "total", "file"]
+
+
+class _ChunkWriter(io.RawIOBase):
+    """
+    Несдвигаемый поток для zipfile: копит записанное до drain().
+    """
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def receipt_file_name(order_id: int) -> str:
+    return f"receipt_{order_id}.pdf"
+
+
+async def _open_receipt(path: str, data: Dict) -> Optional[BinaryIO]:
+    """
+    Открывает PDF чека. Файл мог удалить _prune_stale (тем временем отрендерена
+    другая версия чека заказа) — тогда он рендерится заново; None — файла так и нет.
+    Открытый файл дочитывается, даже если его удалят.
+    """
+    for _attempt in range(2):
+        try:
+            return await asyncio.to_thread(open, path, "rb")
+        except FileNotFoundError:
+            path = await receipts.get_receipt_path(data)
+    logger.warning("Чек заказа %s не попал в архив: файл удалён во время выгрузки", data["order_id"])
+    return None
+
+
+async def stream_receipts_zip(order_ids: List[int]) -> AsyncIterator[bytes]:
+    """
+    ZIP с чеками заказов order_ids и summary.csv. Сессию открывает сам:
+    генератор работает после выхода из обработчика.
+    """
+    writer = _ChunkWriter()
+    summary = []
+    # PDF уже сжат — храним без повторного сжатия
+    with zipfile.ZipFile(writer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for start in range(0, len(order_ids), RECEIPT_EXPORT_BATCH_SIZE):
+            batch_ids = order_ids[start:start + RECEIPT_EXPORT_BATCH_SIZE]
+            async with async_read_session_maker() as session:
+                orders = await get_orders_for_receipts(session, batch_ids)
+                batch = [(order, receipts.receipt_data(order)) for order in orders]
+
+            paths = await asyncio.gather(*[receipts.get_receipt_path(data) for _order, data in batch])
+
+            for (order, data), path in zip(batch, paths):
+                source = await _open_receipt(path, data)
+                if source is None:
+                    continue
+                name = receipt_file_name(order.order_id)
+                with source, archive.open(name, mode="w", force_zip64=True) as target:
+                    while chunk := await asyncio.to_thread(source.read, _CHUNK_SIZE):
+                        target.write(chunk)
+                        yield writer.drain()
+                summary.append([
+                    order.order_id,
+                    data["order_date"],
+                    data["user_name"],
+                    data["email"] or "",
+                    order.status,
+                    data["payment_method"],
+                    f"{receipts.receipt_total(data):.2f}",
+                    name,
+                ])
+            yield writer.drain()
+
+        text = io.StringIO()
+        csv_writer = csv.writer(text, delimiter=";")
+        csv_writer.writerow(SUMMARY_COLUMNS)
+        csv_writer.writerows(summary)
+        # BOM — чтобы Excel открыл кириллицу без выбора кодировки
+        archive.writestr("summary.csv", "\ufeff" + text.getvalue())
+
+    yield writer.drain()
@@ -0,0 +1,375 @@
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from glob import glob
+from typing import Dict, List, Optional, Tuple
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from src.api.serializers import delivery_info, enum_value
+from src.config import RECEIPT_CACHE_DIR, RECEIPT_RENDER_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+# --- PDF-ЧЕКИ ---
+# Обработчик собирает из заказа данные чека (receipt_data) — простой словарь.
+# PDF рендерится в пуле процессов и сохраняется на диск под хэшем этих данных:
+# оплаченный заказ не меняется, поэтому повторное скачивание отдаёт готовый файл.
+# Если данные заказа всё же изменятся, изменится и хэш — чек отрендерится заново,
+# а файлы прежних версий чека этого заказа удалятся.
+# Шрифты и стили регистрируются один раз на процесс (_init_worker).
+
+FONT_PATHS = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    '/System/Library/Fonts/Helvetica.ttc',  # macOS
+    'C:/Windows/Fonts/arial.ttf',  # Windows
+]
+BOLD_FONT_PATHS = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
+    '/System/Library/Fonts/Helvetica-Bold.ttc',  # macOS
+    'C:/Windows/Fonts/arialbd.ttf',  # Windows
+]
+
+DELIVERY_LABELS = {
+    "address": "Адрес доставки",
+    "pickup": "Пункт выдачи",
+}
+
+PAYMENT_METHOD_NAMES = {
+    "CARD": "Банковская карта",
+    "CASH": "Наличные",
+    "ONLINE": "Онлайн оплата"
+}
+
+_FONT = 'Helvetica'
+_FONT_BOLD = 'Helvetica-Bold'
+_STYLES: Optional[Dict[str, ParagraphStyle]] = None
+
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_RENDERING: Dict[str, asyncio.Task] = {}  # путь чека -> рендеринг в процессе
+
+
+def _register_fonts() -> Tuple[str, str]:
+    """
+    Шрифт с кириллицей (DejaVu Sans / системный), иначе встроенный Helvetica.
+    """
+    try:
+        font_path = next((path for path in FONT_PATHS if os.path.exists(path)), None)
+        bold_font_path = next((path for path in BOLD_FONT_PATHS if os.path.exists(path)), None)
+        if not font_path:
+            return 'Helvetica', 'Helvetica-Bold'
+        pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
+        if not bold_font_path:
+            return 'DejaVuSans', 'DejaVuSans'  # Используем обычный шрифт для жирного
+        pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', bold_font_path))
+        return 'DejaVuSans', 'DejaVuSans-Bold'
+    except Exception as e:
+        logger.warning(f"Не удалось загрузить шрифт с поддержкой кириллицы: {e}")
+        return 'Helvetica', 'Helvetica-Bold'
+
+
+def _init_worker() -> None:
+    """
+    Регистрирует шрифты и стили (один раз на процесс рендеринга).
+    """
+    global _FONT, _FONT_BOLD, _STYLES
+    if _STYLES is not None:
+        return
+    _FONT, _FONT_BOLD = _register_fonts()
+    styles = getSampleStyleSheet()
+    _STYLES = {
+        "title": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontName=_FONT_BOLD,
+            fontSize=18,
+            textColor=colors.HexColor('#0066cc'),
+            spaceAfter=12,
+            alignment=TA_CENTER
+        ),
+        "heading": ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontName=_FONT_BOLD,
+            fontSize=14,
+            textColor=colors.HexColor('#333333'),
+            spaceAfter=8
+        ),
+        "normal": ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontName=_FONT,
+            fontSize=10
+        ),
+    }
+
+
+def _money(value: float) -> str:
+    return f"{value:,.2f} ₽".replace(',', ' ')
+
+
+# --- ДАННЫЕ ЧЕКА ---
+def receipt_data(order) -> Dict:
+    """
+    Всё, что печатается в чеке, из заказа с загруженными order_items.part,
+    car_orders.car.trim, shipping_address, pickup_point и user.
+    """
+    rows: List[List] = []
+
+    # Запчасти
+    for item in order.order_items:
+        part_name = item.part.part_name
+        manufacturer = enum_value(item.part.manufacturer or None, "")
+        price = float(item.part.price) if item.part.price else 0
+        rows.append([
+            f"{part_name}" + (f" ({manufacturer})" if manufacturer else ""),
+            item.quantity,
+            price,
+            price * item.quantity,
+        ])
+
+    # Автомобили
+    for car_order in order.car_orders:
+        car = car_order.car
+        if not car:
+            # Если автомобиль был удален, используем информацию из заказа
+            car_name = "Автомобиль (удален)"
+        elif not car.trim:
+            # Если комплектация была удалена, используем базовую информацию
+            car_name = f"Автомобиль ID: {car.car_id}"
+            if car.production_year:
+                car_name += f" ({car.production_year})"
+        else:
+            brand = enum_value(car.trim.brand_name or None, "—")
+            model = car.trim.model_name if car.trim.model_name else "—"
+            year = car.production_year if car.production_year else ""
+            car_name = f"{brand} {model}" + (f" {year}" if year else "")
+        price = float(car_order.car_price) if car_order.car_price else 0
+        rows.append([car_name, 1, price, price])
+
+    delivery = delivery_info(order)
+    payment_method = enum_value(order.payment_method)
+
+    return {
+        "order_id": order.order_id,
+        "order_date": order.order_date.strftime("%d.%m.%Y %H:%M") if order.order_date else "—",
+        "user_name": f"{order.user.first_name or ''} {order.user.last_name or ''}".strip() or "Покупатель",
+        "email": order.user.email,
+        "phone_number": order.user.phone_number,
+        "rows": rows,
+        "items_total": sum(float(item.part.price) * item.quantity for item in order.order_items if item.part.price),
+        "cars_total": sum(float(co.car_price) for co in order.car_orders if co.car_price),
+        "service_fee": float(order.service_fee or 0),
+        "shipping_cost": float(order.shipping_cost or 0),
+        "discount": float(order.discount or 0),
+        "payment_method": PAYMENT_METHOD_NAMES.get(payment_method, payment_method),
+        "delivery": [DELIVERY_LABELS[delivery["type"]], delivery["full_address"]] if delivery else None,
+    }
+
+
+def receipt_total(data: Dict) -> float:
+    return data["items_total"] + data["cars_total"] + data["service_fee"] + data["shipping_cost"] - data["discount"]
+
+
+# --- РЕНДЕРИНГ (в процессе пула) ---
+def render_receipt(data: Dict) -> bytes:
+    _init_worker()
+    title_style, heading_style, normal_style = _STYLES["title"], _STYLES["heading"], _STYLES["normal"]
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=20*mm, leftMargin=20*mm, topMargin=20*mm, bottomMargin=20*mm)
+    story = []
+
+    # Заголовок
+    story.append(Paragraph("ЧЕК О ПРОДАЖЕ", title_style))
+    story.append(Spacer(1, 12))
+
+    # Информация о заказе
+    story.append(Paragraph(f"<b>Заказ №{data['order_id']}</b>", heading_style))
+    story.append(Paragraph(f"Дата: {data['order_date']}", normal_style))
+    story.append(Spacer(1, 6))
+
+    # Информация о покупателе
+    story.append(Paragraph(f"<b>Покупатель:</b> {data['user_name']}", normal_style))
+    if data["email"]:
+        story.append(Paragraph(f"Email: {data['email']}", normal_style))
+    if data["phone_number"]:
+        story.append(Paragraph(f"Телефон: {data['phone_number']}", normal_style))
+    story.append(Spacer(1, 12))
+
+    # Товары
+    story.append(Paragraph("<b>Товары:</b>", heading_style))
+    table_data = [["Наименование", "Кол-во", "Цена", "Сумма"]]
+    for name, quantity, price, total in data["rows"]:
+        table_data.append([name, str(quantity), _money(price), _money(total)])
+
+    # Ширина страницы A4: 210mm, отступы: 20mm слева и справа = 170mm доступно
+    # Распределяем: Наименование (90mm), Кол-во (15mm), Цена (32mm), Сумма (33mm)
+    table = Table(table_data, colWidths=[90*mm, 15*mm, 32*mm, 33*mm])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0066cc')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+        ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+        ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), _FONT_BOLD),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('TOPPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), _FONT),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9f9f9')]),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 4),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+        ('TOPPADDING', (0, 1), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+    ]))
+    story.append(table)
+    story.append(Spacer(1, 12))
+
+    # Итоги
+    goods_total = data["items_total"] + data["cars_total"]
+    total_amount = receipt_total(data)
+    totals_data = []
+    if goods_total > 0:
+        totals_data.append(["Сумма товаров:", _money(goods_total)])
+    # Всегда показываем сервисный сбор и доставку, даже если они равны 0
+    totals_data.append(["Сервисный сбор:", _money(data["service_fee"])])
+    totals_data.append(["Доставка:", _money(data["shipping_cost"])])
+    if data["discount"] > 0:
+        totals_data.append(["Скидка:", f"-{_money(data['discount'])}"])
+    totals_data.append(["ИТОГО:", _money(total_amount)])
+
+    totals_table = Table(totals_data, colWidths=[120*mm, 50*mm])
+    totals_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, -2), _FONT),
+        ('FONTSIZE', (0, 0), (-1, -2), 10),
+        ('FONTNAME', (0, -1), (-1, -1), _FONT_BOLD),
+        ('FONTSIZE', (0, -1), (-1, -1), 12),
+        ('TOPPADDING', (0, -1), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, -1), (-1, -1), 8),
+        ('LEFTPADDING', (0, 0), (-1, -1), 4),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ]))
+    story.append(totals_table)
+    story.append(Spacer(1, 12))
+
+    # Способ оплаты и доставки
+    story.append(Paragraph(f"<b>Способ оплаты:</b> {data['payment_method']}", normal_style))
+    if data["delivery"]:
+        label, address = data["delivery"]
+        story.append(Paragraph(f"<b>{label}:</b> {address}", normal_style))
+
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(f"<i>Чек сгенерирован: {datetime.now().strftime('%d.%m.%Y %H:%M')}</i>", normal_style))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+# --- КЭШ И ПУЛ ---
+def _cache_path(data: Dict) -> str:
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode()
+    digest = hashlib.sha256(raw).hexdigest()[:32]
+    return os.path.join(RECEIPT_CACHE_DIR, f"{data['order_id']}-{digest}.pdf")
+
+
+def _write_atomic(path: str, body: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+def _prune_stale(path: str, order_id: int) -> None:
+    """
+    Удаляет прежние версии чека заказа (<order_id>-<хэш>.pdf), кроме path.
+    """
+    for stale in glob(os.path.join(RECEIPT_CACHE_DIR, f"{order_id}-*.pdf")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        # spawn: воркер приложения многопоточный и держит соединения с БД — fork небезопасен
+        _EXECUTOR = ProcessPoolExecutor(
+            max_workers=RECEIPT_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _EXECUTOR
+
+
+async def _render(path: str, data: Dict) -> str:
+    loop = asyncio.get_running_loop()
+    body = await loop.run_in_executor(_executor(), render_receipt, data)
+    await asyncio.to_thread(_write_atomic, path, body)
+    await asyncio.to_thread(_prune_stale, path, data["order_id"])
+    return path
+
+
+def _render_done(path: str, task: asyncio.Task) -> None:
+    _RENDERING.pop(path, None)
+    # Ошибку получают ждущие; если все они отменены — не засоряем лог "never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+async def get_receipt_path(data: Dict) -> str:
+    """
+    Путь к PDF чека: готовый файл из кэша или отрендеренный в пуле процессов.
+    Рендеринг — отдельная задача: одновременные запросы одного чека ждут её,
+    и отмена любого из них (в том числе начавшего) не прерывает рендеринг для остальных.
+    """
+    path = _cache_path(data)
+    if os.path.exists(path):
+        return path
+
+    task = _RENDERING.get(path)
+    if task is None:
+        task = asyncio.ensure_future(_render(path, data))
+        _RENDERING[path] = task
+        task.add_done_callback(lambda done: _render_done(path, done))
+    return await asyncio.shield(task)
+
+
+def start() -> None:
+    # Процессы пула поднимаются и регистрируют шрифты при старте, а не на первом чеке
+    executor = _executor()
+    for _ in range(RECEIPT_RENDER_WORKERS):
+        executor.submit(_init_worker)
+
+
+def shutdown() -> None:
+    global _EXECUTOR
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
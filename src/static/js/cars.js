@@ -214,6 +214,7 @@
                         <div class="item-info">Цвет: <span>${color}</span></div>
                         <div class="item-info">Год: <span>${year}</span></div>
                         <div class="item-info">Состояние: <span>${condition}</span></div>
+                        ${car.availability && car.availability !== 'В продаже' ? `<div class="item-info">Статус: <span>${car.availability}</span></div>` : ''}
                     </div>
                 </div>
                 <div class="car-price-row">
@@ -432,6 +433,7 @@
 
         // ==== Состояние списка автомобилей и фильтров ====
         let offset = 0;
+        let nextCursor = null;  // курсор следующей страницы (keyset-пагинация)
         const limit = 6;
         let loading = false;  // Флаг загрузки
         let hasMore = true;   // Есть ли ещё автомобили
@@ -455,6 +457,9 @@
                 pill.dataset.name = name;
                 pill.dataset.value = val;
                 pill.textContent = val;
+                const countEl = document.createElement("span");
+                countEl.className = "pill-count";
+                pill.appendChild(countEl);
                 pill.addEventListener("click", () => {
                     pill.classList.toggle("active");
                     updateGroupClearButton(containerId);
@@ -719,9 +724,37 @@
             }
         }
 
+        // Счётчики для фильтров при текущем поиске и фильтрах (/api/cars/facets)
+        async function loadFacets() {
+            try {
+                const params = new URLSearchParams(buildQueryParams());
+                params.delete("offset");
+                params.delete("cursor");
+                params.delete("limit");
+                const resp = await fetch(`/api/cars/facets?${params.toString()}`);
+                if (!resp.ok) return;
+                const facets = await resp.json();
+                Object.entries(facets.counts || {}).forEach(([name, values]) => {
+                    const counts = new Map((values || []).map((v) => [v.value, v.count]));
+                    document.querySelectorAll(`.filter-pill[data-name="${CSS.escape(name)}"]`).forEach((pill) => {
+                        const count = counts.get(pill.dataset.value) || 0;
+                        const countEl = pill.querySelector(".pill-count");
+                        if (countEl) countEl.textContent = ` (${count})`;
+                        pill.classList.toggle("empty", count === 0);
+                    });
+                });
+            } catch (err) {
+                console.error("Ошибка загрузки счётчиков фильтров:", err);
+            }
+        }
+
         function buildQueryParams() {
             const params = new URLSearchParams();
-            params.set("offset", String(offset));
+            if (offset > 0 && nextCursor) {
+                params.set("cursor", nextCursor);
+            } else {
+                params.set("offset", String(offset));
+            }
             params.set("limit", String(limit));
 
             // Добавляем поисковый запрос, если он есть
@@ -747,6 +780,7 @@
             if (reset) {
                 offset = 0;
                 hasMore = true;
+                loadFacets();
             }
 
             loading = true;
@@ -772,6 +806,7 @@
                         carsGrid.appendChild(carCard);
                     });
                     hasMore = data.has_more;
+                    nextCursor = data.next_cursor || null;
                     offset += data.cars.length;
                     
                     // Инициализируем обработчики для кнопок снятия с продажи
@@ -23,6 +23,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     const specsGridEl = document.getElementById('parts-specs-grid');
 
     let offset = 0;
+    let nextCursor = null;  // курсор следующей страницы (keyset-пагинация)
     const limit = 12;
     let isLoading = false;
     let hasMore = true;
@@ -285,6 +286,41 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
 
         renderSpecsUI();
+        loadFacets();
+    }
+
+    // Счётчики для фильтров при текущем поиске и фильтрах (/api/parts/facets)
+    async function loadFacets() {
+        if (!selectedLeafCategoryId || !specsGridEl) return;
+        try {
+            const params = new URLSearchParams();
+            params.set('category_id', String(selectedLeafCategoryId));
+            if (query) params.set('query', query);
+            if (currentSpecsFilters && Object.keys(currentSpecsFilters).length > 0) {
+                params.set('specs', JSON.stringify(currentSpecsFilters));
+            }
+            const resp = await fetch(`/api/parts/facets?${params.toString()}`);
+            if (!resp.ok) return;
+            const facets = await resp.json();
+            Object.entries(facets.specs || {}).forEach(([specName, facet]) => {
+                if (facet.type === 'options') {
+                    const wrap = specsGridEl.querySelector(`.checkbox-group[data-spec-name="${CSS.escape(specName)}"]`);
+                    if (!wrap) return;
+                    const counts = new Map((facet.values || []).map((v) => [v.value, v.count]));
+                    wrap.querySelectorAll('.filter-pill').forEach((pill) => {
+                        const count = counts.get(pill.dataset.value) || 0;
+                        const countEl = pill.querySelector('.pill-count');
+                        if (countEl) countEl.textContent = ` (${count})`;
+                        pill.classList.toggle('empty', count === 0);
+                    });
+                } else if (facet.type === 'range' && facet.min !== null && facet.max !== null) {
+                    const hint = specsGridEl.querySelector(`[data-range-hint="${CSS.escape(specName)}"]`);
+                    if (hint) hint.textContent = `Доступно: ${facet.min} - ${facet.max} (${facet.count})`;
+                }
+            });
+        } catch (err) {
+            console.error('Ошибка загрузки счётчиков фильтров:', err);
+        }
     }
 
     function renderSpecsUI() {
@@ -317,7 +353,11 @@ document.addEventListener('DOMContentLoaded', async () => {
                 values.forEach((val) => {
                     const pill = document.createElement('div');
                     pill.className = 'filter-pill';
+                    pill.dataset.value = val;
                     pill.textContent = val;
+                    const countEl = document.createElement('span');
+                    countEl.className = 'pill-count';
+                    pill.appendChild(countEl);
                     pill.addEventListener('click', () => {
                         pill.classList.toggle('active');
                     });
@@ -337,7 +377,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                             <button type="button" class="clear-input-btn" data-target="range-max-${specName}" title="Очистить">✕</button>
                         </div>
                     </div>
-                    <div class="hint-small">Доступно: ${meta.min} - ${meta.max}${unit}</div>
+                    <div class="hint-small" data-range-hint="${specName}">Доступно: ${meta.min} - ${meta.max}${unit}</div>
                 `;
             }
 
@@ -722,7 +762,11 @@ document.addEventListener('DOMContentLoaded', async () => {
 
         try {
             const params = new URLSearchParams();
-            params.set('offset', String(offset));
+            if (offset > 0 && nextCursor) {
+                params.set('cursor', nextCursor);
+            } else {
+                params.set('offset', String(offset));
+            }
             params.set('limit', String(limit));
             if (query) params.set('query', query);
 
@@ -748,6 +792,7 @@ document.addEventListener('DOMContentLoaded', async () => {
             });
 
             hasMore = Boolean(data.has_more);
+            nextCursor = data.next_cursor || null;
             offset += limit;
 
             if (!hasMore) {
@@ -770,6 +815,7 @@ document.addEventListener('DOMContentLoaded', async () => {
         offset = 0;
         hasMore = true;
         fetchParts();
+        loadFacets();
     }
 
     // Поиск
@@ -818,6 +864,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                 await loadCategories();
                 renderCategoriesUI();
                 renderSpecsUI();
+                loadFacets();
                 openFiltersOverlay();
             } catch (e) {
                 console.error(e);
@@ -842,7 +889,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                 // options
                 specsGridEl.querySelectorAll('.checkbox-group[data-spec-name]').forEach((wrap) => {
                     const specName = wrap.getAttribute('data-spec-name');
-                    const selected = Array.from(wrap.querySelectorAll('.filter-pill.active')).map((p) => p.textContent.trim()).filter(Boolean);
+                    const selected = Array.from(wrap.querySelectorAll('.filter-pill.active')).map((p) => p.dataset.value || p.textContent.trim()).filter(Boolean);
                     if (specName && selected.length > 0) {
                         nextSpecs[specName] = selected;
                     }
@@ -0,0 +1,111 @@
+import asyncio
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import pytest
+from sqlalchemy import event, text
+
+
+# --- ТЕСТОВАЯ БАЗА ---
+# Тесты с БД работают с отдельной базой TEST_DB_NAME (сервер и пользователь —
+# DB_HOST / DB_PORT / DB_USER / DB_PASS, как у приложения). База мигрируется
+# alembic upgrade head один раз за прогон, таблицы очищаются перед каждым тестом.
+# Без TEST_DB_NAME такие тесты пропускаются.
+#
+#   TEST_DB_NAME=autoshop_test DB_HOST=localhost DB_PORT=5432 DB_USER=... DB_PASS=... pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TEST_DB_NAME = os.getenv("TEST_DB_NAME")
+if TEST_DB_NAME:
+    os.environ["DB_NAME"] = TEST_DB_NAME
+# Приложение собирает DSN при импорте — тестам без БД хватит заглушек
+for _name, _value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_NAME", "autoshop_test"),
+                      ("DB_USER", "postgres"), ("DB_PASS", ""), ("JWT_KEY", "test-key")):
+    os.environ.setdefault(_name, _value)
+
+
+# Один цикл событий на весь прогон: на нём живут и фикстуры шире теста
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def migrated_db() -> str:
+    if not TEST_DB_NAME:
+        pytest.skip("TEST_DB_NAME не задана: тесты с БД пропущены")
+
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    # alembic/env.py подключается синхронно (async_fallback) и берёт текущий цикл
+    # событий: если первым БД понадобилась уже после async-тестов, его нет
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        command.upgrade(config, "head")
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    return TEST_DB_NAME
+
+
+def reset_caches() -> None:
+    """
+    Кэши процесса (поколения, ответы, дерево категорий, пользователи) — между тестами.
+    """
+    from src.cache import generations, http
+    from src.repositories import category_tree, part_repo, user_repo
+
+    generations._LOCAL.clear()
+    generations._LAST_POLL.clear()
+    http._RESPONSE_CACHE.clear()
+    category_tree._TREE = None
+    part_repo._SPECS_CACHE.clear()
+    part_repo._FILTERS_CACHE.clear()
+    user_repo._SNAPSHOTS.clear()
+
+
+async def truncate_all(engine) -> None:
+    from src.database.models import Base
+
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+@pytest.fixture
+async def db(migrated_db):
+    """
+    Основной движок приложения на чистой базе. Пул закрывается после теста:
+    соединения asyncpg привязаны к циклу событий теста.
+    """
+    from src.database import database
+
+    await truncate_all(database.engine)
+    reset_caches()
+    yield database.engine
+    await database.engine.dispose()
+    await database.read_engine.dispose()
+
+
+@contextmanager
+def capture_sql(engine) -> Iterator[List[Tuple[str, object]]]:
+    """
+    Запросы, отправленные движком внутри блока: [(SQL, параметры)].
+    """
+    statements: List[Tuple[str, object]] = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", collect)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", collect)
@@ -0,0 +1,46 @@
+import httpx
+import pytest
+from sqlalchemy import text
+
+from src.auth.jwt import create_access_token
+
+
+# --- ВНУТРЕННИЕ МЕТРИКИ ---
+# /api/health/... отдают состояние пулов воркера — только менеджерам и администраторам.
+
+pytestmark = pytest.mark.anyio
+
+URLS = ["/api/health/db-pool", "/api/health/passwords"]
+
+
+@pytest.fixture
+async def client(db):
+    async with db.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO users (email, password_hash, first_name, last_name, role, status, email_verified, phone_verified) "
+            "VALUES ('buyer@example.com', 'x', 'Имя', 'Фамилия', 'Покупатель', 'Активный', true, false), "
+            "('manager@example.com', 'x', 'Имя', 'Фамилия', 'Менеджер', 'Активный', true, false)"
+        ))
+
+    from src.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def _login(client: httpx.AsyncClient, user_id: int, email: str, role: str) -> None:
+    token = create_access_token({"sub": email, "uid": user_id, "role": role, "status": "Активный"})
+    client.cookies.set("access_token", token)
+
+
+@pytest.mark.parametrize("url", URLS)
+async def test_health_requires_manager(client, url):
+    assert (await client.get(url)).status_code == 401
+
+    _login(client, 1, "buyer@example.com", "Покупатель")
+    assert (await client.get(url)).status_code == 403
+
+    _login(client, 2, "manager@example.com", "Менеджер")
+    response = await client.get(url)
+    assert response.status_code == 200, response.text
@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import select, text
+
+from src.cache.generations import PARTS_SCOPE, bump_generations, part_detail_scope
+from src.database.models import CacheGeneration
+from src.repositories.inventory_repo import InsufficientStockError, release_stock, reserve_stock
+
+
+# --- СКЛАД И ПОКОЛЕНИЯ КЭША ---
+# Изменение остатка сбрасывает карточку запчасти, а списки (PARTS_SCOPE) — только
+# при переходе "в наличии" <-> "нет в наличии". Поколения увеличиваются после
+# commit: транзакция склада не держит блокировку на строках cache_generations.
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def part(db):
+    async with db.begin() as conn:
+        await conn.execute(text("INSERT INTO part_categories (category_name, parent_id) VALUES ('Фильтры', NULL)"))
+        await conn.execute(text(
+            "INSERT INTO parts (part_name, part_article, description, price, stock_count, manufacturer, category_id) "
+            "VALUES ('Фильтр', 'ART-1', 'Описание', 500, 3, 'Bosch', 1)"
+        ))
+    return 1
+
+
+async def _generations(db) -> dict:
+    async with db.connect() as conn:
+        result = await conn.execute(select(CacheGeneration.scope, CacheGeneration.generation))
+        return dict(result.all())
+
+
+async def test_stock_change_bumps_detail_and_listing_only_on_availability_change(db, part):
+    from src.database.database import async_session_maker
+
+    async with async_session_maker() as session:
+        await reserve_stock(session, [(part, 1)])
+        await session.commit()
+    assert await _generations(db) == {part_detail_scope(part): 1}
+
+    # Последние две штуки — запчасть закончилась
+    async with async_session_maker() as session:
+        await reserve_stock(session, [(part, 2)])
+        await session.commit()
+    assert await _generations(db) == {part_detail_scope(part): 2, PARTS_SCOPE: 1}
+
+    # Снова в наличии
+    async with async_session_maker() as session:
+        await release_stock(session, [(part, 1)])
+        await session.commit()
+    assert await _generations(db) == {part_detail_scope(part): 3, PARTS_SCOPE: 2}
+
+
+async def test_stock_transaction_does_not_lock_generations(db, part):
+    from src.database.database import async_session_maker
+
+    async with async_session_maker() as stock_session:
+        await reserve_stock(stock_session, [(part, 3)])
+
+        # Пока склад не закоммичен, другая запись в каталог увеличивает те же поколения
+        async with async_session_maker() as other:
+            await other.execute(text("SET LOCAL lock_timeout = '1s'"))
+            await bump_generations(other, [PARTS_SCOPE, part_detail_scope(part)])
+            await other.commit()
+
+        await stock_session.commit()
+
+    assert await _generations(db) == {part_detail_scope(part): 2, PARTS_SCOPE: 2}
+
+
+async def test_rolled_back_stock_change_does_not_bump(db, part):
+    from src.database.database import async_session_maker
+
+    async with async_session_maker() as session:
+        await reserve_stock(session, [(part, 3)])
+        await session.rollback()
+        await session.commit()
+
+    assert await _generations(db) == {}
+
+
+async def test_failed_savepoint_keeps_outer_bumps(db, part):
+    from src.cache import generations
+    from src.database.database import async_session_maker
+
+    async with async_session_maker() as session:
+        await bump_generations(session, [PARTS_SCOPE])
+        await release_stock(session, [(part, 1)])
+        # Нехватка откатывает только точку сохранения списания
+        with pytest.raises(InsufficientStockError):
+            await reserve_stock(session, [(part, 10)])
+        await session.commit()
+
+        assert generations._LOCAL[session.sync_session.bind][PARTS_SCOPE] == 1
+    assert await _generations(db) == {PARTS_SCOPE: 1, part_detail_scope(part): 1}
+
+
+async def test_created_part_is_in_ledger_with_its_commit(db, part):
+    from src.database.database import async_session_maker
+    from src.repositories.inventory_repo import verify_stock
+    from src.repositories.part_repo import create_part
+
+    async with async_session_maker() as session:
+        created = await create_part(session, {
+            "part_name": "Колодки", "part_article": "ART-2", "description": "Описание",
+            "price": 900, "stock_count": 4, "manufacturer": "Bosch", "category_id": 1,
+        }, specifications=[])
+        part_id = created.part_id
+        # Дальнейшая ошибка эндпоинта не должна оставить остаток без журнала
+        await session.rollback()
+
+    async with async_session_maker() as session:
+        assert await verify_stock(session, [part_id]) == []
+        movements = (await session.execute(text(
+            "SELECT delta, reason FROM stock_movements WHERE part_id = :part_id"
+        ), {"part_id": part_id})).all()
+    assert movements == [(4, "Начальный остаток")]
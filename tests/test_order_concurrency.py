@@ -0,0 +1,136 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from src.auth.jwt import create_access_token
+
+
+# --- ПАРАЛЛЕЛЬНЫЕ ЗАКАЗЫ И ОТМЕНЫ ---
+# Покупатели одновременно оформляют заказы на одну запчасть с ограниченным
+# остатком, а каждый заказ одновременно отменяют несколько раз (сам покупатель
+# дважды и менеджер). Склад не уходит в минус, каждая отмена возвращает товар
+# ровно один раз, остаток сходится с журналом stock_movements.
+
+pytestmark = pytest.mark.anyio
+
+STOCK = 10
+BUYERS = 16
+ROUNDS = 3
+
+
+def _claims(user_id: int, role: str) -> dict:
+    return {"sub": f"user{user_id}@example.com", "uid": user_id, "role": role, "status": "Активный"}
+
+
+@pytest.fixture
+async def shop(db):
+    async with db.begin() as conn:
+        await conn.execute(text("INSERT INTO part_categories (category_name, parent_id) VALUES ('Фильтры', NULL)"))
+        await conn.execute(text(
+            "INSERT INTO parts (part_name, part_article, description, price, stock_count, manufacturer, category_id) "
+            "VALUES ('Фильтр', 'ART-1', 'Описание', 500, :stock, 'Bosch', 1)"
+        ), {"stock": STOCK})
+        await conn.execute(text(
+            "INSERT INTO stock_movements (part_id, delta, reason) VALUES (1, :stock, 'Начальный остаток')"
+        ), {"stock": STOCK})
+        await conn.execute(text(
+            "INSERT INTO pickup_points (country, region, city, street, house, is_active) "
+            "VALUES ('Россия', 'Москва', 'Москва', 'Тверская', '1', true)"
+        ))
+        # Покупатели 1..BUYERS и менеджер BUYERS + 1
+        await conn.execute(text(
+            "INSERT INTO users (email, password_hash, first_name, last_name, role, status, email_verified, phone_verified) "
+            "SELECT 'user' || i || '@example.com', 'x', 'Имя', 'Фамилия', "
+            "CASE WHEN i > :buyers THEN 'Менеджер' ELSE 'Покупатель' END, 'Активный', true, false "
+            "FROM generate_series(1, :buyers + 1) i"
+        ), {"buyers": BUYERS})
+
+    from src.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    clients = [
+        httpx.AsyncClient(
+            transport=transport, base_url="http://test",
+            cookies={"access_token": create_access_token(_claims(user_id, "Покупатель"))},
+        )
+        for user_id in range(1, BUYERS + 1)
+    ]
+    manager = httpx.AsyncClient(
+        transport=transport, base_url="http://test",
+        cookies={"access_token": create_access_token(_claims(BUYERS + 1, "Менеджер"))},
+    )
+    yield clients, manager
+    for client in clients + [manager]:
+        await client.aclose()
+
+
+async def _fill_carts(db) -> None:
+    async with db.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO cart_items (user_id, part_id, quantity) SELECT i, 1, 1 FROM generate_series(1, :buyers) i "
+            "ON CONFLICT DO NOTHING"
+        ), {"buyers": BUYERS})
+
+
+async def _create(client: httpx.AsyncClient) -> httpx.Response:
+    return await client.post("/orders/api/create-part-order", json={
+        "pickup_point_id": 1, "payment_method": "Наличные", "delivery_method": "pickup",
+    })
+
+
+async def _cancel_all(clients, manager, orders) -> list:
+    requests = []
+    for buyer, order_id in orders:
+        requests.append(clients[buyer].post(f"/orders/api/cancel/{order_id}"))
+        requests.append(clients[buyer].post(f"/orders/api/cancel/{order_id}"))
+        requests.append(manager.put(f"/account/api/management/orders/{order_id}/status", json={"status": "Отменен"}))
+    return await asyncio.gather(*requests)
+
+
+async def _stock(db) -> int:
+    async with db.connect() as conn:
+        return (await conn.execute(text("SELECT stock_count FROM parts WHERE part_id = 1"))).scalar_one()
+
+
+async def test_parallel_create_and_cancel_keep_stock_consistent(db, shop):
+    clients, manager = shop
+    orders = []
+
+    for _ in range(ROUNDS):
+        await _fill_carts(db)
+        # Новые заказы оформляются одновременно с отменой заказов прошлого раунда
+        creates = [_create(client) for client in clients]
+        responses = await asyncio.gather(_cancel_all(clients, manager, orders), *creates)
+        cancels, created = responses[0], responses[1:]
+
+        assert all(r.status_code in (200, 400) for r in cancels), [r.text for r in cancels]
+        for index in range(len(orders)):
+            succeeded = [r for r in cancels[index * 3:index * 3 + 3] if r.status_code == 200]
+            assert len(succeeded) == 1, "заказ отменён не ровно один раз"
+
+        assert all(r.status_code in (200, 409) for r in created), [r.text for r in created]
+        orders = [(buyer, r.json()["order_id"]) for buyer, r in enumerate(created) if r.status_code == 200]
+        assert orders, "ни один заказ не оформлен"
+        assert 0 <= await _stock(db) <= STOCK
+
+    await _cancel_all(clients, manager, orders)
+    assert await _stock(db) == STOCK
+
+    async with db.connect() as conn:
+        ledger = (await conn.execute(text("SELECT sum(delta) FROM stock_movements WHERE part_id = 1"))).scalar_one()
+        returned_twice = (await conn.execute(text(
+            "SELECT order_id FROM stock_movements WHERE reason = 'Отмена заказа' GROUP BY order_id HAVING count(*) > 1"
+        ))).all()
+        statuses = (await conn.execute(text("SELECT DISTINCT status FROM orders"))).scalars().all()
+        # Остаток по журналу ни в какой момент не уходил в минус
+        low = (await conn.execute(text(
+            "SELECT min(running) FROM (SELECT sum(delta) OVER (ORDER BY movement_id) AS running "
+            "FROM stock_movements WHERE part_id = 1) t"
+        ))).scalar_one()
+
+    assert ledger == STOCK
+    assert not returned_twice
+    assert statuses == ["Отменен"]
+    assert low >= 0
@@ -0,0 +1,55 @@
+import httpx
+import pytest
+
+
+# --- ФИЛЬТРЫ КАТАЛОГА ЗАПЧАСТЕЙ ---
+# Параметр specs (/api/parts/ и /api/parts/facets) проверяется до запросов к БД.
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client():
+    from src.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.parametrize("url", ["/api/parts/", "/api/parts/facets"])
+@pytest.mark.parametrize("specs", ['{"Диаметр": {"min": "abc"}}', '{"Диаметр": {"max": [1]}}', "{"])
+async def test_invalid_specs_filter_is_bad_request(client, url, specs):
+    response = await client.get(url, params={"category_id": 1, "specs": specs})
+    assert response.status_code == 400, response.text
+
+
+SEED = [
+    "INSERT INTO part_categories (category_name, parent_id) VALUES ('Крепёж', NULL)",
+    """INSERT INTO parts (part_name, part_article, description, price, stock_count, manufacturer, category_id)
+        SELECT 'Болт ' || i, 'ART-' || i, 'Описание', 100, 5, 'Bosch', 1 FROM generate_series(1, 3) i""",
+    """INSERT INTO part_specifications (part_id, spec_name, spec_value, spec_unit) VALUES
+        (1, 'Покрытие', 'цинк', 'гальв.'), (2, 'Покрытие', 'цинк', 'гальв.'), (3, 'Покрытие', 'хром', NULL)""",
+]
+
+
+async def test_option_facets_use_filter_values(db, client):
+    from sqlalchemy import text
+
+    async with db.begin() as conn:
+        for statement in SEED:
+            await conn.execute(text(statement))
+
+    meta = (await client.get("/api/parts/specs-meta", params={"category_id": 1})).json()
+    assert meta["filters"]["Покрытие"] == {"type": "options", "values": ["хром", "цинк гальв."]}
+
+    facets = (await client.get("/api/parts/facets", params={"category_id": 1})).json()
+    assert facets["specs"]["Покрытие"]["values"] == [
+        {"value": "хром", "count": 1}, {"value": "цинк гальв.", "count": 2},
+    ]
+
+    # Значение из UI фильтрует список
+    listing = (await client.get("/api/parts/", params={
+        "category_id": 1, "specs": '{"Покрытие": ["цинк гальв."]}',
+    })).json()
+    assert sorted(part["part_id"] for part in listing["parts"]) == [1, 2]
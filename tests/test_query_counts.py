@@ -0,0 +1,88 @@
+import httpx
+import pytest
+from sqlalchemy import text
+
+from src.auth.jwt import create_access_token
+from tests.conftest import capture_sql
+
+
+# --- ЧИСЛО ЗАПРОСОВ НА ЭНДПОИНТ ---
+# Горячие эндпоинты отвечают фиксированным числом запросов к БД, не зависящим
+# от размера страницы или корзины (без N+1). Запросы считаются по
+# before_cursor_execute после прогревочного запроса: кэши процесса (поколения,
+# дерево категорий, снимок пользователя) к этому моменту уже заполнены.
+
+pytestmark = pytest.mark.anyio
+
+PARTS = 30
+
+SEED = [
+    "INSERT INTO part_categories (category_name, parent_id) VALUES ('Двигатель', NULL), ('Фильтры', 1)",
+    f"""INSERT INTO parts (part_name, part_article, description, price, stock_count, manufacturer, category_id)
+        SELECT 'Запчасть ' || i, 'ART-' || i, 'Описание', 100 + i, 5, 'Bosch', 2
+        FROM generate_series(1, {PARTS}) i""",
+    """INSERT INTO part_specifications (part_id, spec_name, spec_value, spec_unit)
+        SELECT p, 'Параметр ' || k, (p * k % 7)::text, 'мм'
+        FROM generate_series(1, (SELECT count(*) FROM parts)) p, generate_series(1, 3) k""",
+    """INSERT INTO images (url, alt_text, sort_order, part_id)
+        SELECT '/static/images/parts/' || p || '/' || k || '.jpg', NULL, k, p
+        FROM generate_series(1, (SELECT count(*) FROM parts)) p, generate_series(1, 2) k""",
+    """INSERT INTO users (email, password_hash, first_name, last_name, role, status, email_verified, phone_verified)
+        VALUES ('buyer@example.com', 'x', 'Имя', 'Фамилия', 'Покупатель', 'Активный', true, false)""",
+]
+
+
+@pytest.fixture
+async def client(db, monkeypatch):
+    from src.cache import generations
+    from src.main import app
+
+    async with db.begin() as conn:
+        for statement in SEED:
+            await conn.execute(text(statement))
+
+    # Плановое перечитывание поколений не должно попасть в подсчёт
+    monkeypatch.setattr(generations, "CACHE_GENERATIONS_POLL_INTERVAL", 3600.0)
+
+    token = create_access_token({"sub": "buyer@example.com", "uid": 1, "role": "Покупатель", "status": "Активный"})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", cookies={"access_token": token}) as client:
+        yield client
+
+
+async def _count_queries(engine, client: httpx.AsyncClient, url: str) -> int:
+    with capture_sql(engine) as statements:
+        response = await client.get(url)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+async def _fill_cart(engine, items: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM cart_items"))
+        await conn.execute(text(
+            "INSERT INTO cart_items (user_id, part_id, quantity) SELECT 1, p, 1 FROM generate_series(1, :items) p"
+        ), {"items": items})
+
+
+@pytest.mark.parametrize("params", ["", "&category_id=2", "&query=Запчасть"])
+async def test_parts_listing_query_count(db, client, params):
+    await client.get("/api/parts/?limit=2" + params)
+
+    small = await _count_queries(db, client, "/api/parts/?limit=2" + params)
+    large = await _count_queries(db, client, "/api/parts/?limit=24" + params)
+
+    assert small == large, f"число запросов растёт с размером страницы: {small} -> {large}"
+    assert large <= 3
+
+
+async def test_cart_items_query_count(db, client):
+    await _fill_cart(db, 1)
+    await client.get("/cart/api/items")
+
+    small = await _count_queries(db, client, "/cart/api/items")
+    await _fill_cart(db, 20)
+    large = await _count_queries(db, client, "/cart/api/items")
+
+    assert small == large, f"число запросов растёт с размером корзины: {small} -> {large}"
+    assert large <= 2
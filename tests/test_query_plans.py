@@ -0,0 +1,151 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from src.database.models import Image
+from src.repositories import car_repo, cart_repo, order_repo, part_repo, pickup_repo, settings_repo, user_repo
+from src.repositories.image_repo import get_primary_images
+from tests.conftest import capture_sql, reset_caches, truncate_all
+
+
+# --- ПЛАНЫ ГОРЯЧИХ ЗАПРОСОВ ---
+# Репозиторные функции выполняются на заполненной базе, каждый их SELECT
+# повторяется через EXPLAIN (FORMAT JSON). Seq Scan по таблицам ниже означает,
+# что запрос не попадает в индексы из миграции e2b6c9d04f31.
+
+pytestmark = pytest.mark.anyio
+
+WATCHED_TABLES = {
+    "cart_items", "orders", "order_items", "car_orders", "part_specifications",
+    "images", "user_addresses", "parts", "pickup_points", "settings",
+}
+
+USERS = 5000
+CATEGORIES = 200
+PARTS = 50000
+CARS = 5000
+PICKUP_POINTS = 20000
+SETTINGS = 2000
+
+SEED = [
+    f"""INSERT INTO part_categories (category_name, parent_id)
+        SELECT 'Категория ' || i, NULL FROM generate_series(1, {CATEGORIES}) i""",
+    f"""INSERT INTO parts (part_name, part_article, description, price, stock_count, manufacturer, category_id)
+        SELECT 'Запчасть ' || i, 'ART-' || i, 'Описание', 100 + i % 900, i % 20, 'Bosch', 1 + i % {CATEGORIES}
+        FROM generate_series(1, {PARTS}) i""",
+    """INSERT INTO part_specifications (part_id, spec_name, spec_value, spec_unit)
+        SELECT p, 'Параметр ' || k, (p * k % 97)::text, 'мм'
+        FROM generate_series(1, (SELECT count(*) FROM parts)) p, generate_series(1, 4) k""",
+    """INSERT INTO images (url, alt_text, sort_order, part_id)
+        SELECT '/static/images/parts/' || p || '/' || k || '.jpg', NULL, k, p
+        FROM generate_series(1, (SELECT count(*) FROM parts)) p, generate_series(1, 2) k""",
+    """INSERT INTO car_trims (trim_name, brand_name, model_name) VALUES ('Base', 'Toyota', 'Camry')""",
+    f"""INSERT INTO cars (trim_id, vin, production_year, condition, mileage, color, price, is_visible, availability)
+        SELECT 1, lpad(i::text, 17, '0'), 2020, 'Новый', 0, 'Белый', 1000000, true, 'В продаже'
+        FROM generate_series(1, {CARS}) i""",
+    """INSERT INTO images (url, alt_text, sort_order, car_id)
+        SELECT '/static/images/cars/' || c || '/' || k || '.jpg', NULL, k, c
+        FROM generate_series(1, (SELECT count(*) FROM cars)) c, generate_series(1, 3) k""",
+    f"""INSERT INTO users (email, password_hash, first_name, last_name, role, status, email_verified, phone_verified)
+        SELECT 'user' || i || '@example.com', 'x', 'Имя', 'Фамилия', 'Покупатель', 'Активный', true, false
+        FROM generate_series(1, {USERS}) i""",
+    """INSERT INTO user_addresses (user_id, address_type, country, city, street, house,
+                                   recipient_name, recipient_phone, is_default, is_active)
+        SELECT u, 'Точный', 'Россия', 'Москва', 'Тверская', k::text, 'Имя', '+70000000000', k = 1, true
+        FROM generate_series(1, (SELECT count(*) FROM users)) u, generate_series(1, 2) k""",
+    """INSERT INTO orders (user_id, payment_method, is_paid, status, shipping_cost, service_fee, discount)
+        SELECT u, 'Онлайн', true, CASE WHEN u % 250 = 0 AND k = 1 THEN 'В обработке' ELSE 'Доставлен' END, 0, 0, 0
+        FROM generate_series(1, (SELECT count(*) FROM users)) u, generate_series(1, 4) k""",
+    f"""INSERT INTO order_items (order_id, part_id, quantity)
+        SELECT o, 1 + (o * k) % {PARTS}, 1
+        FROM generate_series(1, (SELECT count(*) FROM orders)) o, generate_series(1, 2) k""",
+    f"""INSERT INTO car_orders (order_id, car_id, car_price)
+        SELECT o, 1 + o % {CARS}, 1000000
+        FROM generate_series(1, (SELECT count(*) FROM orders), 10) o""",
+    f"""INSERT INTO cart_items (user_id, part_id, quantity)
+        SELECT u, 1 + (u * k) % {PARTS}, 1
+        FROM generate_series(1, (SELECT count(*) FROM users)) u, generate_series(1, 3) k""",
+    f"""INSERT INTO pickup_points (country, region, city, street, house, is_active)
+        SELECT 'Страна ' || i % 10, 'Регион ' || i % 100, 'Город ' || i % 1000, 'Улица', i::text, true
+        FROM generate_series(1, {PICKUP_POINTS}) i""",
+    f"""INSERT INTO settings (key, value, description)
+        SELECT 'setting_' || i, i::text, NULL FROM generate_series(1, {SETTINGS}) i""",
+    "ANALYZE",
+]
+
+
+@pytest.fixture(scope="module")
+async def seeded(migrated_db):
+    from src.database.database import engine
+
+    await truncate_all(engine)
+    reset_caches()
+    async with engine.begin() as conn:
+        # Заполнение дольше statement_timeout приложения на медленной машине
+        await conn.execute(text("SET LOCAL statement_timeout = 0"))
+        for statement in SEED:
+            await conn.execute(text(statement))
+    yield engine
+    await engine.dispose()
+
+
+async def _car_orders(session, car_id: int) -> None:
+    # Связь Car.car_orders: её загружает session.delete(car) в car_repo.delete_car
+    car = await car_repo.get_car_by_id(session, car_id)
+    await session.refresh(car, ["car_orders"])
+
+
+# (название, вызов репозитория) — id выбраны из середины сгенерированных данных
+LOOKUPS = [
+    ("cart_items", lambda s: cart_repo.get_cart_items(s, 1234)),
+    ("cart_rows", lambda s: cart_repo.get_cart_rows(s, 1234)),
+    ("cart_count", lambda s: cart_repo.get_cart_count(s, 1234)),
+    ("user_orders", lambda s: user_repo.get_user_with_orders(s, 1234)),
+    ("receipt_orders", lambda s: order_repo.get_orders_for_receipts(s, [101, 202, 303])),
+    ("category_specs", lambda s: part_repo.get_specs_for_category(s, 17)),
+    ("part_detail", lambda s: part_repo.get_part_by_id(s, 4321)),
+    ("part_images", lambda s: get_primary_images(s, Image.part_id, [11, 22, 33, 44])),
+    ("car_images", lambda s: get_primary_images(s, Image.car_id, [11, 22, 33, 44])),
+    ("addresses", lambda s: user_repo.get_user_addresses(s, 1234)),
+    ("default_address", lambda s: user_repo.get_user_default_address(s, 1234)),
+    ("address_by_id", lambda s: user_repo.get_user_address_by_id(s, 2467, 1234)),
+    ("paid_orders_by_status", lambda s: order_repo.get_paid_order_ids(s, status="В обработке")),
+    ("management_orders", lambda s: order_repo.get_management_orders(s, active_only=True)),
+    ("car_orders", lambda s: _car_orders(s, 1232)),
+    ("pickup_cities", lambda s: pickup_repo.get_cities(s, "Страна 3", "Регион 13")),
+    ("pickup_points", lambda s: pickup_repo.get_pickup_points(s, "Страна 3", "Регион 13", "Город 113")),
+    ("setting", lambda s: settings_repo.get_setting(s, "setting_1234")),
+    ("part_list_items", lambda s: part_repo.get_part_list_items(s, [11, 22, 33, 44])),
+    ("category_listing", lambda s: part_repo.search_and_filter_parts_page(s, category_ids=[17])),
+]
+
+
+def _seq_scans(plan: dict) -> list:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in WATCHED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+@pytest.mark.parametrize("name, lookup", LOOKUPS, ids=[name for name, _ in LOOKUPS])
+async def test_lookup_uses_indexes(seeded, name, lookup):
+    from src.database.database import async_session_maker
+
+    async with async_session_maker() as session:
+        with capture_sql(seeded) as statements:
+            await lookup(session)
+
+        selects = [(sql, params) for sql, params in statements if sql.lstrip().upper().startswith("SELECT")]
+        assert selects, f"{name}: репозиторий не выполнил ни одного SELECT"
+
+        conn = await session.connection()
+        for sql, params in selects:
+            result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            assert not _seq_scans(plan[0]["Plan"]), (
+                f"{name}: Seq Scan по {_seq_scans(plan[0]['Plan'])}\n{sql}"
+            )
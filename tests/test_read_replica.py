@@ -0,0 +1,184 @@
+import time
+
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.auth.jwt import create_access_token
+from tests.conftest import capture_sql
+
+
+# --- ЧТЕНИЕ С РЕПЛИКИ ---
+# "Реплика" — копия тестовой базы (CREATE DATABASE ... TEMPLATE), подключённая
+# как read_engine. Репликация не идёт: расхождение данных между базами показывает,
+# откуда прочитан ответ, а "догоняет" реплику сам тест.
+
+pytestmark = pytest.mark.anyio
+
+PRIMARY_NAME = "Фильтр (основная БД)"
+REPLICA_NAME = "Фильтр (реплика)"
+
+SEED = [
+    "INSERT INTO part_categories (category_name, parent_id) VALUES ('Фильтры', NULL)",
+    """INSERT INTO parts (part_name, part_article, description, price, stock_count, manufacturer, category_id)
+        VALUES ('Фильтр', 'ART-1', 'Описание', 500, 5, 'Bosch', 1)""",
+    """INSERT INTO users (email, password_hash, first_name, last_name, role, status, email_verified, phone_verified)
+        VALUES ('buyer@example.com', 'x', 'Имя', 'Фамилия', 'Покупатель', 'Активный', true, false)""",
+]
+
+
+def _admin_engine():
+    from src.database import database
+
+    return create_async_engine(
+        database.DATABASE_URL.rsplit("/", 1)[0] + "/postgres", poolclass=NullPool, isolation_level="AUTOCOMMIT"
+    )
+
+
+async def _rename_part(engine, name: str) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("UPDATE parts SET part_name = :name WHERE part_id = 1"), {"name": name})
+
+
+@pytest.fixture
+async def replica(db, migrated_db, monkeypatch):
+    """
+    Движок реплики вместо read_engine. Основная БД и реплика различаются
+    названием запчасти 1.
+    """
+    from src.database import database
+    from src.cache import generations
+
+    async with db.begin() as conn:
+        for statement in SEED:
+            await conn.execute(text(statement))
+    # Шаблон копируется только без открытых к нему соединений
+    await db.dispose()
+
+    replica_name = f"{migrated_db}_replica"
+    admin = _admin_engine()
+    async with admin.connect() as conn:
+        await conn.execute(text(f'DROP DATABASE IF EXISTS "{replica_name}"'))
+        await conn.execute(text(f'CREATE DATABASE "{replica_name}" TEMPLATE "{migrated_db}"'))
+
+    read_engine = database.create_engine(database.DATABASE_URL.rsplit("/", 1)[0] + "/" + replica_name)
+    monkeypatch.setattr(database, "read_engine", read_engine)
+    monkeypatch.setattr(database, "async_read_session_maker", database.async_sessionmaker(read_engine, expire_on_commit=False))
+    # Поколения перечитываются на каждом запросе: тест не ждёт опроса
+    monkeypatch.setattr(generations, "CACHE_GENERATIONS_POLL_INTERVAL", 0.0)
+
+    await _rename_part(db, PRIMARY_NAME)
+    await _rename_part(read_engine, REPLICA_NAME)
+
+    yield read_engine
+
+    await read_engine.dispose()
+    async with admin.connect() as conn:
+        await conn.execute(text(f'DROP DATABASE IF EXISTS "{replica_name}"'))
+    await admin.dispose()
+
+
+@pytest.fixture
+async def client(replica):
+    from src.main import app
+
+    token = create_access_token({"sub": "buyer@example.com", "uid": 1, "role": "Покупатель", "status": "Активный"})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", cookies={"access_token": token}) as client:
+        yield client
+
+
+async def _listed_name(client: httpx.AsyncClient) -> str:
+    response = await client.get("/api/parts/")
+    assert response.status_code == 200, response.text
+    return response.json()["parts"][0]["part_name"]
+
+
+async def test_get_reads_from_replica(db, replica, client):
+    with capture_sql(db) as primary, capture_sql(replica) as secondary:
+        assert await _listed_name(client) == REPLICA_NAME
+
+    assert secondary
+    assert not primary
+
+
+async def test_write_makes_reads_sticky_to_primary(db, replica, client):
+    from src.database.database import PRIMARY_STICKY_COOKIE
+
+    response = await client.post("/cart/api/add", json={"part_id": 1, "quantity": 1})
+    assert response.status_code == 200, response.text
+    assert float(response.cookies[PRIMARY_STICKY_COOKIE]) > time.time()
+
+    with capture_sql(db) as primary, capture_sql(replica) as secondary:
+        assert await _listed_name(client) == PRIMARY_NAME
+    assert primary
+    assert not secondary
+
+
+async def test_failed_write_does_not_stick(replica, client):
+    from src.database.database import PRIMARY_STICKY_COOKIE
+
+    response = await client.post("/cart/api/add", json={"part_id": 999, "quantity": 1})
+    assert response.status_code == 400
+    assert PRIMARY_STICKY_COOKIE not in response.cookies
+    assert await _listed_name(client) == REPLICA_NAME
+
+
+async def test_sticky_window_expires(replica, client):
+    from src.database.database import PRIMARY_STICKY_COOKIE
+
+    client.cookies.set(PRIMARY_STICKY_COOKIE, f"{time.time() - 1:.3f}")
+    assert await _listed_name(client) == REPLICA_NAME
+
+    client.cookies.set(PRIMARY_STICKY_COOKIE, f"{time.time() + 60:.3f}")
+    assert await _listed_name(client) == PRIMARY_NAME
+
+
+async def test_generations_are_tracked_per_engine(db, replica):
+    from src.cache.generations import bump_generation, get_generation, part_detail_scope
+    from src.database.database import async_read_session_maker, async_session_maker
+
+    scope = part_detail_scope(1)
+    async with async_session_maker() as session:
+        await bump_generation(session, scope)
+        await session.commit()
+        assert await get_generation(session, scope) == 1
+
+    # Реплика ещё не получила изменение — и поколение у неё прежнее
+    async with async_read_session_maker() as session:
+        assert await get_generation(session, scope) == 0
+
+
+async def test_lagging_replica_does_not_cache_under_new_generation(db, replica, client):
+    from src.cache.generations import part_detail_scope
+    from src.cache.http import invalidate_responses
+    from src.database.database import PRIMARY_STICKY_COOKIE, async_session_maker
+
+    async def detail_name() -> str:
+        response = await client.get("/api/parts/1")
+        assert response.status_code == 200, response.text
+        return response.json()["part_name"]
+
+    assert await detail_name() == REPLICA_NAME
+
+    # Изменение в основной БД вместе с поколением карточки
+    async with async_session_maker() as session:
+        await session.execute(text("UPDATE parts SET part_name = 'Фильтр (новый)' WHERE part_id = 1"))
+        await invalidate_responses(session, part_detail_scope(1))
+        await session.commit()
+
+    client.cookies.set(PRIMARY_STICKY_COOKIE, f"{time.time() + 60:.3f}")
+    assert await detail_name() == "Фильтр (новый)"
+
+    # Отстающая реплика отвечает по своему поколению: старые данные под старым ключом
+    client.cookies.delete(PRIMARY_STICKY_COOKIE)
+    assert await detail_name() == REPLICA_NAME
+
+    # Реплика догнала основную БД
+    async with replica.begin() as conn:
+        await conn.execute(text("UPDATE parts SET part_name = 'Фильтр (новый)' WHERE part_id = 1"))
+        await conn.execute(text("INSERT INTO cache_generations (scope, generation) VALUES (:scope, 1)"),
+                           {"scope": part_detail_scope(1)})
+    assert await detail_name() == "Фильтр (новый)"
@@ -0,0 +1,101 @@
+import asyncio
+import os
+
+import pytest
+
+from src.services import receipts
+
+
+# --- КЭШ PDF-ЧЕКОВ ---
+# Рендеринг идёт в пуле потоков по умолчанию (run_in_executor(None, ...))
+# вместо пула процессов, файлы — во временном каталоге.
+
+pytestmark = pytest.mark.anyio
+
+
+def _data(order_id: int = 7, discount: float = 0.0) -> dict:
+    return {
+        "order_id": order_id,
+        "order_date": "01.10.2026 12:00",
+        "user_name": "Имя Фамилия",
+        "email": "buyer@example.com",
+        "phone_number": None,
+        "rows": [["Фильтр масляный (Bosch)", 2, 500.0, 1000.0]],
+        "items_total": 1000.0,
+        "cars_total": 0.0,
+        "service_fee": 0.0,
+        "shipping_cost": 300.0,
+        "discount": discount,
+        "payment_method": "Онлайн оплата",
+        "delivery": ["Адрес доставки", "Россия, Москва, Тверская, 1"],
+    }
+
+
+@pytest.fixture(autouse=True)
+def receipt_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(receipts, "RECEIPT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(receipts, "_executor", lambda: None)
+    return tmp_path
+
+
+async def test_concurrent_requests_share_one_render(monkeypatch):
+    calls = []
+    render = receipts.render_receipt
+    monkeypatch.setattr(receipts, "render_receipt", lambda data: calls.append(data) or render(data))
+
+    paths = await asyncio.gather(*[receipts.get_receipt_path(_data()) for _ in range(5)])
+
+    assert len(set(paths)) == 1 and os.path.exists(paths[0])
+    assert len(calls) == 1
+    assert not receipts._RENDERING
+
+
+async def test_cancelling_first_caller_keeps_render_for_others(monkeypatch):
+    started = asyncio.Event()
+    release = asyncio.Event()
+    render = receipts.render_receipt
+
+    async def slow_render(path, data):
+        started.set()
+        await release.wait()
+        await asyncio.to_thread(receipts._write_atomic, path, render(data))
+        return path
+
+    monkeypatch.setattr(receipts, "_render", slow_render)
+
+    first = asyncio.ensure_future(receipts.get_receipt_path(_data()))
+    await started.wait()
+    second = asyncio.ensure_future(receipts.get_receipt_path(_data()))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    release.set()
+    path = await second
+    assert os.path.exists(path)
+
+
+async def test_new_version_prunes_stale_receipts(receipt_dir):
+    old = await receipts.get_receipt_path(_data())
+    other_order = await receipts.get_receipt_path(_data(order_id=70))
+
+    new = await receipts.get_receipt_path(_data(discount=100.0))
+
+    assert new != old
+    assert os.path.exists(new)
+    assert not os.path.exists(old)
+    assert os.path.exists(other_order)
+
+
+async def test_export_rerenders_receipt_pruned_before_reading():
+    from src.services.receipt_export import _open_receipt
+
+    path = await receipts.get_receipt_path(_data())
+    # Между get_receipt_path и чтением другую версию чека отрендерили, эту удалили
+    os.remove(path)
+
+    source = await _open_receipt(path, _data())
+    with source:
+        assert source.read(4) == b"%PDF"
@@ -0,0 +1,77 @@
+import json
+import os
+import timeit
+
+import pytest
+
+from fastapi.encoders import jsonable_encoder
+
+from src.repositories.part_repo import PartListItem, part_list_item_to_dict
+from src.schemas.part import part_list_response_adapter
+
+
+# --- СЕРИАЛИЗАЦИЯ СТРАНИЦЫ СПИСКА ---
+# Страница /api/parts/ (50 запчастей) кодируется так, как её отдаёт эндпоинт
+# (TypeAdapter.dump_json, src/api/serializers.py), и так, как FastAPI кодирует
+# ответы без response_model (jsonable_encoder + json.dumps). Результат должен
+# совпадать. Замер времени только печатается и запускается по запросу:
+# RUN_BENCHMARKS=1 pytest -s tests/test_serialization_bench.py
+
+PAGE_SIZE = 50
+REPEATS = 5
+NUMBER = 50
+
+
+def _listing_page() -> dict:
+    parts = [
+        PartListItem(
+            part_id=i,
+            part_name=f"Фильтр масляный {i}",
+            part_article=f"ART-{i:06d}",
+            description="Оригинальная запчасть, подходит для большинства моделей. " * 3,
+            price=1000.0 + i,
+            stock_count=i % 7,
+            manufacturer="Bosch",
+            category_id=10 + i % 5,
+            category_name="Фильтры",
+            parent_id=1,
+            primary_image={"url": f"/static/images/parts/{i}/1.jpg", "alt_text": None, "sort_order": 1},
+        )
+        for i in range(1, PAGE_SIZE + 1)
+    ]
+    return {
+        "parts": [part_list_item_to_dict(part) for part in parts],
+        "offset": 0,
+        "limit": PAGE_SIZE,
+        "has_more": True,
+        "next_cursor": "eyJwIjogNTB9",
+        "total": PAGE_SIZE,
+    }
+
+
+def _dump_typed(page: dict) -> bytes:
+    return part_list_response_adapter.dump_json(page)
+
+
+def _dump_default(page: dict) -> bytes:
+    # Как JSONResponse.render в Starlette
+    return json.dumps(
+        jsonable_encoder(page), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def test_listing_page_dump_json_matches_default_encoder():
+    page = _listing_page()
+    assert json.loads(_dump_typed(page)) == json.loads(_dump_default(page))
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="замер времени: RUN_BENCHMARKS=1")
+def test_listing_page_dump_json_timings():
+    page = _listing_page()
+
+    typed = min(timeit.repeat(lambda: _dump_typed(page), repeat=REPEATS, number=NUMBER)) / NUMBER
+    default = min(timeit.repeat(lambda: _dump_default(page), repeat=REPEATS, number=NUMBER)) / NUMBER
+    print(
+        f"\nстраница из {PAGE_SIZE} запчастей: TypeAdapter.dump_json {typed * 1e6:.0f} мкс, "
+        f"jsonable_encoder + json.dumps {default * 1e6:.0f} мкс (x{default / typed:.1f})"
+    )